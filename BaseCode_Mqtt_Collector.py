@@ -44,6 +44,9 @@ from mininet.link import TCLink
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
 from datetime import datetime
+from capture_manager import CaptureManager
+from readiness import wait_clients, wait_listening
+from sensor_agent import AgentPool
 import os
 import time
 
@@ -59,12 +62,28 @@ BROKER_PORT = 1883
 BROKER_IP = "10.0.0.2"
 OUTPUT_DIR = '/home/ictlab7/Documents/Learning_Mininet/PcapForExpt'
 OUTPUT_LOG_DIR = '/home/ictlab7/Documents/Learning_Mininet/mqtt_capture'
-MERGE_SWITCH_PCAPS = False
+MERGE_SWITCH_PCAPS = False     # True → scripts/pcap_merge.py merges switch captures into one CSV at shutdown
+USE_PUBLISHER_ENGINE = False   # True → publisher_engine.py (one asyncio loop per host)
+USE_SENSOR_AGENTS = False      # True → sensor_agent.py: one preforked agent per host, sensors assigned over a socket
+SUBSCRIBER_STORE = "text"      # text | binary | parquet | arrow (bulk subscriber modes)
+PUBLISHER_POOL_SIZE = 0        # >0 → sensor_publisher.py "all" shares N MQTT connections per host
 EXPERIMENT_SEED = 2029
+CAPTURE_BUFFER_KB = 8192       # tcpdump -B (kernel buffer, KiB) — raise if the drop report shows kernel drops
+CAPTURE_ROTATE_MB = 500        # tcpdump -C (0 = one file per interface)
+CAPTURE_ROTATE_SECONDS = 0     # tcpdump -G (0 = no time rotation)
+CAPTURE_MAX_FILES = 0          # tcpdump -W ring size (0 = keep every file)
+CAPTURE_PROFILE = "all"        # BPF filter profile (capture_manager.FILTER_PROFILES): all | mqtt | mqtt+icmp | no-iperf
+CAPTURE_PROFILES = {}          # per capture point, by interface or node name, e.g. {"s1": "mqtt+icmp"}
 # =================================================
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_LOG_DIR, exist_ok=True)
 
+CAPTURES = CaptureManager(OUTPUT_DIR, EXPERIMENT_SEED, buffer_kb=CAPTURE_BUFFER_KB,
+                          rotate_mb=CAPTURE_ROTATE_MB, rotate_seconds=CAPTURE_ROTATE_SECONDS,
+                          max_files=CAPTURE_MAX_FILES, profile=CAPTURE_PROFILE,
+                          profiles=CAPTURE_PROFILES)
+AGENTS = AgentPool(f"basecode_{EXPERIMENT_SEED}", OUTPUT_LOG_DIR) if USE_SENSOR_AGENTS else None
+
 # Cleanup any old Mininet state
 """
 os.system("mn -c")
@@ -146,34 +165,49 @@ def start_moderate_iperf_background(src, dst_ip, rate="2M"):
 
 
 
-def start_tcpdump(node, intf):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'{OUTPUT_DIR}/{node.name}_{intf}_{EXPERIMENT_SEED}_{timestamp}.pcap'
-    node.cmd(f'tcpdump -i {intf} -w {filename} &')
-    info(f'*** Capturing {intf} on {node.name} -> {filename}\n')
-    return filename
+def start_tcpdump(node, intf, snaplen=None, profile=None):
+    # capture_manager.py: buffer size, snaplen, BPF profile, rotation, drop counters, manifest
+    return CAPTURES.start(node, intf, snaplen, profile)
+
+def wait_ready(probe, *args, **kwargs):
+    # readiness.py probe instead of a fixed sleep; a timeout is reported, the run goes on
+    try:
+        waited = probe(*args, **kwargs)
+        info(f"   ⏱️ ready in {waited:.1f}s\n")
+        return waited
+    except TimeoutError as e:
+        info(f"⚠️ {e}\n")
 
 def start_mqtt_broker(host):
     info('***Starting MQTT broker (Mosquitto)')
     conf_file = "/tmp/mosquitto.conf"
     host.cmd(f"echo 'listener {BROKER_PORT} 0.0.0.0\nallow_anonymous true' > {conf_file}")
     host.cmd(f"mosquitto -c {conf_file} -v &")
-    time.sleep(3)
+    wait_ready(wait_listening, host, BROKER_PORT)
     info(f"✅ MQTT broker started at {BROKER_IP}:{BROKER_PORT}")
 
 def start_mqtt_subscriber(monitor):
     log_file = f"{OUTPUT_LOG_DIR}/sensor_subscriber.log"
-    cmd = f'python3 sensor_subscriber.py > {log_file} 2>&1 &'
+    cmd = f'python3 sensor_subscriber.py --store {SUBSCRIBER_STORE} > {log_file} 2>&1 &'
     monitor.cmd(cmd)
     info(f"✅ MQTT subscriber started on Monitor node, logging to {log_file}")
 
 def start_mqtt_publisher(host, sensor_name):
+    if AGENTS is not None:   # sensor_agent.py: every sensor of the "all" set on this host's agent
+        AGENTS.add(host, "all", BROKER_IP, BROKER_PORT, profile="s1")
+        info(f"✅ MQTT publisher agent on {host.name} ({sensor_name})\n")
+        return
     log_file = f"{OUTPUT_LOG_DIR}/sensor_publisher_{sensor_name}.log"
     #cmd = f'python3 sensor_publisher.py {BROKER_IP} sensors/{sensor_name} {sensor_name} > {log_file} 2>&1 &'
+    script = "publisher_engine.py" if USE_PUBLISHER_ENGINE else "sensor_publisher.py"
+    extra = ["--client-prefix", f"engine-{host.name}"] if USE_PUBLISHER_ENGINE else []
     host.popen(
-        ["python3", "sensor_publisher.py", BROKER_IP, "sensors", "all"],
+        ["python3", script, BROKER_IP, "sensors", "all"] + extra,
         stdout=open(log_file, "w"),
-        stderr=open(log_file.replace(".log", ".err"), "w")
+        stderr=open(log_file.replace(".log", ".err"), "w"),
+        # per-host client ids: every Mininet host reports the same gethostname()
+        env=dict(os.environ, PUBLISHER_POOL_SIZE=str(PUBLISHER_POOL_SIZE),
+                 PUBLISHER_CLIENT_PREFIX=host.name),
     )
     info(f"✅ MQTT publisher started on {host.name} ({sensor_name}), logging to {log_file}\n")
 
@@ -254,22 +288,24 @@ def start_mqtt_network():
     """
     info('\n*** Starting tcpdump captures on main switches')
 
+    switch_captures = []
+
     # Capture from core switch s1 (all flows)
     for intf in s1.intfList():
         if 'lo' not in intf.name:
-            start_tcpdump(s1, intf)
+            switch_captures.append(start_tcpdump(s1, intf))
 
     # Capture from edge switch s2 (sensor side)
-    start_tcpdump(s2, s2.intfList()[0])
+    switch_captures.append(start_tcpdump(s2, s2.intfList()[0]))
 
     # Capture from edge switch s3 (broker side)
-    start_tcpdump(s3, s3.intfList()[0])
+    switch_captures.append(start_tcpdump(s3, s3.intfList()[0]))
+    wait_ready(CAPTURES.wait_ready)
 
     # Start MQTT system
     start_mqtt_broker(broker)
     start_mqtt_subscriber(monitor)
-
-    time.sleep(2)
+    wait_ready(wait_clients, broker, BROKER_PORT, [monitor.IP()], what="subscriber")
     # === IoT Sensor Class Mapping (14 hosts, realistic categories) ===
 
     # === Scenario S2 Additions  start ===
@@ -347,12 +383,23 @@ def start_mqtt_network():
         info("\n*** Stopping background processes...\n")
         os.system("pkill -f iperf")
         os.system("pkill -f mosquitto")
+        if AGENTS is not None:
+            AGENTS.stop()
+        CAPTURES.stop()   # SIGINT + drop report + manifest
         os.system("pkill -f tcpdump")
         os.system("pkill -f sensor_publisher.py")
+        os.system("pkill -f publisher_engine.py")
         os.system("pkill -f ping")
 
         info("\n*** Stopping network")
         net.stop()
+
+        switch_pcaps = CAPTURES.files(switch_captures)
+        if MERGE_SWITCH_PCAPS and switch_pcaps:
+            # time-ordered streaming merge → one CSV, no merged .pcap written
+            merged_csv = f"{OUTPUT_DIR}/switches_merged_{EXPERIMENT_SEED}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            info(f"\n*** Merging {len(switch_pcaps)} switch capture files -> {merged_csv}\n")
+            os.system(f"python3 scripts/pcap_merge.py {' '.join(switch_pcaps)} --out {merged_csv}")
         info("\n*** Mininet simulation ended cleanly.")
 
     # CLI for manual testing
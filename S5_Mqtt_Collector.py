@@ -37,7 +37,9 @@ from mininet.net import Mininet
 from mininet.node import Controller, OVSSwitch
 from mininet.link import TCLink
 from mininet.log import setLogLevel, info
-from datetime import datetime
+from capture_manager import CaptureManager, SNAPLEN_HEADERS
+from readiness import wait_clients, wait_listening
+from sensor_agent import AgentPool
 import os
 import sys
 import time
@@ -55,10 +57,30 @@ OUTPUT_DIR      = '/home/ictlab7/Documents/Learning_Mininet/PcapForExpt'
 OUTPUT_LOG_DIR  = '/home/ictlab7/Documents/Learning_Mininet/mqtt_capture'
 EXPERIMENT_SEED = 2025   # keep same seed for reproducibility
 SCENARIO_NAME   = "s5"
+USE_SENSOR_AGENTS = False   # True → sensor_agent.py: one preforked agent per host instead of one process per sensor
+CAPTURE_BUFFER_KB      = 8192   # tcpdump -B (KiB) — raise if the drop report shows kernel drops
+CAPTURE_ROTATE_MB      = 500    # tcpdump -C (0 = one file per interface)
+CAPTURE_ROTATE_SECONDS = 0      # tcpdump -G (0 = no time rotation)
+CAPTURE_MAX_FILES      = 0      # tcpdump -W ring size (0 = keep every file)
+CAPTURE_PROFILE        = "all"  # default BPF profile: all | mqtt | mqtt+icmp | no-iperf
+# per capture point (interface or node name) → capture_manager.FILTER_PROFILES
+CAPTURE_PROFILES = {
+    "broker-eth0": "mqtt+icmp",   # dataset source — MQTT + ping monitor, no iperf flood
+    "s3":          "mqtt+icmp",   # dataset fallback source
+    "s1":          "mqtt",        # flow context only
+    "s2":          "mqtt",
+    "h13":         "mqtt",        # emergency_button sender-side debug
+}
 
 os.makedirs(OUTPUT_DIR,     exist_ok=True)
 os.makedirs(OUTPUT_LOG_DIR, exist_ok=True)
 
+CAPTURES = CaptureManager(OUTPUT_DIR, EXPERIMENT_SEED, scenario=SCENARIO_NAME,
+                          buffer_kb=CAPTURE_BUFFER_KB, rotate_mb=CAPTURE_ROTATE_MB,
+                          rotate_seconds=CAPTURE_ROTATE_SECONDS, max_files=CAPTURE_MAX_FILES,
+                          profile=CAPTURE_PROFILE, profiles=CAPTURE_PROFILES)
+AGENTS = AgentPool(f"{SCENARIO_NAME}_{EXPERIMENT_SEED}", OUTPUT_LOG_DIR) if USE_SENSOR_AGENTS else None
+
 """
 🟡 Scenario S5: Class 2 Continuous Monitoring Focus
 =====================================================
@@ -79,12 +101,19 @@ Goal                 Push Class 2 MQTT coverage above 70%
 # =====================================================================
 
 
-def start_tcpdump(node, intf):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename  = f'{OUTPUT_DIR}/{node.name}_{intf}_{EXPERIMENT_SEED}_{SCENARIO_NAME}_{timestamp}.pcap'
-    node.cmd(f'tcpdump -i {intf} -w {filename} &')
-    info(f'*** Capturing {intf} on {node.name} -> {filename}\n')
-    return filename
+def start_tcpdump(node, intf, snaplen=None, profile=None):
+    # capture_manager.py: buffer size, snaplen, BPF profile, rotation, drop counters, manifest
+    return CAPTURES.start(node, intf, snaplen, profile)
+
+
+def wait_ready(probe, *args, **kwargs):
+    # readiness.py probe instead of a fixed sleep; a timeout is reported, the run goes on
+    try:
+        waited = probe(*args, **kwargs)
+        info(f"   ⏱️ ready in {waited:.1f}s\n")
+        return waited
+    except TimeoutError as e:
+        info(f"⚠️ {e}\n")
 
 
 def start_mqtt_broker(host):
@@ -92,7 +121,7 @@ def start_mqtt_broker(host):
     conf_file = "/tmp/mosquitto_s5.conf"
     host.cmd(f"echo 'listener {BROKER_PORT} 0.0.0.0\nallow_anonymous true' > {conf_file}")
     host.cmd(f"mosquitto -c {conf_file} -v &")
-    time.sleep(3)
+    wait_ready(wait_listening, host, BROKER_PORT)
     info(f"✅ MQTT broker started at {BROKER_IP}:{BROKER_PORT}\n")
 
 
@@ -144,6 +173,10 @@ def start_continuous_monitoring_publisher(host, sensor_name):
     Launches sensor_publisher_s5.py for Class 2 (Continuous Monitoring) sensors
     Example sensors: infusion_pump, glucometer, gsr_sensor
     """
+    if AGENTS is not None:   # sensor_agent.py: one preforked agent per host
+        AGENTS.add(host, sensor_name, BROKER_IP, BROKER_PORT, profile="s5")
+        info(f"🟡 publisher assigned to agent: {sensor_name} on {host.name}\n")
+        return
     log_file = f"{OUTPUT_LOG_DIR}/sensor_publisher_{sensor_name}_s5.log"
     host.popen(
         ["python3", "sensor_publisher_s5.py", BROKER_IP, "sensors", sensor_name],
@@ -157,6 +190,10 @@ def start_emergency_publisher(host, sensor_name):
     Launches sensor_publisher_s5.py for Class 3 (Emergency Critical) sensors
     Example sensors: emergency_button, vital_signs_monitor, etc.
     """
+    if AGENTS is not None:   # sensor_agent.py: one preforked agent per host
+        AGENTS.add(host, sensor_name, BROKER_IP, BROKER_PORT, profile="s5")
+        info(f"🔴 publisher assigned to agent: {sensor_name} on {host.name}\n")
+        return
     log_file = f"{OUTPUT_LOG_DIR}/sensor_publisher_{sensor_name}_emergency_s5.log"
     host.popen(
         ["python3", "sensor_publisher_s5.py", BROKER_IP, "sensors", sensor_name],
@@ -238,11 +275,13 @@ def start_s5_network():
     # ── tcpdump on switches (same strategy as S1–S4) ──────────────────
     info('\n*** Starting tcpdump captures on main switches\n')
 
+    # s1/s2 are flow context only — headers are enough; s3 is the
+    # pcap_to_csv_s5_v6.sh fallback source, so it keeps full payloads
     for intf in s1.intfList():
         if 'lo' not in intf.name:
-            start_tcpdump(s1, intf)
+            start_tcpdump(s1, intf, snaplen=SNAPLEN_HEADERS)
 
-    start_tcpdump(s2, s2.intfList()[0])
+    start_tcpdump(s2, s2.intfList()[0], snaplen=SNAPLEN_HEADERS)
     start_tcpdump(s3, s3.intfList()[0])
     
     info('\n*** Starting tcpdump on broker for MQTT verification ***\n')
@@ -251,11 +290,12 @@ def start_s5_network():
     # Optional: also on h13 (emergency_button host) for sender-side debug
     info('\n*** Starting tcpdump on h13 (emergency_button host) for debug ***\n')
     start_tcpdump(h13, h13.defaultIntf())  # h13-eth0
+    wait_ready(CAPTURES.wait_ready)
 
     # ── MQTT broker + subscriber ──────────────────────────────────────
     start_mqtt_broker(broker)
     start_mqtt_subscriber(monitor)
-    time.sleep(2)
+    wait_ready(wait_clients, broker, BROKER_PORT, [monitor.IP()], what="subscriber")
 
     # ── S5 scenario: light background only ───────────────────────────
     # Ping monitoring (same as S2/S3)
@@ -301,6 +341,9 @@ def start_s5_network():
         info("\n*** Stopping background processes...\n")
         os.system("pkill -f iperf")
         os.system("pkill -f mosquitto")
+        if AGENTS is not None:
+            AGENTS.stop()
+        CAPTURES.stop()   # SIGINT + drop report + manifest
         os.system("pkill -f tcpdump")
         os.system("pkill -f sensor_publisher_s5.py")
         os.system("pkill -f ping")
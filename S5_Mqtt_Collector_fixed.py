@@ -31,7 +31,9 @@ from mininet.net import Mininet
 from mininet.node import Controller, OVSSwitch
 from mininet.link import TCLink
 from mininet.log import setLogLevel, info
-from datetime import datetime
+from capture_manager import CaptureManager
+from readiness import wait_clients, wait_listening
+from sensor_agent import AgentPool
 import os
 import sys
 import time
@@ -47,21 +49,46 @@ OUTPUT_DIR      = '/home/ictlab7/Documents/Learning_Mininet/PcapForExpt'
 OUTPUT_LOG_DIR  = '/home/ictlab7/Documents/Learning_Mininet/mqtt_capture'
 EXPERIMENT_SEED = 2025
 SCENARIO_NAME   = "s5"
+USE_SENSOR_AGENTS = False   # True → sensor_agent.py: one preforked agent per host instead of one process per sensor
+CAPTURE_BUFFER_KB      = 8192   # tcpdump -B (KiB) — raise if the drop report shows kernel drops
+CAPTURE_ROTATE_MB      = 500    # tcpdump -C (0 = one file per interface)
+CAPTURE_ROTATE_SECONDS = 0      # tcpdump -G (0 = no time rotation)
+CAPTURE_MAX_FILES      = 0      # tcpdump -W ring size (0 = keep every file)
+CAPTURE_PROFILE        = "all"  # default BPF profile: all | mqtt | mqtt+icmp | no-iperf
+# per capture point (interface or node name) → capture_manager.FILTER_PROFILES
+CAPTURE_PROFILES = {
+    "broker-eth0": "mqtt+icmp",   # dataset source — MQTT + ping monitor, no iperf flood
+    "s3":          "mqtt+icmp",   # dataset fallback source
+    "h13":         "mqtt",        # Class 3 verification
+}
 
 os.makedirs(OUTPUT_DIR,     exist_ok=True)
 os.makedirs(OUTPUT_LOG_DIR, exist_ok=True)
 
+CAPTURES = CaptureManager(OUTPUT_DIR, EXPERIMENT_SEED, scenario=SCENARIO_NAME,
+                          buffer_kb=CAPTURE_BUFFER_KB, rotate_mb=CAPTURE_ROTATE_MB,
+                          rotate_seconds=CAPTURE_ROTATE_SECONDS, max_files=CAPTURE_MAX_FILES,
+                          profile=CAPTURE_PROFILE, profiles=CAPTURE_PROFILES)
+AGENTS = AgentPool(f"{SCENARIO_NAME}_{EXPERIMENT_SEED}", OUTPUT_LOG_DIR) if USE_SENSOR_AGENTS else None
+
 
 # =====================================================================
 # Helpers
 # =====================================================================
 
-def start_tcpdump(node, intf):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename  = f'{OUTPUT_DIR}/{node.name}_{intf}_{EXPERIMENT_SEED}_{SCENARIO_NAME}_{timestamp}.pcap'
-    node.cmd(f'tcpdump -i {intf} -w {filename} &')
-    info(f'*** Capturing {intf} on {node.name} -> {filename}\n')
-    return filename
+def start_tcpdump(node, intf, snaplen=None, profile=None):
+    # capture_manager.py: buffer size, snaplen, BPF profile, rotation, drop counters, manifest
+    return CAPTURES.start(node, intf, snaplen, profile)
+
+
+def wait_ready(probe, *args, **kwargs):
+    # readiness.py probe instead of a fixed sleep; a timeout is reported, the run goes on
+    try:
+        waited = probe(*args, **kwargs)
+        info(f"   ⏱️ ready in {waited:.1f}s\n")
+        return waited
+    except TimeoutError as e:
+        info(f"⚠️ {e}\n")
 
 
 def start_mqtt_broker(host):
@@ -69,7 +96,7 @@ def start_mqtt_broker(host):
     conf_file = "/tmp/mosquitto_s5.conf"
     host.cmd(f"echo 'listener {BROKER_PORT} 0.0.0.0\nallow_anonymous true' > {conf_file}")
     host.cmd(f"mosquitto -c {conf_file} -v &")
-    time.sleep(3)
+    wait_ready(wait_listening, host, BROKER_PORT)
     info(f"✅ MQTT broker started at {BROKER_IP}:{BROKER_PORT}\n")
 
 
@@ -82,6 +109,10 @@ def start_mqtt_subscriber(monitor):
 
 def start_continuous_monitoring_publisher(host, sensor_name):
     """Launch a Class 2 sensor publisher (infusion_pump / glucometer / gsr_sensor)."""
+    if AGENTS is not None:   # sensor_agent.py: one preforked agent per host
+        AGENTS.add(host, sensor_name, BROKER_IP, BROKER_PORT, profile="s5")
+        info(f"🟡 publisher assigned to agent: {sensor_name} on {host.name}\n")
+        return
     log_file = f"{OUTPUT_LOG_DIR}/sensor_publisher_{sensor_name}_s5.log"
     host.popen(
         ["python3", "S5_sensor_publisher.py", BROKER_IP, "sensors", sensor_name],
@@ -93,6 +124,10 @@ def start_continuous_monitoring_publisher(host, sensor_name):
 
 def start_emergency_publisher(host, sensor_name):
     """Launch a Class 3 sensor publisher (emergency_button / vital_signs_monitor)."""
+    if AGENTS is not None:   # sensor_agent.py: one preforked agent per host
+        AGENTS.add(host, sensor_name, BROKER_IP, BROKER_PORT, profile="s5")
+        info(f"🔴 publisher assigned to agent: {sensor_name} on {host.name}\n")
+        return
     log_file = f"{OUTPUT_LOG_DIR}/sensor_publisher_{sensor_name}_emergency_s5.log"
     host.popen(
         ["python3", "S5_sensor_publisher.py", BROKER_IP, "sensors", sensor_name],
@@ -189,7 +224,8 @@ def start_s5_network():
         for intf in h.intfList():
             if 'lo' not in intf.name:
                 h.cmd(f'ifconfig {intf} up')
-    time.sleep(1)
+    if not net.waitConnected(timeout=15):
+        info("⚠️ switches not connected to the controller after 15s\n")
 
     # ── STEP 3: Targeted connectivity check (active hosts only) ───────
     # Replaces net.pingAll() which would generate 182 ICMP pairs
@@ -219,24 +255,27 @@ def start_s5_network():
             break   # just the first eth port is enough
     # h13 for Class 3 verification
     start_tcpdump(h13, h13.defaultIntf())
+    wait_ready(CAPTURES.wait_ready)
 
     # ── STEP 5: MQTT broker + subscriber ─────────────────────────────
     start_mqtt_broker(broker)
     start_mqtt_subscriber(monitor)
-    time.sleep(2)
+    wait_ready(wait_clients, broker, BROKER_PORT, [monitor.IP()], what="subscriber")
 
     # ── STEP 6: Class 2 publishers ────────────────────────────────────
     start_continuous_monitoring_publisher(h9,  "infusion_pump")
     start_continuous_monitoring_publisher(h10, "glucometer")
     start_continuous_monitoring_publisher(h11, "gsr_sensor")
     info("🟡 Class 2 sensors publishing at 1.0s interval\n")
-    time.sleep(2)   # let Class 2 publishers connect before Class 3 starts
+    # Class 2 publishers connected before Class 3 starts
+    wait_ready(wait_clients, broker, BROKER_PORT, [h9.IP(), h10.IP(), h11.IP()], what="Class 2 publishers")
 
     # ── STEP 7: Class 3 publishers ────────────────────────────────────
     start_emergency_publisher(h13, "emergency_button")
     start_emergency_publisher(h14, "vital_signs_monitor")
     info("🔴 Class 3 sensors publishing at 0.5s interval\n")
-    time.sleep(2)   # let all publishers stabilise before background starts
+    # every publisher connected before background starts
+    wait_ready(wait_clients, broker, BROKER_PORT, [h13.IP(), h14.IP()], what="Class 3 publishers")
 
     # ── STEP 8: Light background (iperf + ping monitor) ───────────────
     # Starts LAST so MQTT dominates the early part of the capture.
@@ -258,6 +297,9 @@ def start_s5_network():
         info("\n*** Stopping background processes...\n")
         os.system("pkill -f iperf")
         os.system("pkill -f mosquitto")
+        if AGENTS is not None:
+            AGENTS.stop()
+        CAPTURES.stop()   # SIGINT + drop report + manifest
         os.system("pkill -f tcpdump")
         os.system("pkill -f S5_sensor_publisher.py")
         os.system("pkill -f ping")
@@ -15,19 +15,26 @@ Usage:
   e.g.  python3 sensor_publisher_s5.py 10.0.0.2 sensors emergency_button
 """
 
-from logging.handlers import TimedRotatingFileHandler
-import paho.mqtt.client as mqtt
 import sys
 import time
 import random
-from datetime import datetime
 import threading
-import logging
 import signal
+from publisher_log import get_logger, log_path, ERROR, INFO, MESSAGE
+from publish_scheduler import DeadlineScheduler
+from latency_metrics import PayloadTagger, latency_tags_enabled
+from sensor_config import (EXPERIMENT_SEED, S5_SENSOR_CONFIG, S5_ALIASES,
+                           ADMIN_VALUES, ADMIN_INTERVAL)
+
+# ── Usage — parsed in main(argv); importing this module has no side effects ──
+USAGE = ("Usage: python3 sensor_publisher_s5.py <BROKER_IP> <TOPIC> <SENSOR_NAME>\n"
+         "  SENSOR_NAME: infusion_pump, glucometer, gsr_sensor, emergency_button, vital_signs_monitor")
+BROKER_PORT = 1883
+LOG_FILE    = "/tmp/s5_publisher.log"   # set per sensor by main()
 
-# ── Reproducibility ──────────────────────────────────────────────────────────
-EXPERIMENT_SEED = 2025
-random.seed(EXPERIMENT_SEED)
+# ── S5 Sensor Config — shared table in sensor_config.py ──────────────────────
+SENSOR_CONFIG = S5_SENSOR_CONFIG
+ALIASES       = S5_ALIASES
 
 stop_event = threading.Event()
 
@@ -35,99 +42,15 @@ def handle_exit(sig, frame):
     print("\n[INFO] Ctrl+C received. Stopping S5 publisher...")
     stop_event.set()
 
-signal.signal(signal.SIGINT, handle_exit)
-
-# ── Logging (same rotation as original) ──────────────────────────────────────
-handler = TimedRotatingFileHandler(
-    "sensors_publisher_s5.log",
-    when="H", interval=1, backupCount=48
-)
-logging.basicConfig(
-    handlers=[handler],
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-
-# ── Args ──────────────────────────────────────────────────────────────────────
-if len(sys.argv) != 4:
-    print("Usage: python3 sensor_publisher_s5.py <BROKER_IP> <TOPIC> <SENSOR_NAME>")
-    print("  SENSOR_NAME: infusion_pump, glucometer, gsr_sensor, emergency_button, vital_signs_monitor")
-    sys.exit(1)
-
-BROKER_IP   = sys.argv[1]
-TOPIC       = sys.argv[2]
-SENSOR_NAME = sys.argv[3].lower()
-BROKER_PORT = 1883
-LOG_FILE    = f"/tmp/{SENSOR_NAME}_s5_publisher.log"
-
-# ── S5 Sensor Config — Class 3 sensors only, interval reduced to 1.0s ────────
-#
-#  NOTE ON CLASS NUMBERS:
-#  sensor_publisher.py uses Class 1–4 (original 4-class scheme).
-#  preprocessing uses Class 0–3 (remapped). The SENSOR_CONFIG in
-#  preprossing_v6.py maps these sensors to class=2 (Continuous Monitoring).
-#  We keep Class=3 in the payload to match S1–S4 payload format exactly.
-#
-SENSOR_CONFIG = {
-    "infusion_pump": {
-        "class"   : 3,                     # matches S1–S4 payload format
-        "unit"    : "mL/hr",
-        "min"     : 5,
-        "max"     : 120,
-        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
-    },
-    "glucometer": {
-        "class"   : 3,
-        "unit"    : "mg/dL",
-        "min"     : 70,
-        "max"     : 180,
-        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
-    },
-    "gsr_sensor": {
-        "class"   : 3,
-        "unit"    : "µS",
-        "min"     : 0.1,
-        "max"     : 10,
-        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
-    },
-    # ── Class 3 (Emergency Critical) ─────────────────────────────────
-    "emergency_button": {
-        "class"   : 4,           # maps to priority_class = 3 in preprocessing
-        "unit"    : "alert",
-        "min"     : 0,
-        "max"     : 1,
-        "interval": 0.5,         # faster publishing for urgency
-    },
-    "vital_signs_monitor": {
-        "class"   : 4,
-        "unit"    : "bpm",
-        "min"     : 60,
-        "max"     : 180,
-        "interval": 0.5,
-    },
-}
-
-ALIASES = {
-    "infusion"   : "infusion_pump",
-    "glucose"    : "glucometer",
-    "gsr"        : "gsr_sensor",
-    "emergency"  : "emergency_button",
-    "vital"      : "vital_signs_monitor",
-    
-}
-
-ADMIN_VALUES   = ["sync", "idle", "config", "heartbeat_ok"]
-ADMIN_INTERVAL = 15.0   # same as original
-
-
-def log(msg):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a") as f:
-        f.write(f"[{timestamp}] {msg}\n")
-    print(f"[{timestamp}] {msg}", flush=True)
+
+def log(msg, level=INFO):
+    # Buffered: one shared handle per process, flushed by a writer thread
+    get_logger(LOG_FILE).log(msg, level)
 
 
 def publish_sensor(sensor_key, topic, broker_ip, broker_port):
+    import paho.mqtt.client as mqtt   # lazy — the heaviest import, only needed once running
+    from mqtt_client_pool import connect_with_retry
     cfg      = SENSOR_CONFIG[sensor_key]
     class_id = cfg["class"]
 
@@ -139,34 +62,38 @@ def publish_sensor(sensor_key, topic, broker_ip, broker_port):
 
     sensor_topic    = f"sensor/{sensor_key}"
     last_admin_time = time.time()
+    sched           = DeadlineScheduler(cfg["interval"], name=sensor_key,
+                                        rng=random.Random(sensor_seed + 1))
+    tagger          = PayloadTagger() if latency_tags_enabled() else None
 
     # Outer reconnect loop — if broker drops connection for any reason,
     # wait 5s and reconnect automatically instead of dying silently.
     while not stop_event.is_set():
         client = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
-        try:
-            client.connect(broker_ip, broker_port)
-            log(f"[Publisher] Connected to {broker_ip}:{broker_port}, "
-                f"topic '{topic}' as {sensor_key} (Class={class_id}, interval={cfg['interval']}s)")
-            client.loop_start()
-        except Exception as e:
-            log(f"[Publisher] Connection failed for {sensor_key}: {e} — retrying in 5s")
-            time.sleep(5)
-            continue
+        # backoff from 0.2s — at startup the broker is usually up within a second
+        if not connect_with_retry(client, broker_ip, broker_port, stop_event,
+                                  on_error=lambda e, d: log(f"[Publisher] Connection failed for {sensor_key}: {e} — retrying in {d:.1f}s", ERROR)):
+            break
+        log(f"[Publisher] Connected to {broker_ip}:{broker_port}, "
+            f"topic '{topic}' as {sensor_key} (Class={class_id}, interval={cfg['interval']}s)")
+        client.loop_start()
+        sched.reset()   # restart the grid — no catch-up burst after a reconnect gap
 
         # Inner publish loop
         while not stop_event.is_set():
             value   = round(rng.uniform(cfg["min"], cfg["max"]), 2)
             payload = f"{sensor_key}:{value}{cfg['unit']}:Class={class_id}"
+            if tagger is not None:
+                payload = tagger.tag(payload)   # :pub=<id>:seq=<n>:ts=<epoch ns>
 
             try:
                 result = client.publish(sensor_topic, payload, qos=1)
                 if result.rc != mqtt.MQTT_ERR_SUCCESS:
-                    log(f"[Publisher] {sensor_key}: Publish error rc={result.rc} — reconnecting")
+                    log(f"[Publisher] {sensor_key}: Publish error rc={result.rc} — reconnecting", ERROR)
                     break   # exit inner loop → reconnect
-                log(f"[Publisher] {sensor_key}: {payload}")
+                log(f"[Publisher] {sensor_key}: {payload}", MESSAGE)
             except Exception as e:
-                log(f"[Publisher] {sensor_key}: Publish exception: {e} — reconnecting")
+                log(f"[Publisher] {sensor_key}: Publish exception: {e} — reconnecting", ERROR)
                 break   # exit inner loop → reconnect
 
             # Admin heartbeat
@@ -174,13 +101,15 @@ def publish_sensor(sensor_key, topic, broker_ip, broker_port):
                 admin_value = rng.choice(ADMIN_VALUES)
                 try:
                     client.publish("admin/heartbeat", admin_value, qos=0)
-                    log(f"[Publisher] (Admin) {admin_value}")
+                    log(f"[Publisher] (Admin) {admin_value}", MESSAGE)
                     last_admin_time = time.time()
                 except Exception:
                     pass
 
-            log(f"[SeedConfig] Sensor={sensor_key}, Seed={sensor_seed}")
-            time.sleep(cfg["interval"])
+            log(f"[SeedConfig] Sensor={sensor_key}, Seed={sensor_seed}", MESSAGE)
+            if sched.stats.should_report():
+                log(sched.stats.summary())
+            sched.sleep(stop_event)
 
         client.loop_stop()
         client.disconnect()
@@ -188,26 +117,36 @@ def publish_sensor(sensor_key, topic, broker_ip, broker_port):
             log(f"[Publisher] {sensor_key}: Disconnected — reconnecting in 5s")
             time.sleep(5)
 
+    log(sched.stats.summary())
     log(f"[Publisher] {sensor_key}: Stopped cleanly.")
 
 
-def main():
-    sensor_arg = sys.argv[3].lower()
-    broker_ip  = sys.argv[1]
-    topic      = sys.argv[2]
+def main(argv=None):
+    global LOG_FILE
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3:
+        print(USAGE)
+        return 1
+    broker_ip, topic, sensor_arg = argv[0], argv[1], argv[2].lower()
+    LOG_FILE = log_path(f"{sensor_arg}_s5_publisher")   # $PUBLISHER_LOG_DIR or /tmp
+
+    # Reproducibility
+    random.seed(EXPERIMENT_SEED)
+    signal.signal(signal.SIGINT, handle_exit)
 
     # Resolve alias
     sensor_key = ALIASES.get(sensor_arg, sensor_arg)
 
     if sensor_key not in SENSOR_CONFIG:
-        log(f"[Publisher] ERROR: Unknown sensor '{sensor_arg}'.")
-        log(f"[Publisher] Valid sensors: {list(SENSOR_CONFIG.keys())}")
-        sys.exit(1)
+        log(f"[Publisher] ERROR: Unknown sensor '{sensor_arg}'.", ERROR)
+        log(f"[Publisher] Valid sensors: {list(SENSOR_CONFIG.keys())}", ERROR)
+        return 1
 
     log(f"[Publisher] Starting S5 publisher for: {sensor_key} "
         f"(interval={SENSOR_CONFIG[sensor_key]['interval']}s, qos=1)")
     publish_sensor(sensor_key, topic, broker_ip, BROKER_PORT)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+capture_manager.py — Owns every tcpdump process of a collector run
+==================================================================
+start_tcpdump() used to run `tcpdump -i <intf> -w <file> &` with default
+snaplen, default kernel buffer and no rotation: long runs produced giant
+files, iperf load caused silent kernel drops, and nothing recorded what
+was written.
+
+CaptureManager.start(node, intf) runs, inside the Mininet node:
+  tcpdump -i <intf> -n -Z root -B <buffer_kb> -s <snaplen>
+          [-C <rotate_mb>] [-G <rotate_seconds>] [-W <max_files>] -w <file>
+  • -B  kernel capture buffer (KiB) — the main defence against drops
+  • -s  snaplen; SNAPLEN_HEADERS keeps Ethernet/IP/TCP + MQTT fixed header
+        and topic only (for captures that are not a dataset source)
+  • -C / -G  size (MB) / time (s) rotation; -W turns it into a ring
+  • -Z root  keeps write permission on files opened after a rotation
+  • BPF filter from a named profile (FILTER_PROFILES), chosen per capture
+    point: explicit start(profile=) > profiles[intf] > profiles[node] > default
+
+CaptureManager.wait_ready() blocks until every tcpdump has printed
+"listening on <intf>" — the capture is open — instead of a fixed sleep.
+
+CaptureManager.stop() sends SIGINT, waits for each tcpdump to exit, parses
+its "packets captured / received by filter / dropped by kernel" report,
+renames rotated parts to <stem>_NNN.pcap (tcpdump appends digits after
+.pcap) and writes capture_manifest_<seed>[_<scenario>]_<ts>.json:
+  settings, and per capture: node, intf, point, files [{path, bytes}],
+  profile, bpf, captured, received, dropped_kernel, dropped_interface
+pcap_merge.py --manifest reads it back for the extraction stage.
+
+File names keep the start_tcpdump() layout:
+  <node>_<intf>_<seed>[_<scenario>]_<YYYYmmdd_HHMMSS>[_NNN].pcap
+"""
+
+import glob
+import json
+import os
+import re
+import signal
+import time
+from datetime import datetime
+
+from mininet.log import info
+
+from readiness import READY_TIMEOUT, wait_until
+
+SNAPLEN_FULL      = 262144   # tcpdump default — whole frame
+SNAPLEN_HEADERS   = 128      # Eth + IPv4 + TCP(+options) + MQTT fixed header + topic
+DEFAULT_BUFFER_KB = 8192     # tcpdump default is 2048 KiB
+STOP_TIMEOUT      = 5.0      # s to wait for tcpdump to flush and exit
+
+# Named capture filters — iperf runs UDP on port 5001 (`iperf -s -u`),
+# ping monitoring is ICMP, everything the dataset analyses is MQTT.
+FILTER_PROFILES = {
+    "all":       "",
+    "mqtt":      "tcp port 1883",
+    "mqtt+icmp": "tcp port 1883 or icmp",
+    "no-iperf":  "not udp port 5001",
+}
+
+_STAT_PATTERNS = {
+    "captured":          re.compile(r"(\d+) packets? captured"),
+    "received":          re.compile(r"(\d+) packets? received by filter"),
+    "dropped_kernel":    re.compile(r"(\d+) packets? dropped by kernel"),
+    "dropped_interface": re.compile(r"(\d+) packets? dropped by interface"),
+}
+_PART_RE = re.compile(r"^(?P<base>.+\.pcap)(?P<part>\d+)$")
+
+
+def _check_profile(name):
+    if name not in FILTER_PROFILES:
+        raise ValueError(f"Unknown capture filter profile {name!r} — "
+                         f"choose from {', '.join(FILTER_PROFILES)}")
+
+
+class Capture:
+    """One tcpdump process on one interface."""
+
+    def __init__(self, name, intf, stem, snaplen, profile):
+        self.node     = name
+        self.intf     = str(intf)
+        self.point    = f"{name}_{intf}"
+        self.stem     = stem          # may contain strftime codes when time-rotating
+        self.snaplen  = snaplen
+        self.profile  = profile
+        self.bpf      = FILTER_PROFILES[profile]
+        self.pid      = None
+        self.log_path = None
+        self.files    = []
+        self.stats    = {}
+
+    def as_dict(self):
+        return {
+            "node": self.node,
+            "intf": self.intf,
+            "point": self.point,
+            "pid": self.pid,
+            "snaplen": self.snaplen,
+            "profile": self.profile,
+            "bpf": self.bpf,
+            "files": [{"path": f, "bytes": os.path.getsize(f)} for f in self.files if os.path.exists(f)],
+            **self.stats,
+        }
+
+
+class CaptureManager:
+    """Starts, stops and accounts for all captures of one collector run."""
+
+    def __init__(self, output_dir, seed, scenario=None, snaplen=SNAPLEN_FULL,
+                 buffer_kb=DEFAULT_BUFFER_KB, rotate_mb=0, rotate_seconds=0, max_files=0,
+                 profile="all", profiles=None):
+        for name in [profile, *(profiles or {}).values()]:
+            _check_profile(name)
+        self.output_dir     = output_dir
+        self.seed           = seed
+        self.scenario       = scenario
+        self.snaplen        = snaplen
+        self.buffer_kb      = buffer_kb
+        self.rotate_mb      = rotate_mb
+        self.rotate_seconds = rotate_seconds
+        self.max_files      = max_files
+        self.profile        = profile
+        self.profiles       = dict(profiles or {})
+        self.captures       = []
+        self.started_at     = time.time()
+        self.manifest_path  = None
+
+    def _stem(self, name, intf):
+        tag = f"_{self.scenario}" if self.scenario else ""
+        ts = "%Y%m%d_%H%M%S" if self.rotate_seconds else datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{self.output_dir}/{name}_{intf}_{self.seed}{tag}_{ts}"
+
+    def _profile_for(self, name, intf):
+        return self.profiles.get(str(intf), self.profiles.get(name, self.profile))
+
+    def start(self, node, intf, snaplen=None, profile=None, name=None):
+        """`name` is the node name used in file names, points and profiles
+        (default node.name); scenario_runner passes the unprefixed name so
+        concurrent sweep runs keep the usual <node>_<intf> layout."""
+        name = name or node.name
+        label = str(intf).replace(node.name, name, 1) if name != node.name else str(intf)
+        snaplen = snaplen or self.snaplen
+        profile = profile or self._profile_for(name, label)
+        _check_profile(profile)
+        cap = Capture(name, label, self._stem(name, label), snaplen, profile)
+        cap.log_path = f"{self.output_dir}/.tcpdump_{cap.point}_{os.getpid()}.log"
+        args = [f"tcpdump -i {intf} -n -Z root -B {self.buffer_kb} -s {snaplen}"]
+        if self.rotate_mb:
+            args.append(f"-C {self.rotate_mb}")
+        if self.rotate_seconds:
+            args.append(f"-G {self.rotate_seconds}")
+        if self.max_files and (self.rotate_mb or self.rotate_seconds):
+            args.append(f"-W {self.max_files}")
+        args.append(f"-w '{cap.stem}.pcap'")
+        if cap.bpf:
+            args.append(f"'{cap.bpf}'")
+        out = node.cmd(f"{' '.join(args)} 2> {cap.log_path} & echo $!")
+        pids = re.findall(r"\d+", out)
+        cap.pid = int(pids[-1]) if pids else None
+        self.captures.append(cap)
+        info(f'*** Capturing {intf} on {node.name} -> {cap.stem}.pcap '
+             f'(filter {profile}, snaplen {snaplen}, buffer {self.buffer_kb} KiB)\n')
+        return cap
+
+    def _listening(self, cap):
+        try:
+            with open(cap.log_path) as f:
+                return "listening on" in f.read()
+        except OSError:
+            return False
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Wait until every started tcpdump is capturing; seconds waited."""
+        def check():
+            waiting = [c.point for c in self.captures if not self._listening(c)]
+            return not waiting, "waiting for " + ", ".join(waiting)
+        return wait_until(check, timeout, "tcpdump captures")
+
+    # ── Shutdown ────────────────────────────────────────────────────
+    @staticmethod
+    def _alive(pid):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except (OSError, IndexError):
+            return False
+
+    def _collect_files(self, cap):
+        pattern = re.sub(r"%[A-Za-z]", "*", cap.stem) + ".pcap*"
+        files = []
+        for path in sorted(glob.glob(pattern)):
+            if os.path.getmtime(path) < self.started_at - 1:
+                continue   # same point + seed from an earlier run
+            m = _PART_RE.match(path)
+            if m:
+                renamed = f"{m.group('base')[:-5]}_{int(m.group('part')):03d}.pcap"
+                os.replace(path, renamed)
+                path = renamed
+            files.append(path)
+        return sorted(files)
+
+    def _read_stats(self, cap):
+        try:
+            with open(cap.log_path) as f:
+                text = f.read()
+        except OSError:
+            return {}
+        stats = {}
+        for key, pattern in _STAT_PATTERNS.items():
+            m = pattern.search(text)
+            if m:
+                stats[key] = int(m.group(1))
+        return stats
+
+    def stop(self):
+        """SIGINT every capture, collect counters + files, write the manifest."""
+        info("\n*** Stopping captures\n")
+        for cap in self.captures:
+            if cap.pid and self._alive(cap.pid):
+                try:
+                    os.kill(cap.pid, signal.SIGINT)
+                except ProcessLookupError:
+                    pass
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while time.monotonic() < deadline and any(c.pid and self._alive(c.pid) for c in self.captures):
+            time.sleep(0.1)
+
+        for cap in self.captures:
+            cap.stats = self._read_stats(cap)
+            cap.files = self._collect_files(cap)
+            if os.path.exists(cap.log_path):
+                os.remove(cap.log_path)
+            size_mb = sum(os.path.getsize(f) for f in cap.files) / 1e6
+            dropped = cap.stats.get("dropped_kernel", 0) + cap.stats.get("dropped_interface", 0)
+            mark = "⚠️" if dropped else "📦"
+            info(f"{mark} {cap.point}: {cap.stats.get('captured', '?')} captured, "
+                 f"{cap.stats.get('dropped_kernel', '?')} dropped by kernel, "
+                 f"{cap.stats.get('dropped_interface', '?')} by interface — "
+                 f"{len(cap.files)} file(s), {size_mb:.1f} MB\n")
+
+        self.write_manifest()
+        return self.captures
+
+    def write_manifest(self):
+        tag = f"_{self.scenario}" if self.scenario else ""
+        ts = datetime.fromtimestamp(self.started_at).strftime('%Y%m%d_%H%M%S')
+        self.manifest_path = f"{self.output_dir}/capture_manifest_{self.seed}{tag}_{ts}.json"
+        manifest = {
+            "seed": self.seed,
+            "scenario": self.scenario,
+            "started_at": self.started_at,
+            "stopped_at": time.time(),
+            "settings": {
+                "snaplen": self.snaplen,
+                "buffer_kb": self.buffer_kb,
+                "rotate_mb": self.rotate_mb,
+                "rotate_seconds": self.rotate_seconds,
+                "max_files": self.max_files,
+                "profile": self.profile,
+                "profiles": self.profiles,
+            },
+            "captures": [c.as_dict() for c in self.captures],
+        }
+        with open(self.manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        info(f"*** Capture manifest -> {self.manifest_path}\n")
+        return self.manifest_path
+
+    def files(self, captures=None):
+        """All files produced by `captures` (default: every capture)."""
+        return [f for c in (captures or self.captures) for f in c.files]
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+latency_metrics.py — End-to-end publish → subscribe latency, loss, reordering
+=============================================================================
+Documentaion.txt lists "Latency (publish → subscribe)" as a target metric,
+but payloads carried no sequence number or send time, so latency could
+only be guessed from PCAPs.
+
+Publisher side — PayloadTagger (enabled with PUBLISHER_LATENCY_TAGS=1,
+OFF by default because it changes payload sizes in the dataset):
+  ecg_monitor:87.31bpm:Class=1               (default)
+  ecg_monitor:87.31bpm:Class=1:pub=h3-1234:seq=42:ts=<epoch ns>   (tagged)
+pub= names the tagger's process (PUBLISHER_CLIENT_PREFIX — the Mininet host
+name — or the hostname, plus the pid; publisher_engine adds the replica
+name): every tagger counts seq from 0, so two publishers of one sensor
+are two streams. All Mininet hosts share one kernel clock, so epoch send
+time and the subscriber's receive time are directly comparable.
+
+Subscriber side — LatencyAggregator, bounded memory:
+  • per-sensor and per-class LatencyHistogram (HDR-style log-linear buckets,
+    ~1.5% relative precision, µs resolution, sparse dict of buckets)
+  • sequence tracking per (publisher, sensor) stream: loss (gaps),
+    reordering (seq below the highest seen), duplicates (recent window
+    only), publisher restarts — summed per sensor, and per stream in
+    the JSON's per_stream section
+  • dump() → JSON file + one summary line per sensor/class, every
+    `dump_interval` seconds (sensor_subscriber.py --latency)
+"""
+
+import json
+import os
+import socket
+import time
+from collections import deque
+
+TAGS_ENV = "PUBLISHER_LATENCY_TAGS"
+PUBLISHER_ID_ENV = "PUBLISHER_CLIENT_PREFIX"   # per-host label, as in mqtt_client_pool
+
+
+def latency_tags_enabled():
+    return os.environ.get(TAGS_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def publisher_id(suffix=None):
+    """<PUBLISHER_CLIENT_PREFIX or hostname>-<pid>[-<suffix>], without ':'."""
+    label = os.environ.get(PUBLISHER_ID_ENV, "").strip() or socket.gethostname()
+    pid = f"{label}-{os.getpid()}" + (f"-{suffix}" if suffix else "")
+    return pid.replace(":", "-")
+
+
+# =====================================================================
+# Publisher side
+# =====================================================================
+
+class PayloadTagger:
+    """Appends :pub=<id>:seq=<n>:ts=<epoch ns> to one sensor's payloads."""
+
+    def __init__(self, publisher=None):
+        self.publisher = (publisher or publisher_id()).replace(":", "-")
+        self.seq = 0
+
+    def tag(self, payload):
+        tagged = f"{payload}:pub={self.publisher}:seq={self.seq}:ts={time.time_ns()}"
+        self.seq += 1
+        return tagged
+
+
+def parse_tags(payload):
+    """Return (publisher, seq, send_ns) from a tagged payload; None for missing
+    tags (publisher is None for payloads tagged before pub= existed)."""
+    publisher = seq = send_ns = None
+    for part in payload.rsplit(":", 3)[1:]:
+        if part.startswith("pub="):
+            publisher = part[4:]
+        elif part.startswith("seq="):
+            seq = int(part[4:])
+        elif part.startswith("ts="):
+            send_ns = int(part[3:])
+    return publisher, seq, send_ns
+
+
+# =====================================================================
+# HDR-style histogram
+# =====================================================================
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of non-negative integers (µs).
+
+    Values < 2·SUB map 1:1; above that each power of two is split into SUB
+    linear sub-buckets, so relative error is ≤ 1/SUB regardless of range.
+    Only non-empty buckets are stored.
+    """
+
+    SUB_BITS = 6
+    SUB      = 1 << SUB_BITS
+
+    def __init__(self):
+        self.counts = {}
+        self.total  = 0
+        self.min    = None
+        self.max    = 0
+        self.sum    = 0
+
+    def _index(self, v):
+        if v < 2 * self.SUB:
+            return v
+        e = v.bit_length() - self.SUB_BITS - 1
+        return 2 * self.SUB + (e - 1) * self.SUB + ((v >> e) - self.SUB)
+
+    def _value(self, idx):
+        if idx < 2 * self.SUB:
+            return idx
+        e, m = divmod(idx - 2 * self.SUB, self.SUB)
+        e += 1
+        return ((m + self.SUB) << e) + (1 << (e - 1))   # bucket midpoint
+
+    def record(self, v):
+        v = max(0, int(v))
+        idx = self._index(v)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        self.total += 1
+        self.sum += v
+        self.max = max(self.max, v)
+        self.min = v if self.min is None else min(self.min, v)
+
+    def percentile(self, p):
+        if not self.total:
+            return None
+        target = max(1, int(round(p / 100.0 * self.total)))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= target:
+                return min(self._value(idx), self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.total,
+            "min_us": self.min,
+            "mean_us": self.sum / self.total if self.total else None,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "p999_us": self.percentile(99.9),
+            "max_us": self.max if self.total else None,
+        }
+
+
+# =====================================================================
+# Per-sensor sequence + latency state
+# =====================================================================
+
+class SequenceTracker:
+    """Loss / reordering / duplicate counters for one (publisher, sensor) stream."""
+
+    WINDOW = 1024   # recent seqs kept for duplicate detection
+
+    def __init__(self):
+        self.highest    = None
+        self.base       = None
+        self.received   = 0
+        self.reordered  = 0
+        self.duplicates = 0
+        self.restarts   = 0
+        self._recent    = deque(maxlen=self.WINDOW)
+        self._recent_set = set()
+
+    def observe(self, seq):
+        """Returns False for a duplicate (already counted) sequence number."""
+        if self.highest is not None and seq == 0 and self.highest > 0:
+            # publisher restarted (tagger counters start at 0 again)
+            self.restarts += 1
+            self.highest = self.base = None
+            self._recent.clear()
+            self._recent_set.clear()
+        if seq in self._recent_set:
+            self.duplicates += 1
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(seq)
+        self._recent_set.add(seq)
+        self.received += 1
+        if self.highest is None:
+            self.highest = self.base = seq
+        elif seq > self.highest:
+            self.highest = seq
+        else:
+            self.reordered += 1
+        return True
+
+    @property
+    def expected(self):
+        return 0 if self.highest is None else self.highest - self.base + 1
+
+    @property
+    def lost(self):
+        return max(0, self.expected - self.received)
+
+    def as_dict(self):
+        expected = self.expected
+        return {
+            "received": self.received,
+            "expected": expected,
+            "lost": self.lost,
+            "loss_ratio": self.lost / expected if expected else 0.0,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "restarts": self.restarts,
+        }
+
+    @staticmethod
+    def combined(trackers):
+        """as_dict() counters summed over several streams (one sensor, many publishers)."""
+        keys = ("received", "expected", "lost", "reordered", "duplicates", "restarts")
+        total = {k: sum(t.as_dict()[k] for t in trackers) for k in keys}
+        total["loss_ratio"] = total["lost"] / total["expected"] if total["expected"] else 0.0
+        total["publishers"] = len(trackers)
+        return total
+
+
+class LatencyAggregator:
+    """Online latency / loss / reordering per sensor and per class."""
+
+    def __init__(self, out_path=None, dump_interval=30.0, log=print):
+        self.out_path      = out_path
+        self.dump_interval = dump_interval
+        self.log           = log
+        self.sensor_hist   = {}
+        self.class_hist    = {}
+        self.sequences     = {}   # (publisher, sensor) → SequenceTracker
+        self.untagged      = 0
+        self._last_dump    = time.monotonic()
+
+    def observe(self, recv_ns, sensor, class_id, payload):
+        publisher, seq, send_ns = parse_tags(payload)
+        if seq is None or send_ns is None:
+            self.untagged += 1
+            return
+        if not self.sequences.setdefault((publisher, sensor), SequenceTracker()).observe(seq):
+            return
+        latency_us = (recv_ns - send_ns) // 1000
+        self.sensor_hist.setdefault(sensor, LatencyHistogram()).record(latency_us)
+        self.class_hist.setdefault(class_id, LatencyHistogram()).record(latency_us)
+        if self.dump_interval and time.monotonic() - self._last_dump >= self.dump_interval:
+            self.dump()
+
+    def snapshot(self):
+        streams = {}
+        for (publisher, sensor), tracker in self.sequences.items():
+            streams.setdefault(sensor, []).append(tracker)
+        return {
+            "generated_at": time.time(),
+            "untagged_messages": self.untagged,
+            "per_sensor": {
+                sensor: {**hist.as_dict(), **SequenceTracker.combined(streams.get(sensor, []))}
+                for sensor, hist in sorted(self.sensor_hist.items())
+            },
+            "per_stream": {
+                f"{publisher or '-'}/{sensor}": tracker.as_dict()
+                for (publisher, sensor), tracker in sorted(self.sequences.items(),
+                                                           key=lambda kv: (str(kv[0][0]), kv[0][1]))
+            },
+            "per_class": {
+                str(cls): hist.as_dict() for cls, hist in sorted(self.class_hist.items())
+            },
+        }
+
+    def dump(self):
+        self._last_dump = time.monotonic()
+        snap = self.snapshot()
+        if self.out_path:
+            tmp = self.out_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(snap, f, indent=2)
+            os.replace(tmp, self.out_path)
+        for sensor, s in snap["per_sensor"].items():
+            self.log(f"[Latency] {sensor}: n={s['count']} p50={s['p50_us']}µs "
+                     f"p99={s['p99_us']}µs max={s['max_us']}µs lost={s['lost']} "
+                     f"reordered={s['reordered']} dup={s['duplicates']}")
+        for cls, s in snap["per_class"].items():
+            self.log(f"[Latency] Class={cls}: n={s['count']} p50={s['p50_us']}µs "
+                     f"p99={s['p99_us']}µs max={s['max_us']}µs")
+        return snap
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+mqtt_client_pool.py — Shared MQTT connections for multi-sensor publishers
+=========================================================================
+In `sensor_publisher.py ... all` every sensor thread used to open its own
+TCP connection + MQTT session → 14× CONNECT/CONNACK, 14× keepalive
+PINGREQ/PINGRESP and 14 broker sockets per host, all of which end up as
+control-plane noise in the capture.
+
+SharedClientPool keeps `size` connected clients (each with ONE loop_start()
+network thread) and hands them out round-robin to sensor threads.
+paho's publish() is thread-safe, so several sensor threads can publish on
+the same client; message ids / PUBACK tracking stay per connection.
+
+Sensors listed in `dedicated` keep their own client (client-id
+<prefix>-<sensor_key>), for the cases where a per-sensor MQTT session
+is part of what the dataset must show.
+
+connect_with_retry() is the startup connect used by the publishers: a
+broker that is not listening yet is retried with backoff (CONNECT_RETRY_MIN
+doubling up to CONNECT_RETRY_MAX) until it answers or stop_event is set,
+instead of the sensor giving up for the whole run.
+
+Environment (read by sensor_publisher.py):
+  PUBLISHER_POOL_SIZE   0 → legacy: one client per sensor (default)
+                        N → N shared clients for the whole process
+  PUBLISHER_DEDICATED   comma list of sensor keys, or class1..class4,
+                        that keep a per-sensor client even when pooled
+  PUBLISHER_CLIENT_PREFIX  per-host label in the client ids (<kind>-<label>-N);
+                        the collectors / scenario_runner set the Mininet host
+                        name. Mininet hosts share the root UTS namespace, so
+                        gethostname() is the same on every host and the
+                        fallback adds the pid — equal client ids make the
+                        broker drop the older session on every CONNECT.
+"""
+
+import os
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+
+CONNECT_RETRY_MIN = 0.2   # s
+CONNECT_RETRY_MAX = 5.0   # s
+CLIENT_PREFIX_ENV = "PUBLISHER_CLIENT_PREFIX"
+
+
+def connect_with_retry(client, broker_ip, broker_port, stop_event=None, on_error=None):
+    """client.connect() until it succeeds; False if stop_event was set first."""
+    delay = CONNECT_RETRY_MIN
+    while True:
+        try:
+            client.connect(broker_ip, broker_port)
+            return True
+        except OSError as e:
+            if on_error is not None:
+                on_error(e, delay)
+        if stop_event is None:
+            time.sleep(delay)
+        elif stop_event.wait(delay):
+            return False
+        delay = min(delay * 2, CONNECT_RETRY_MAX)
+
+
+def default_client_prefix(kind):
+    """<kind>-<PUBLISHER_CLIENT_PREFIX>, else <kind>-<hostname>-<pid> (unique per process)."""
+    label = os.environ.get(CLIENT_PREFIX_ENV, "").strip() or f"{socket.gethostname()}-{os.getpid()}"
+    return f"{kind}-{label}"
+
+
+def pool_size_from_env(default=0):
+    try:
+        return max(0, int(os.environ.get("PUBLISHER_POOL_SIZE", default)))
+    except ValueError:
+        return default
+
+
+def dedicated_from_env(sensor_config):
+    """Resolve PUBLISHER_DEDICATED into a set of SENSOR_CONFIG keys."""
+    raw = os.environ.get("PUBLISHER_DEDICATED", "")
+    keys = set()
+    for item in (x.strip().lower() for x in raw.split(",")):
+        if not item:
+            continue
+        if item.startswith("class") and item[5:].isdigit():
+            cls = int(item[5:])
+            keys.update(k for k, cfg in sensor_config.items() if cfg["class"] == cls)
+        elif item in sensor_config:
+            keys.add(item)
+    return keys
+
+
+class SharedClientPool:
+    """Round-robin pool of connected paho clients (one network thread each)."""
+
+    def __init__(self, broker_ip, broker_port, size=1, dedicated=(), client_prefix=None,
+                 stop_event=None, on_error=None):
+        self.broker_ip     = broker_ip
+        self.broker_port   = broker_port
+        self.size          = max(1, size)
+        self.dedicated     = set(dedicated)
+        self.client_prefix = client_prefix or default_client_prefix("pub")
+        self.stop_event    = stop_event   # set → connects retry until it fires
+        self.on_error      = on_error
+        self._shared       = []
+        self._own          = {}
+        self._next         = 0
+        self._lock         = threading.Lock()
+
+    def _new_client(self, client_id):
+        client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id=client_id,
+        )
+        # paho reconnects on its own inside loop_start(); no per-sensor retry loop
+        client.reconnect_delay_set(min_delay=1, max_delay=5)
+        if self.stop_event is None:
+            client.connect(self.broker_ip, self.broker_port)
+        elif not connect_with_retry(client, self.broker_ip, self.broker_port,
+                                    self.stop_event, self.on_error):
+            raise ConnectionError(f"stopped before {client_id} connected")
+        client.loop_start()
+        return client
+
+    def connect(self):
+        """Open the shared connections. Raises on the first failure
+        (with a stop_event: retries, raises only once it is set)."""
+        with self._lock:
+            while len(self._shared) < self.size:
+                self._shared.append(self._new_client(f"{self.client_prefix}-{len(self._shared)}"))
+
+    def client_for(self, sensor_key):
+        """Client a sensor thread should publish on."""
+        with self._lock:
+            if sensor_key in self.dedicated:
+                if sensor_key not in self._own:
+                    self._own[sensor_key] = self._new_client(f"{self.client_prefix}-{sensor_key}")
+                return self._own[sensor_key]
+            client = self._shared[self._next % len(self._shared)]
+            self._next += 1
+            return client
+
+    def close(self):
+        with self._lock:
+            clients = self._shared + list(self._own.values())
+            self._shared, self._own = [], {}
+        for client in clients:
+            client.loop_stop()
+            client.disconnect()
@@ -19,6 +19,45 @@ PCAP_DIR="/home/ictlab7/Documents/Learning_Mininet/PcapForExpt"
 OUTPUT_CSV="all_packets_extracted_s5.csv"
 SCENARIO_TAG="s5"
 
+# ── Incremental extraction (scripts/extraction_cache.py) ─────────────────────
+# Skips tshark when the chosen PCAP, the field list and this script are
+# unchanged since OUTPUT_CSV was written. FORCE=1 always re-extracts.
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+CACHE_PY="${SCRIPT_DIR}/scripts/extraction_cache.py"
+MANIFEST="${OUTPUT_CSV%.csv}.manifest.json"
+
+# ── Extractor: tshark (default) or native (scripts/pcap_features.py) ─────────
+# native parses Ethernet/IPv4/TCP/MQTT itself — same 16 columns, no tshark
+# dissection; compare with: python3 scripts/pcap_features.py <pcap> out.csv --benchmark
+EXTRACTOR="${EXTRACTOR:-tshark}"
+NATIVE_PY="${SCRIPT_DIR}/scripts/pcap_features.py"
+DEDUP_PY="${SCRIPT_DIR}/scripts/packet_dedup.py"
+MERGE_PY="${SCRIPT_DIR}/scripts/pcap_merge.py"
+
+# ── FLOWS=1: per-flow features from the extracted rows (scripts/flow_features.py)
+# One streaming pass → ${OUTPUT_CSV%.csv}_flows.csv, one row per flow per
+# FLOW_WINDOW seconds; flows idle for FLOW_IDLE seconds are evicted.
+FLOWS_PY="${SCRIPT_DIR}/scripts/flow_features.py"
+FLOWS_CSV="${OUTPUT_CSV%.csv}_flows.csv"
+run_flows() {
+    [ "${FLOWS:-0}" = "1" ] || return 0
+    echo "Aggregating flows → ${FLOWS_CSV} (window ${FLOW_WINDOW:-60}s, idle ${FLOW_IDLE:-30}s)..."
+    python3 "$FLOWS_PY" "${OUTPUT_CSV}" --out "${FLOWS_CSV}" \
+        --window "${FLOW_WINDOW:-60}" --idle "${FLOW_IDLE:-30}" || exit 1
+}
+
+# ── S1 exact field list — drives both the header and the tshark -e args ──────
+TSHARK_FIELDS=(
+    frame.number frame.time_epoch frame.time_delta frame.len
+    ip.src ip.dst ip.proto
+    tcp.srcport tcp.dstport tcp.len tcp.flags
+    mqtt.clientid mqtt.topic mqtt.qos mqtt.msgtype mqtt.msg
+)
+FIELDS_CSV=$(IFS=,; echo "${TSHARK_FIELDS[*]}")
+CACHE_FIELDS="${FIELDS_CSV},extractor=${EXTRACTOR}"
+E_ARGS=()
+for f in "${TSHARK_FIELDS[@]}"; do E_ARGS+=(-e "$f"); done
+
 # ── Find S5 pcap files ────────────────────────────────────────────────────────
 PCAP_FILES=$(ls "${PCAP_DIR}"/*_${SCENARIO_TAG}_*.pcap 2>/dev/null)
 
@@ -32,6 +71,21 @@ echo "Found S5 pcap files:"
 echo "$PCAP_FILES" | while read f; do echo "  $(ls -lh $f | awk '{print $5, $9}')"; done
 echo ""
 
+# ── DEDUP_ALL=1: every capture, one pass, copies collapsed ───────────────────
+# scripts/packet_dedup.py fingerprints packets across all non-loopback
+# captures and writes one canonical row per packet (same 16 columns) plus
+# per-hop observation times → *_hops.csv and per-hop latency → *_hops.json.
+if [ "${DEDUP_ALL:-0}" = "1" ]; then
+    DEDUP_INPUTS=$(echo "$PCAP_FILES" | grep -v '_lo_')
+    echo "Deduplicating $(echo "$DEDUP_INPUTS" | wc -l) captures → ${OUTPUT_CSV} ..."
+    python3 "$DEDUP_PY" $DEDUP_INPUTS --out "${OUTPUT_CSV}" \
+        --hops-out "${OUTPUT_CSV%.csv}_hops.csv" \
+        --summary-out "${OUTPUT_CSV%.csv}_hops.json" || exit 1
+    echo "✅ Done: ${OUTPUT_CSV} (all captures, deduplicated)"
+    run_flows
+    exit 0
+fi
+
 # ── Choose single best source — NO looping over all files ────────────────────
 # Looping over all 6 files causes 3–5× duplication (same packet seen on
 # broker-eth0, s3-eth1, h13-eth0, s1-eth1, s1-eth2 simultaneously).
@@ -54,42 +108,72 @@ else
     PCAP_TO_USE=$(echo "$PCAP_FILES" | grep -v '_lo_' | head -1)
     echo "⚠️  Fallback (non-loopback): $(basename $PCAP_TO_USE)"
 fi
+
+# ── Every rotated part of that capture ───────────────────────────────────────
+# capture_manager.py rotates at CAPTURE_ROTATE_MB (tcpdump -C): <stem>.pcap,
+# <stem>_001.pcap, ... — listed in the capture manifest, else found by name.
+PCAP_PARTS=$(python3 "$MERGE_PY" --parts-of "$PCAP_TO_USE")
+[ -n "$PCAP_PARTS" ] || PCAP_PARTS="$PCAP_TO_USE"
+N_PARTS=$(echo "$PCAP_PARTS" | wc -l)
+[ "$N_PARTS" -gt 1 ] && echo "📦 ${N_PARTS} rotated parts: $(echo $PCAP_PARTS | xargs -n1 basename | tr '\n' ' ')"
 echo ""
 
+PARTS_FIELDS="${CACHE_FIELDS},parts=${N_PARTS}"   # a new part → stale
+FRESH=1
+[ "${FORCE:-0}" = "1" ] && FRESH=0
+for part in $PCAP_PARTS; do
+    [ "$FRESH" = "1" ] || break
+    python3 "$CACHE_PY" check "$MANIFEST" "$part" "$OUTPUT_CSV" \
+        --fields "$PARTS_FIELDS" --script "$0" || FRESH=0
+done
+if [ "$FRESH" = "1" ]; then
+    echo "♻️  ${OUTPUT_CSV} is up to date with $(basename $PCAP_TO_USE) (${N_PARTS} part(s)) — skipping extraction (FORCE=1 to re-run)"
+    [ -f "${FLOWS_CSV}" ] || run_flows
+    exit 0
+fi
+
 # ── Write header — 16 columns, identical order to S1 ─────────────────────────
-echo "frame.number,frame.time_epoch,frame.time_delta,frame.len,ip.src,ip.dst,ip.proto,tcp.srcport,tcp.dstport,tcp.len,tcp.flags,mqtt.clientid,mqtt.topic,mqtt.qos,mqtt.msgtype,mqtt.msg" \
-    > "${OUTPUT_CSV}"
-
-echo "Converting $(basename $PCAP_TO_USE) → CSV (16 fields, S1-identical order)..."
-
-tshark -r "${PCAP_TO_USE}" \
-    -T fields \
-    -e frame.number \
-    -e frame.time_epoch \
-    -e frame.time_delta \
-    -e frame.len \
-    -e ip.src \
-    -e ip.dst \
-    -e ip.proto \
-    -e tcp.srcport \
-    -e tcp.dstport \
-    -e tcp.len \
-    -e tcp.flags \
-    -e mqtt.clientid \
-    -e mqtt.topic \
-    -e mqtt.qos \
-    -e mqtt.msgtype \
-    -e mqtt.msg \
-    -E header=n \
-    -E separator=, \
-    -E quote=d \
-    -E occurrence=f \
-    2>/dev/null >> "${OUTPUT_CSV}"
+echo "$FIELDS_CSV" > "${OUTPUT_CSV}"
+
+echo "Converting $(basename $PCAP_TO_USE) (${N_PARTS} part(s)) → CSV (16 fields, S1-identical order, ${EXTRACTOR})..."
+
+# A failed extraction leaves no CSV behind and records nothing in the cache,
+# so the next run retries it instead of skipping it as up to date.
+extraction_failed() {
+    echo "❌ Extraction of $2 failed (exit $1) — removed partial ${OUTPUT_CSV}" >&2
+    rm -f "${OUTPUT_CSV}"
+    exit 1
+}
+
+if [ "$EXTRACTOR" = "native" ]; then
+    if [ "$N_PARTS" -gt 1 ]; then
+        python3 "$MERGE_PY" $PCAP_PARTS --out "${OUTPUT_CSV}" || extraction_failed $? "$(basename $PCAP_TO_USE)"
+    else
+        python3 "$NATIVE_PY" "${PCAP_TO_USE}" "${OUTPUT_CSV}" || extraction_failed $? "$(basename $PCAP_TO_USE)"
+    fi
+else
+    for part in $PCAP_PARTS; do   # parts are consecutive in time — append in order
+        tshark -r "${part}" \
+            -T fields \
+            "${E_ARGS[@]}" \
+            -E header=n \
+            -E separator=, \
+            -E quote=d \
+            -E occurrence=f \
+            >> "${OUTPUT_CSV}" || extraction_failed $? "$(basename $part)"
+    done
+fi
 
+# every part extracted — only now mark them fresh
 ROWS=$(wc -l < "${OUTPUT_CSV}")
+for part in $PCAP_PARTS; do
+    python3 "$CACHE_PY" record "$MANIFEST" "$part" "$OUTPUT_CSV" \
+        --fields "$PARTS_FIELDS" --script "$0"
+done
 echo ""
 echo "✅ Done: ${OUTPUT_CSV}"
 echo "   Total rows (incl. header): ${ROWS}"
+run_flows
 
 # ── Verify column match ───────────────────────────────────────────────────────
 echo ""
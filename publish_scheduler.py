@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+publish_scheduler.py — Drift-free deadline scheduler for publish intervals
+==========================================================================
+The publishers used to do `publish → log → admin → time.sleep(interval)`,
+so the real period was interval + work time and drifted under load (the
+0.5s Class 3 sensors in S5_sensor_publisher.py visibly slip).
+
+DeadlineScheduler fires on an absolute monotonic grid instead:
+  deadline[k] = start + k * interval   (+ optional jitter, NOT accumulated)
+
+Late-tick policy (env PUBLISH_SCHEDULE_POLICY, default "catchup"):
+  catchup → missed deadlines fire back-to-back until the grid is reached,
+            so the long-run packet count matches the configured rate
+  skip    → missed deadlines are dropped (counted) and the next fire is
+            the next grid point in the future — never bursts
+
+Jitter (env PUBLISH_JITTER, fraction of interval, default 0):
+  each fire is offset by uniform(-j, +j) * interval around its grid point
+
+ScheduleStats tracks, per sensor, achieved rate vs configured interval,
+lateness and skipped ticks; summary() is logged by the publishers every
+STATS_PERIOD seconds and at shutdown.
+
+Usage (threads):                         Usage (asyncio engine):
+  sched = DeadlineScheduler(1.0)           sched = DeadlineScheduler(1.0)
+  while not stop_event.is_set():           while not stop.is_set():
+      publish()                                publish()
+      sched.sleep(stop_event)                  await sched.wait_async(stop)
+"""
+
+import math
+import os
+import random
+import time
+
+CATCHUP = "catchup"
+SKIP    = "skip"
+POLICIES = (CATCHUP, SKIP)
+
+STATS_PERIOD = 60.0   # seconds between periodic summary() log lines
+
+
+def policy_from_env(default=CATCHUP):
+    policy = os.environ.get("PUBLISH_SCHEDULE_POLICY", default).strip().lower()
+    return policy if policy in POLICIES else default
+
+
+def jitter_from_env(default=0.0):
+    try:
+        return max(0.0, min(0.5, float(os.environ.get("PUBLISH_JITTER", default))))
+    except ValueError:
+        return default
+
+
+class ScheduleStats:
+    """Achieved rate / lateness bookkeeping for one scheduled sensor."""
+
+    def __init__(self, name, interval):
+        self.name          = name
+        self.interval      = interval
+        self.fires         = 0
+        self.skipped       = 0
+        self.first_fire    = None
+        self.last_fire     = None
+        self.lateness_sum  = 0.0
+        self.lateness_max  = 0.0
+        self._last_report  = time.monotonic()
+
+    def record(self, fired_at, nominal):
+        if self.first_fire is None:
+            self.first_fire = fired_at
+        self.last_fire = fired_at
+        self.fires += 1
+        late = max(0.0, fired_at - nominal)
+        self.lateness_sum += late
+        if late > self.lateness_max:
+            self.lateness_max = late
+
+    @property
+    def achieved_interval(self):
+        if self.fires < 2:
+            return None
+        return (self.last_fire - self.first_fire) / (self.fires - 1)
+
+    @property
+    def achieved_rate(self):
+        achieved = self.achieved_interval
+        return 1.0 / achieved if achieved else 0.0
+
+    def should_report(self, period=STATS_PERIOD):
+        now = time.monotonic()
+        if now - self._last_report >= period:
+            self._last_report = now
+            return True
+        return False
+
+    def summary(self):
+        achieved = self.achieved_interval
+        mean_late = self.lateness_sum / self.fires if self.fires else 0.0
+        if achieved is None:
+            rate = "n/a"
+        else:
+            rate = (f"{achieved:.4f}s ({1.0 / achieved:.3f} msg/s, "
+                    f"{(achieved - self.interval) / self.interval * 100:+.2f}%)")
+        return (f"[Schedule] {self.name}: configured={self.interval}s achieved={rate} "
+                f"fires={self.fires} skipped={self.skipped} "
+                f"late_mean={mean_late * 1000:.2f}ms late_max={self.lateness_max * 1000:.2f}ms")
+
+    def as_dict(self):
+        return {
+            "sensor": self.name,
+            "interval": self.interval,
+            "achieved_interval": self.achieved_interval,
+            "achieved_rate": self.achieved_rate,
+            "fires": self.fires,
+            "skipped": self.skipped,
+            "lateness_mean": self.lateness_sum / self.fires if self.fires else 0.0,
+            "lateness_max": self.lateness_max,
+        }
+
+
+class DeadlineScheduler:
+    """Absolute-deadline ticker on time.monotonic()."""
+
+    def __init__(self, interval, name="sensor", policy=None, jitter=None, rng=None, start=None):
+        self.interval = float(interval)
+        self.policy   = policy or policy_from_env()
+        self.jitter   = jitter_from_env() if jitter is None else jitter
+        self.rng      = rng or random.Random()
+        self.stats    = ScheduleStats(name, self.interval)
+        self._tick    = 0
+        self._start   = time.monotonic() if start is None else start
+        self._nominal = self._start
+        self._fire_at = self._start
+        self.stats.record(self._start, self._start)   # first publish happens at start
+
+    def reset(self):
+        """Restart the grid at now (after a reconnect gap — no catch-up burst)."""
+        self._tick    = 0
+        self._start   = time.monotonic()
+        self._nominal = self._fire_at = self._start
+        if self.stats.fires <= 1:
+            # nothing published yet — the grid start is the first fire
+            self.stats.first_fire = self.stats.last_fire = self._start
+
+    def _advance(self, now):
+        """Move to the next grid point; returns the absolute time to fire at."""
+        self._tick += 1
+        nominal = self._start + self._tick * self.interval
+        if self.policy == SKIP and now > nominal:
+            # round up: the next fire is a grid point at or after now
+            missed = math.ceil((now - nominal) / self.interval)
+            self._tick += missed
+            self.stats.skipped += missed
+            nominal = self._start + self._tick * self.interval
+        self._nominal = nominal
+        offset = self.rng.uniform(-self.jitter, self.jitter) * self.interval if self.jitter else 0.0
+        self._fire_at = nominal + offset
+        return self._fire_at
+
+    def delay(self):
+        """Seconds to wait until the next deadline (0 when behind)."""
+        now = time.monotonic()
+        return max(0.0, self._advance(now) - now)
+
+    def _fired(self):
+        self.stats.record(time.monotonic(), self._fire_at)
+
+    def sleep(self, stop_event=None):
+        """Block until the next deadline. Returns False if stop_event was set."""
+        delay = self.delay()
+        if stop_event is not None:
+            if delay > 0 and stop_event.wait(delay):
+                return False
+            if stop_event.is_set():
+                return False
+        elif delay > 0:
+            time.sleep(delay)
+        self._fired()
+        return True
+
+    async def wait_async(self, stop=None):
+        """asyncio variant of sleep(); stop is an asyncio.Event."""
+        import asyncio   # only the engine needs it — keeps threaded publisher startup light
+        delay = self.delay()
+        if stop is not None:
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            if stop.is_set():
+                return False
+        elif delay > 0:
+            await asyncio.sleep(delay)
+        self._fired()
+        return True
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+publisher_engine.py — Single-process, single-event-loop multi-sensor publisher
+==============================================================================
+`sensor_publisher.py ... all` starts one OS thread + one mqtt.Client (with
+its own loop_start() network thread) per sensor → ~28 threads per host,
+~400 threads for the 14-host topology.
+
+This engine runs every sensor as a timer on ONE asyncio event loop:
+  • paho's socket callbacks are bridged onto the event loop (add_reader /
+    add_writer + a 1s loop_misc() task), so there is no network thread at
+    all — one network loop per broker connection, all on the same loop
+  • sensors are spread round-robin over --connections broker connections
+    (default 1); each connection reconnects on its own after 5s
+  • --replicas N simulates N copies of every selected sensor
+    (ecg_monitor, ecg_monitor_1, ...) so hundreds of sensors fit in one process
+
+Payload / topic / QoS format is identical to sensor_publisher.py:
+  topic   sensor/<sensor_key>          qos=1
+  payload <sensor_key>:<value><unit>:Class=<N>
+  admin   admin/heartbeat <value>      qos=0 every ADMIN_INTERVAL per sensor
+
+Usage:
+  python3 publisher_engine.py <BROKER_IP> <TOPIC> <SENSOR_NAME|all>
+                              [--profile s1|s5] [--replicas N] [--connections N]
+  e.g.  python3 publisher_engine.py 10.0.0.2 sensors all --replicas 20
+"""
+
+import argparse
+import asyncio
+import random
+import signal
+import socket
+
+import paho.mqtt.client as mqtt
+
+from latency_metrics import PayloadTagger, latency_tags_enabled, publisher_id
+from mqtt_client_pool import default_client_prefix
+from publish_scheduler import DeadlineScheduler
+from publisher_log import get_logger, log_path, ERROR, INFO, MESSAGE
+from sensor_config import EXPERIMENT_SEED, ADMIN_VALUES, ADMIN_INTERVAL, PROFILES
+
+BROKER_PORT     = 1883
+RECONNECT_DELAY = 5.0     # seconds, same as S5_sensor_publisher.py
+MISC_INTERVAL   = 1.0     # seconds between loop_misc() calls (keepalive/retries)
+
+
+# =====================================================================
+# paho ↔ asyncio bridge (one per broker connection)
+# =====================================================================
+
+class AsyncioMqttConnection:
+    """One mqtt.Client whose network I/O is driven by the asyncio loop."""
+
+    def __init__(self, loop, client_id, broker_ip, broker_port, log):
+        self.loop        = loop
+        self.client_id   = client_id
+        self.broker_ip   = broker_ip
+        self.broker_port = broker_port
+        self.log         = log
+        self.connected   = asyncio.Event()
+        self._misc_task  = None
+        self._closing    = False
+
+        self.client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id=client_id,
+        )
+        self.client.on_connect                 = self._on_connect
+        self.client.on_disconnect              = self._on_disconnect
+        self.client.on_socket_open             = self._on_socket_open
+        self.client.on_socket_close            = self._on_socket_close
+        self.client.on_socket_register_write   = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    # ── socket callbacks ──────────────────────────────────────────────
+    def _on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self._misc_task = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def _misc_loop(self):
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(MISC_INTERVAL)
+            except asyncio.CancelledError:
+                break
+
+    # ── MQTT callbacks ────────────────────────────────────────────────
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        self.log.log(f"[Engine] {self.client_id} connected to "
+                     f"{self.broker_ip}:{self.broker_port} ({reason_code})", INFO)
+        self.connected.set()
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected.clear()
+        if not self._closing:
+            self.log.log(f"[Engine] Disconnected ({reason_code}) — reconnecting in "
+                         f"{RECONNECT_DELAY:.0f}s", ERROR)
+            self.loop.create_task(self._reconnect())
+
+    # ── lifecycle ─────────────────────────────────────────────────────
+    async def connect(self):
+        while not self._closing:
+            try:
+                if self.client.is_connected() or self.connected.is_set():
+                    return
+                # connect() only opens the TCP socket; CONNECT/CONNACK run on the loop
+                self.client.connect(self.broker_ip, self.broker_port)
+                self.client.socket().setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 16)
+                return
+            except Exception as e:
+                self.log.log(f"[Engine] Connection to {self.broker_ip}:{self.broker_port} "
+                             f"failed: {e} — retrying in {RECONNECT_DELAY:.0f}s", ERROR)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _reconnect(self):
+        await asyncio.sleep(RECONNECT_DELAY)
+        await self.connect()
+
+    def publish(self, topic, payload, qos):
+        return self.client.publish(topic, payload, qos=qos)
+
+    def close(self):
+        self._closing = True
+        self.client.disconnect()
+
+
+# =====================================================================
+# Sensors
+# =====================================================================
+
+class SimulatedSensor:
+    """Value generator + publish timer for one (possibly replicated) sensor."""
+
+    def __init__(self, name, sensor_key, cfg, connection, log):
+        self.name        = name
+        self.sensor_key  = sensor_key
+        self.cfg         = cfg
+        self.connection  = connection
+        self.log         = log
+        self.topic       = f"sensor/{sensor_key}"
+        self.seed        = EXPERIMENT_SEED + hash(name) % 10000   # same formula as publishers
+        self.rng         = random.Random(self.seed)
+        self.sched       = DeadlineScheduler(cfg["interval"], name=name,
+                                         rng=random.Random(self.seed + 1))
+        self.tagger      = PayloadTagger(publisher_id(name)) if latency_tags_enabled() else None
+        self.published   = 0
+        self.failed      = 0
+
+    def next_payload(self):
+        cfg = self.cfg
+        if "values" in cfg:
+            value = self.rng.choice(cfg["values"])
+        else:
+            value = round(self.rng.uniform(cfg["min"], cfg["max"]), 2)
+        payload = f"{self.sensor_key}:{value}{cfg.get('unit', '')}:Class={cfg['class']}"
+        return self.tagger.tag(payload) if self.tagger is not None else payload
+
+    async def run(self, stop):
+        loop       = asyncio.get_running_loop()
+        last_admin = loop.time()
+        await self.connection.connected.wait()
+        self.log.log(f"[Engine] {self.name}: started (Class={self.cfg['class']}, "
+                     f"interval={self.cfg['interval']}s, seed={self.seed})", INFO)
+        self.sched.reset()
+
+        while not stop.is_set():
+            payload = self.next_payload()
+            result  = self.connection.publish(self.topic, payload, qos=1)
+            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                self.published += 1
+                self.log.log(f"[Publisher] {self.name}: {payload}", MESSAGE)
+            else:
+                self.failed += 1
+                self.log.log(f"[Publisher] {self.name}: Publish error rc={result.rc}", ERROR)
+
+            if loop.time() - last_admin >= ADMIN_INTERVAL:
+                admin_value = self.rng.choice(ADMIN_VALUES)
+                self.connection.publish("admin/heartbeat", admin_value, qos=0)
+                self.log.log(f"[Publisher] (Admin) {admin_value}", MESSAGE)
+                last_admin = loop.time()
+
+            if self.sched.stats.should_report():
+                self.log.log(self.sched.stats.summary(), INFO)
+            await self.sched.wait_async(stop)
+
+
+# =====================================================================
+# Engine
+# =====================================================================
+
+class PublisherEngine:
+    """Owns the broker connections and every sensor timer of this process."""
+
+    def __init__(self, broker_ip, sensor_keys, sensor_config, replicas=1,
+                 connections=1, broker_port=BROKER_PORT, log_file=None, client_prefix=None):
+        self.broker_ip     = broker_ip
+        self.broker_port   = broker_port
+        self.sensor_keys   = list(sensor_keys)
+        self.sensor_config = sensor_config
+        self.replicas      = max(1, replicas)
+        self.n_connections = max(1, connections)
+        # Mininet hosts share one hostname — default is per process (PUBLISHER_CLIENT_PREFIX or pid)
+        self.client_prefix = client_prefix or default_client_prefix("engine")
+        self.log           = get_logger(log_file or log_path("engine_publisher"))
+        self.connections   = []
+        self.sensors       = []
+
+    def _build(self, loop):
+        self.connections = [
+            AsyncioMqttConnection(loop, f"{self.client_prefix}-{i}",
+                                  self.broker_ip, self.broker_port, self.log)
+            for i in range(self.n_connections)
+        ]
+        idx = 0
+        for replica in range(self.replicas):
+            for sensor_key in self.sensor_keys:
+                name = sensor_key if replica == 0 else f"{sensor_key}_{replica}"
+                conn = self.connections[idx % self.n_connections]
+                self.sensors.append(SimulatedSensor(
+                    name, sensor_key, self.sensor_config[sensor_key], conn, self.log))
+                idx += 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        self._build(loop)
+        self.log.log(f"[Engine] {len(self.sensors)} sensors over "
+                     f"{len(self.connections)} connection(s) to "
+                     f"{self.broker_ip}:{self.broker_port}", INFO)
+
+        for conn in self.connections:
+            await conn.connect()
+
+        tasks = [loop.create_task(s.run(stop)) for s in self.sensors]
+        await stop.wait()
+        self.log.log("[Engine] Stop requested — shutting down", INFO)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for conn in self.connections:
+            conn.close()
+        # let DISCONNECT packets drain through the loop
+        await asyncio.sleep(0.2)
+
+        for sensor in self.sensors:
+            self.log.log(sensor.sched.stats.summary(), INFO)
+        total = sum(s.published for s in self.sensors)
+        failed = sum(s.failed for s in self.sensors)
+        self.log.log(f"[Engine] Stopped cleanly. published={total} failed={failed}", INFO)
+
+
+def resolve_sensors(sensor_arg, sensor_config, aliases):
+    """Map the CLI sensor argument to a list of SENSOR_CONFIG keys."""
+    sensor_arg = sensor_arg.lower()
+    if sensor_arg == "all":
+        return list(sensor_config.keys())
+    keys = []
+    for name in sensor_arg.split(","):
+        key = aliases.get(name, name)
+        if key not in sensor_config:
+            raise ValueError(f"Unknown sensor '{name}'. Valid: {list(sensor_config.keys())}")
+        keys.append(key)
+    return keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="asyncio multi-sensor MQTT publisher")
+    parser.add_argument("broker_ip")
+    parser.add_argument("topic", help="kept for CLI parity with sensor_publisher.py")
+    parser.add_argument("sensor", help="sensor name, alias, comma list or 'all'")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="s1")
+    parser.add_argument("--replicas", type=int, default=1)
+    parser.add_argument("--connections", type=int, default=1)
+    parser.add_argument("--port", type=int, default=BROKER_PORT)
+    parser.add_argument("--client-prefix", default=None,
+                        help="MQTT client ids <prefix>-N (default engine-$PUBLISHER_CLIENT_PREFIX "
+                             "or engine-<hostname>-<pid>)")
+    args = parser.parse_args(argv)
+
+    sensor_config, aliases = PROFILES[args.profile]
+    try:
+        sensor_keys = resolve_sensors(args.sensor, sensor_config, aliases)
+    except ValueError as e:
+        parser.error(str(e))
+
+    random.seed(EXPERIMENT_SEED)
+    engine = PublisherEngine(
+        args.broker_ip, sensor_keys, sensor_config,
+        replicas=args.replicas, connections=args.connections, broker_port=args.port,
+        client_prefix=args.client_prefix,
+        log_file=log_path(f"{args.sensor.lower().replace(',', '_')}_engine_publisher"),
+    )
+    asyncio.run(engine.run())
+
+
+if __name__ == "__main__":
+    main()
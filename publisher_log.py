@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+publisher_log.py — Buffered, batched log backend for the sensor publishers
+==========================================================================
+The publishers used to open /tmp/<sensor>_publisher.log, write one line and
+close it again for every PUBLISH (twice, counting the [SeedConfig] line).
+With `sensor_publisher.py ... all` on 14 hosts that is 14 threads × 14
+processes doing open/write/close + strftime + a flushed print per message.
+
+This module keeps ONE long-lived file handle per log path per process:
+  • log() only formats the line and appends it to an in-memory ring buffer
+  • a background writer thread drains the buffer on a size threshold
+    (flush_lines) or a time threshold (flush_interval), whichever first
+  • the stdout echo (captured by the collectors into OUTPUT_LOG_DIR) is
+    written by the same thread in the same batch
+  • if the writer falls behind, the ring buffer overwrites the oldest
+    lines and counts them as dropped instead of blocking the publisher
+
+Verbosity (env PUBLISHER_LOG_VERBOSITY, or set_verbosity()):
+  quiet    → only errors
+  info     → connect / disconnect / start / stop lines
+  message  → everything, incl. per-PUBLISH and [SeedConfig] lines (default)
+
+Log files go to $PUBLISHER_LOG_DIR (scenario_runner sets it to the spec's
+log_dir), else /tmp: log_path("all_publisher") → <dir>/all_publisher.log.
+
+Usage:
+  from publisher_log import get_logger, log_path, INFO, MESSAGE
+  _log = get_logger(log_path("all_publisher"))
+  _log.log("[Publisher] Connected ...", INFO)
+  _log.log(f"[Publisher] {sensor_key}: {payload}", MESSAGE)
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# ── Verbosity levels ─────────────────────────────────────────────────────────
+ERROR   = 0
+INFO    = 1
+MESSAGE = 2
+
+VERBOSITY_NAMES = {"quiet": ERROR, "info": INFO, "message": MESSAGE}
+
+DEFAULT_CAPACITY       = 8192    # lines held in the ring buffer
+DEFAULT_FLUSH_LINES    = 256     # wake the writer once this many are pending
+DEFAULT_FLUSH_INTERVAL = 1.0     # seconds — max age of a buffered line
+
+
+def verbosity_from_env(default=MESSAGE):
+    """Read PUBLISHER_LOG_VERBOSITY (quiet / info / message or 0–2)."""
+    raw = os.environ.get("PUBLISHER_LOG_VERBOSITY", "").strip().lower()
+    if not raw:
+        return default
+    if raw in VERBOSITY_NAMES:
+        return VERBOSITY_NAMES[raw]
+    try:
+        return max(ERROR, min(MESSAGE, int(raw)))
+    except ValueError:
+        return default
+
+
+class BufferedLogWriter:
+    """One file handle + ring buffer + background writer thread."""
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY,
+                 flush_lines=DEFAULT_FLUSH_LINES,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 echo=True, verbosity=None):
+        self.path           = path
+        self.flush_lines    = flush_lines
+        self.flush_interval = flush_interval
+        self.echo           = echo
+        self.verbosity      = verbosity_from_env() if verbosity is None else verbosity
+        self.dropped        = 0
+
+        self._buffer     = deque(maxlen=capacity)
+        self._lock       = threading.Lock()   # buffer — held only to append / swap
+        self._write_lock = threading.Lock()   # file + echo — one drain at a time, in order
+        self._wakeup     = threading.Event()
+        self._closed     = threading.Event()
+        self._file       = open(path, "a", buffering=1 << 16)
+
+        # Timestamp cache — strftime only once per wall-clock second
+        self._ts_second = -1
+        self._ts_text   = ""
+
+        self._writer = threading.Thread(
+            target=self._run, name=f"log-writer:{os.path.basename(path)}", daemon=True
+        )
+        self._writer.start()
+
+    # ── Producer side (publisher threads) ─────────────────────────────────
+    def enabled(self, level):
+        return level <= self.verbosity
+
+    def log(self, msg, level=INFO):
+        if level > self.verbosity or self._closed.is_set():
+            return
+        now = int(time.time())
+        with self._lock:
+            if now != self._ts_second:
+                self._ts_second = now
+                self._ts_text   = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(f"[{self._ts_text}] {msg}\n")
+            pending = len(self._buffer)
+        if pending >= self.flush_lines:
+            self._wakeup.set()
+
+    # ── Writer side ───────────────────────────────────────────────────────
+    def _drain(self):
+        # flush() on a caller's thread and the writer thread may drain at the
+        # same time: swap and write under _write_lock so batches stay in order;
+        # producers only wait on _lock, never on the file
+        with self._write_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                lines = list(self._buffer)
+                self._buffer.clear()
+            chunk = "".join(lines)
+            self._file.write(chunk)
+            self._file.flush()
+            if self.echo:
+                try:
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                except (OSError, ValueError):
+                    pass   # stdout closed by the collector — file log still works
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+
+    def flush(self):
+        self._drain()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        self._writer.join(timeout=self.flush_interval + 1.0)
+        self._drain()
+        with self._write_lock:
+            if self.dropped:
+                self._file.write(f"[log] {self.dropped} lines dropped (ring buffer full)\n")
+            self._file.close()
+
+
+# ── Log location ─────────────────────────────────────────────────────────────
+LOG_DIR_ENV     = "PUBLISHER_LOG_DIR"
+DEFAULT_LOG_DIR = "/tmp"
+
+
+def log_path(name):
+    """<$PUBLISHER_LOG_DIR or /tmp>/<name>.log"""
+    return os.path.join(os.environ.get(LOG_DIR_ENV, "").strip() or DEFAULT_LOG_DIR, f"{name}.log")
+
+
+# ── Process-wide registry: one writer per path ───────────────────────────────
+_writers      = {}
+_writers_lock = threading.Lock()
+
+
+def get_logger(path, **kwargs):
+    """Return the shared BufferedLogWriter for `path`, creating it on first use."""
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = BufferedLogWriter(path, **kwargs)
+            _writers[path] = writer
+        return writer
+
+
+def set_verbosity(level):
+    """Change verbosity of every open writer (e.g. drop per-message lines)."""
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.verbosity = level
+
+
+@atexit.register
+def close_all():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
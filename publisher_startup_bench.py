@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+publisher_startup_bench.py — Time-to-first-PUBLISH for the publisher scripts
+============================================================================
+Scenarios launch one python3 per sensor, so how fast a publisher gets from
+exec() to its first PUBLISH decides how long bring-up takes (and how much of
+the capture start is missing sensors). This launches N publishers at once
+against a minimal in-process MQTT listener on loopback — no mosquitto, no
+Mininet — and records, per MQTT connection, the time from launch to the
+first PUBLISH it sends.
+
+The listener answers CONNECT with CONNACK, PUBLISH qos 1 with PUBACK and
+PINGREQ with PINGRESP; that is all the publishers need. It binds port 1883
+(the publishers' BROKER_PORT), so stop a local mosquitto first.
+
+Reported per script:
+  import_ms         importing the module alone (no argv, no side effects)
+  first / median / p95 / last_ms
+                    launch → first PUBLISH over all connections; "last" is
+                    when the whole batch was publishing
+  connections       connections that published (sensor_publisher.py "all"
+                    opens one per sensor unless PUBLISHER_POOL_SIZE is set)
+
+Usage:
+  python3 publisher_startup_bench.py                         # S5_sensor_publisher.py × 16
+  python3 publisher_startup_bench.py --count 50 --script sensor_publisher.py --sensor all
+  python3 publisher_startup_bench.py --script S5_sensor_publisher.py --script sensor_publisher_s5.py
+"""
+
+import argparse
+import errno
+import json
+import os
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sensor_config import PROFILES
+
+BROKER_PORT    = 1883
+STARTUP_WAIT   = 30.0   # s — give up on publishers that never PUBLISH
+STOP_TIMEOUT   = 5.0    # s — SIGINT → kill
+DEFAULT_SCRIPT = "S5_sensor_publisher.py"
+
+CONNACK  = b"\x20\x02\x00\x00"
+PINGRESP = b"\xd0\x00"
+
+
+# =====================================================================
+# Minimal MQTT listener
+# =====================================================================
+
+def _read_packet(rfile):
+    """(first byte, body) of one MQTT control packet, or None at EOF."""
+    head = rfile.read(1)
+    if not head:
+        return None
+    length, shift = 0, 0
+    while True:
+        b = rfile.read(1)
+        if not b:
+            return None
+        length |= (b[0] & 0x7F) << shift
+        shift += 7
+        if not b[0] & 0x80:
+            break
+    return head[0], rfile.read(length)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        first = None
+        while True:
+            packet = _read_packet(self.rfile)
+            if packet is None:
+                return
+            kind, body = packet
+            ptype, qos = kind >> 4, (kind >> 1) & 0x03
+            if ptype == 1:                                  # CONNECT
+                self.wfile.write(CONNACK)
+            elif ptype == 3:                                # PUBLISH
+                if first is None:
+                    first = time.perf_counter()
+                    with server.lock:
+                        server.first_publish.append(first)
+                if qos:
+                    topic_len = int.from_bytes(body[:2], "big")
+                    self.wfile.write(b"\x40\x02" + body[2 + topic_len:4 + topic_len])   # PUBACK
+            elif ptype == 12:                               # PINGREQ
+                self.wfile.write(PINGRESP)
+            elif ptype == 14:                               # DISCONNECT
+                return
+
+
+class FakeBroker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=BROKER_PORT):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.first_publish = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+# =====================================================================
+# Measurements
+# =====================================================================
+
+def import_ms(script, repeat=5):
+    """Median wall time of `import <module>` in a fresh interpreter
+    (None if importing it exits or fails — e.g. argv parsed at import)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    module = os.path.splitext(os.path.basename(script))[0]
+    code = ("import time; t = time.perf_counter(); import " + module +
+            "; print((time.perf_counter() - t) * 1000)")
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    samples.sort()
+    return round(samples[len(samples) // 2], 1)
+
+
+def _sensors_for(script, sensor, count):
+    if sensor:
+        return [sensor] * count
+    profile = "s5" if "s5" in script.lower() else "s1"
+    keys = list(PROFILES[profile][0])
+    return [keys[i % len(keys)] for i in range(count)]
+
+
+def _quantile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def time_to_first_publish(script, count, sensor=None, host="127.0.0.1"):
+    here = os.path.dirname(os.path.abspath(__file__))
+    broker = FakeBroker(host)
+    env = dict(os.environ, PUBLISHER_LOG_VERBOSITY="quiet")
+    procs = []
+    try:
+        start = time.perf_counter()
+        for name in _sensors_for(script, sensor, count):
+            procs.append(subprocess.Popen([sys.executable, os.path.join(here, script), host, "sensors", name],
+                                          cwd=here, env=env,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        deadline = start + STARTUP_WAIT
+        # one connection per process (more with "all"); wait until that many published
+        while len(broker.first_publish) < count and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.2)   # late extra connections of "all" publishers
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.send_signal(signal.SIGINT)
+        for p in procs:
+            try:
+                p.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        broker.close()
+    ms = sorted((t - start) * 1000 for t in broker.first_publish)
+    if not ms:
+        return {"script": script, "processes": count, "connections": 0}
+    return {
+        "script": script,
+        "processes": count,
+        "connections": len(ms),
+        "first_ms": round(ms[0], 1),
+        "median_ms": round(ms[len(ms) // 2], 1),
+        "p95_ms": round(_quantile(ms, 0.95), 1),
+        "last_ms": round(ms[-1], 1),
+    }
+
+
+def benchmark(scripts, count, sensor=None, host="127.0.0.1", out_dir="."):
+    results = []
+    for script in scripts:
+        row = time_to_first_publish(script, count, sensor, host)
+        row["import_ms"] = import_ms(script)
+        results.append(row)
+        if not row["connections"]:
+            print(f"❌ {script}: no PUBLISH within {STARTUP_WAIT:g}s")
+            continue
+        imported = "   n/a" if row["import_ms"] is None else f"{row['import_ms']:6.1f}"
+        print(f"⏱️  {script:<26} ×{count:<4} import {imported} ms  first PUBLISH: "
+              f"first {row['first_ms']:7.1f}  median {row['median_ms']:7.1f}  "
+              f"p95 {row['p95_ms']:7.1f}  last {row['last_ms']:7.1f} ms  ({row['connections']} conn)")
+
+    path = os.path.join(out_dir, f"publisher_startup_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({"count": count, "sensor": sensor, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+    print(f"✅ Benchmark → {path}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Launch → first PUBLISH time for the publisher scripts")
+    parser.add_argument("--script", action="append", default=None,
+                        help=f"publisher script (repeatable, default {DEFAULT_SCRIPT})")
+    parser.add_argument("--count", type=int, default=16, help="publishers launched at once")
+    parser.add_argument("--sensor", default=None, help="sensor name or 'all' (default: cycle the profile)")
+    parser.add_argument("--host", default="127.0.0.1", help="loopback address the listener binds")
+    parser.add_argument("--out", default=".", help="directory for the JSON result")
+    args = parser.parse_args(argv)
+    try:
+        benchmark(args.script or [DEFAULT_SCRIPT], args.count, args.sensor, args.host, args.out)
+    except OSError as e:
+        if e.errno == errno.EADDRINUSE:
+            raise SystemExit(f"❌ port {BROKER_PORT} in use on {args.host} — stop mosquitto first")
+        raise
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
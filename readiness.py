@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+readiness.py — Bring-up probes instead of fixed sleeps
+======================================================
+The collectors used to sleep 3s after starting mosquitto and 1–2s between
+every step. These probes poll until the thing is actually ready (or the
+timeout passes), so bring-up takes as long as it needs and no longer.
+
+Every probe runs `ss` inside a Mininet node, i.e. it reads the node's own
+socket table — no probe connection is opened, so nothing extra appears in
+the captures:
+
+  wait_listening(broker, 1883)              mosquitto has the port open
+  wait_clients(broker, 1883, ["10.0.0.3"])  those IPs hold an ESTABLISHED
+                                            connection to the broker port
+                                            (subscriber / publishers connected)
+
+CaptureManager.wait_ready() covers "tcpdump is capturing" (its
+"listening on <intf>" line). Each wait returns the seconds it took and
+raises TimeoutError naming what is still missing.
+"""
+
+import time
+
+READY_TIMEOUT = 15.0   # s
+POLL_INTERVAL = 0.1    # s
+
+
+def wait_until(check, timeout=READY_TIMEOUT, what="condition", interval=POLL_INTERVAL):
+    """Poll check() until it returns something truthy; seconds waited.
+
+    check() may return a falsy value or a (ready, detail) pair — `detail`
+    goes into the TimeoutError message."""
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        result = check()
+        ready, detail = result if isinstance(result, tuple) else (result, "")
+        if ready:
+            return time.monotonic() - start
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"{what} not ready after {timeout:g}s{f' ({detail})' if detail else ''}")
+        time.sleep(interval)
+
+
+def _peer_ip(addr):
+    """'10.0.0.3:45678' / '[::ffff:10.0.0.3]:45678' → '10.0.0.3'."""
+    ip = addr.rsplit(":", 1)[0].strip("[]")
+    return ip[7:] if ip.startswith("::ffff:") else ip
+
+
+def listening(node, port):
+    return bool(node.cmd(f"ss -Hltn 'sport = :{port}'").strip())
+
+
+def connected_peers(node, port):
+    """Remote IPs with an ESTABLISHED TCP connection to `port` on `node`."""
+    out = node.cmd(f"ss -Htn state established '( sport = :{port} )'")
+    return {_peer_ip(line.split()[-1]) for line in out.splitlines() if line.strip()}
+
+
+def wait_listening(node, port, timeout=READY_TIMEOUT):
+    return wait_until(lambda: listening(node, port), timeout, f"{node.name}:{port} listener")
+
+
+def wait_clients(node, port, ips, timeout=READY_TIMEOUT, what="clients"):
+    wanted = set(ips)
+
+    def check():
+        missing = wanted - connected_peers(node, port)
+        return not missing, "missing " + ", ".join(sorted(missing))
+
+    return wait_until(check, timeout, f"{what} → {node.name}:{port}")
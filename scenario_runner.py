@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+scenario_runner.py — One runner for every collector scenario
+============================================================
+BaseCode_Mqtt_Collector.py, S5_Mqtt_Collector.py and
+S5_Mqtt_Collector_fixed.py each hard-code hosts, IPs, links, captures,
+publishers and background load, with scenario variants living in
+commented-out blocks. Here a scenario is data (scenarios/*.json, or YAML
+when PyYAML is installed) and this runner builds it:
+
+  {
+    "name": "s5", "seed": 2025, "duration": 0,          # 0 → until Ctrl+C
+    "output_dir": ".../PcapForExpt", "log_dir": ".../mqtt_capture",
+    "link_bw": 10,                                       # Mbit/s default (0 → no shaping)
+    "stp": false,                  # true → standalone OVS bridges with STP (looped topologies)
+    "node_prefix": "", "controller_port": 6653,         # set per slot by sweep_runner.py
+    "switches": ["s1", "s2", "s3"],
+    "switch_links": [{"a": "s2", "b": "s1"}, {"a": "s3", "b": "s1", "bw": 10, "delay": "1ms"}],
+    "hosts": {"broker": {"ip": "10.0.0.2/8", "switch": "s3"}, ...},
+    "broker":     {"host": "broker", "port": 1883},
+    "subscriber": {"host": "monitor", "store": "text"},
+    "publishers": [{"host": "h9", "sensor": "infusion_pump",
+                    "script": "S5_sensor_publisher.py", "delay": 0, "env": {},
+                    "await_previous": false, "wait": true}],
+    "publisher_env": {"PUBLISHER_POOL_SIZE": "0"},   # on top of EXPERIMENT_SEED=<seed>, PUBLISHER_LOG_DIR=<log_dir>
+    "publisher_mode": "process",   # "agent" → sensor_agent.py, one preforked agent per host
+    "background": [{"type": "ping", "src": "monitor", "dst": "broker"},
+                   {"type": "iperf_server", "host": "broker"},
+                   {"type": "iperf", "src": "h12", "dst": "broker", "rate": "1M", "duration": 600},
+                   {"type": "emergency_bursts", "host": "h1", "dst": "broker",
+                    "duration": 180, "prob": 0.10}],
+    "captures": {"settings": {"buffer_kb": 8192, "rotate_mb": 500, "profile": "all"},
+                 "points": [{"node": "s1", "intf": "*"},       # every non-lo interface
+                            {"node": "s2", "intf": "first", "snaplen": "headers"},   # first non-lo
+                            {"node": "broker", "profile": "mqtt+icmp"}]},   # default intf
+    "connectivity": "all" | "none" | ["h9", "broker", ...],
+    "ready_timeout": 15,                                 # s per readiness probe
+    "order": ["captures", "broker", "subscriber",
+              "background", "publishers", "connectivity"]
+  }
+
+Steps end on readiness probes (readiness.py), not fixed sleeps: switches
+connected to the controller, every tcpdump "listening on", the broker port
+listening, the subscriber and each publisher host ESTABLISHED to the broker
+("await_previous" holds a publisher until all earlier ones are connected;
+"wait": false skips one). A probe that misses ready_timeout aborts the run
+through the normal teardown. "sleep:N" steps still exist for deliberate gaps.
+
+Host references ("dst") may be host names or literal IPs. Every process
+the runner starts is tracked by pid and stopped at teardown — no global
+pkill — and the resolved spec is saved next to the capture manifest.
+
+"publisher_mode": "agent" replaces the one-interpreter-per-publisher
+launch with sensor_agent.AgentPool: one agent per host, forked from a
+preimported zygote into the host's network namespace, with each sensor
+added over its control socket. "script" then only picks the sensor
+profile ("profile" overrides it); per-publisher "env" is not supported.
+
+node_prefix lets several runs share one kernel: Mininet names (and so veth
+and OVS bridge names) become <prefix><name>, while spec references, capture
+file names and manifest points keep the plain names.
+
+Usage:
+  sudo python3 scenario_runner.py scenarios/s5_fixed.json [--duration 300]
+  python3 scenario_runner.py scenarios/s5_fixed.json --check      # validate only
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from readiness import READY_TIMEOUT, wait_clients, wait_listening
+
+sys.stdout.reconfigure(line_buffering=True)
+
+DEFAULT_ORDER = ["captures", "broker", "subscriber",
+                 "background", "publishers", "connectivity"]
+BACKGROUND_TYPES = ("ping", "iperf_server", "iperf", "emergency_bursts")
+PUBLISHER_MODES = ("process", "agent")
+SNAPLEN_NAMES = {"full": 262144, "headers": 128}   # capture_manager.SNAPLEN_FULL / SNAPLEN_HEADERS
+IFNAMSIZ = 15                                      # Linux interface name limit
+
+
+# =====================================================================
+# Spec loading + validation (no Mininet needed)
+# =====================================================================
+
+def load_scenario(path):
+    """Read a JSON (or YAML) scenario file, apply defaults, validate."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml   # optional — JSON specs need nothing extra
+            except ImportError:
+                raise SystemExit(f"❌ {path}: YAML scenarios need PyYAML (pip install pyyaml) — or use JSON")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    return validate(with_defaults(spec))
+
+
+def with_defaults(spec):
+    spec = dict(spec)
+    spec.setdefault("name", "scenario")
+    spec.setdefault("seed", 2025)
+    spec.setdefault("duration", 0)
+    spec.setdefault("output_dir", "/home/ictlab7/Documents/Learning_Mininet/PcapForExpt")
+    spec.setdefault("log_dir", "/home/ictlab7/Documents/Learning_Mininet/mqtt_capture")
+    spec.setdefault("link_bw", 10)
+    spec.setdefault("stp", False)
+    spec.setdefault("controller_port", 6653)
+    spec.setdefault("node_prefix", "")
+    spec.setdefault("switch_links", [])
+    spec.setdefault("publishers", [])
+    spec.setdefault("publisher_env", {})
+    spec.setdefault("publisher_mode", "process")
+    spec.setdefault("background", [])
+    spec.setdefault("captures", {})
+    spec["captures"].setdefault("settings", {})
+    spec["captures"].setdefault("points", [])
+    spec.setdefault("connectivity", "all")
+    spec.setdefault("order", list(DEFAULT_ORDER))
+    spec.setdefault("broker", {})
+    spec["broker"].setdefault("port", 1883)
+    spec.setdefault("subscriber", None)
+    spec.setdefault("ready_timeout", READY_TIMEOUT)
+    return spec
+
+
+def validate(spec):
+    """Raise ValueError listing every problem in the spec."""
+    errors = []
+    switches = set(spec.get("switches") or [])
+    hosts = spec.get("hosts") or {}
+    if not switches:
+        errors.append("no switches")
+    if not hosts:
+        errors.append("no hosts")
+    nodes = switches | set(hosts)
+
+    ips = {}
+    for name, h in hosts.items():
+        if h.get("switch") not in switches:
+            errors.append(f"host {name}: unknown switch {h.get('switch')!r}")
+        ip = str(h.get("ip", "")).split("/")[0]
+        if not ip:
+            errors.append(f"host {name}: missing ip")
+        elif ip in ips:
+            errors.append(f"host {name}: ip {ip} already used by {ips[ip]}")
+        else:
+            ips[ip] = name
+    for link in spec["switch_links"]:
+        for end in (link.get("a"), link.get("b")):
+            if end not in switches:
+                errors.append(f"switch link: unknown switch {end!r}")
+    if not spec["stp"] and switches and len(spec["switch_links"]) >= len(switches):
+        errors.append("switch links form a loop — set \"stp\": true")
+
+    def check_host(where, name):
+        if name not in hosts:
+            errors.append(f"{where}: unknown host {name!r}")
+
+    def check_target(where, target):
+        if target not in hosts and not re.fullmatch(r"\d+\.\d+\.\d+\.\d+", str(target)):
+            errors.append(f"{where}: {target!r} is neither a host nor an IP")
+
+    check_host("broker", spec["broker"].get("host"))
+    if spec["subscriber"]:
+        check_host("subscriber", spec["subscriber"].get("host"))
+    for i, p in enumerate(spec["publishers"]):
+        check_host(f"publisher #{i}", p.get("host"))
+        if not p.get("sensor"):
+            errors.append(f"publisher #{i}: missing sensor")
+        if spec["publisher_mode"] == "agent" and p.get("env"):
+            errors.append(f"publisher #{i}: per-publisher env needs \"publisher_mode\": \"process\"")
+    if spec["publisher_mode"] not in PUBLISHER_MODES:
+        errors.append(f"publisher_mode must be one of {', '.join(PUBLISHER_MODES)}")
+    for i, bg in enumerate(spec["background"]):
+        kind = bg.get("type")
+        if kind not in BACKGROUND_TYPES:
+            errors.append(f"background #{i}: type must be one of {', '.join(BACKGROUND_TYPES)}")
+            continue
+        for key in ("src", "host"):
+            if key in bg:
+                check_host(f"background #{i}", bg[key])
+        if "dst" in bg:
+            check_target(f"background #{i}", bg["dst"])
+    for i, cp in enumerate(spec["captures"]["points"]):
+        if cp.get("node") not in nodes:
+            errors.append(f"capture #{i}: unknown node {cp.get('node')!r}")
+        snaplen = cp.get("snaplen")
+        if isinstance(snaplen, str) and snaplen not in SNAPLEN_NAMES:
+            errors.append(f"capture #{i}: snaplen must be an int or one of {', '.join(SNAPLEN_NAMES)}")
+    conn = spec["connectivity"]
+    if isinstance(conn, list):
+        for name in conn:
+            check_host("connectivity", name)
+    elif conn not in ("all", "none"):
+        errors.append("connectivity must be 'all', 'none' or a list of hosts")
+    for step in spec["order"]:
+        if not (step in DEFAULT_ORDER or re.fullmatch(r"sleep:\d+(\.\d+)?", step)):
+            errors.append(f"order: unknown step {step!r}")
+
+    prefix = spec["node_prefix"]
+    ports = {name: 1 for name in nodes}      # a host has eth0; a switch one port per link
+    for link in spec["switch_links"]:
+        for end in (link.get("a"), link.get("b")):
+            ports[end] = ports.get(end, 0) + 1
+    for h in hosts.values():
+        ports[h.get("switch")] = ports.get(h.get("switch"), 0) + 1
+    for name in sorted(nodes):
+        last = ports[name] - 1 if name in hosts else ports[name]
+        if len(f"{prefix}{name}-eth{last}") > IFNAMSIZ:
+            errors.append(f"node {prefix}{name}: interface names would exceed {IFNAMSIZ} chars")
+
+    if errors:
+        raise ValueError("Invalid scenario:\n  - " + "\n  - ".join(errors))
+    return spec
+
+
+# =====================================================================
+# Runner
+# =====================================================================
+
+class ScenarioRunner:
+    """Builds and runs one scenario spec on Mininet; tracks what it starts."""
+
+    def __init__(self, spec):
+        self.spec     = spec
+        self.tag      = f"{spec['name']}_{spec['seed']}"
+        self.prefix   = spec["node_prefix"]
+        self.tmp_tag  = f"{self.prefix}{self.tag}"   # /tmp files, unique per concurrent run
+        self.net      = None
+        self.nodes    = {}
+        self.procs    = []     # Popen handles (publishers)
+        self.pids     = []     # (node, pid) of `cmd ... &` processes
+        self.captures = None
+        self.agents   = None   # sensor_agent.AgentPool ("publisher_mode": "agent")
+        self.started  = []     # IPs of publishers launched so far (readiness probes)
+        self.rng      = random.Random(spec["seed"])
+        self._stop    = threading.Event()
+
+    # ── Helpers ──────────────────────────────────────────────────────
+    def ip_of(self, target):
+        host = self.spec["hosts"].get(target)
+        return host["ip"].split("/")[0] if host else target
+
+    def _log(self, name):
+        return f"{self.spec['log_dir']}/{name}_{self.spec['name']}.log"
+
+    def _publisher_env(self):
+        """EXPERIMENT_SEED and PUBLISHER_LOG_DIR from the spec, overridable by publisher_env."""
+        env = {"EXPERIMENT_SEED": self.spec["seed"], "PUBLISHER_LOG_DIR": self.spec["log_dir"],
+               **self.spec["publisher_env"]}
+        return {k: str(v) for k, v in env.items()}
+
+    def _background_cmd(self, node, cmd):
+        out = node.cmd(f"{cmd} & echo $!")
+        pids = re.findall(r"\d+", out)
+        if pids:
+            self.pids.append((node, int(pids[-1])))
+
+    # ── Topology ─────────────────────────────────────────────────────
+    def build(self):
+        from mininet.net import Mininet
+        from mininet.node import Controller, OVSBridge, OVSSwitch
+        from mininet.link import TCLink
+        from mininet.log import info
+
+        spec = self.spec
+        self.net = net = Mininet(controller=Controller, switch=OVSSwitch, link=TCLink, autoSetMacs=True)
+        info('\n*** Adding controller\n')
+        net.addController('c0', port=spec["controller_port"])
+
+        info('\n*** Adding switches\n')
+        for i, name in enumerate(spec["switches"]):
+            # explicit dpid — Mininet would take the first number of the name, i.e. the prefix
+            nums = re.findall(r"\d+", name)
+            dpid = f"{int(nums[0]) if nums else i + 1:016x}"
+            if spec["stp"]:   # no controller: learning bridges, STP blocks the redundant ports
+                self.nodes[name] = net.addSwitch(f"{self.prefix}{name}", cls=OVSBridge, stp=True, dpid=dpid)
+            else:
+                self.nodes[name] = net.addSwitch(f"{self.prefix}{name}", dpid=dpid)
+        info('\n*** Adding hosts\n')
+        for name, h in spec["hosts"].items():
+            self.nodes[name] = net.addHost(f"{self.prefix}{name}", ip=h["ip"])
+
+        info('\n*** Creating links\n')
+        for link in spec["switch_links"]:
+            net.addLink(self.nodes[link["a"]], self.nodes[link["b"]], **self._link_opts(link))
+        for name, h in spec["hosts"].items():
+            net.addLink(self.nodes[name], self.nodes[h["switch"]], **self._link_opts(h))
+
+        info('\n*** Starting network\n')
+        net.start()
+        for name in spec["hosts"]:
+            node = self.nodes[name]
+            for intf in node.intfList():
+                if 'lo' not in intf.name:
+                    node.cmd(f'ifconfig {intf} up')
+        if not net.waitConnected(timeout=spec["ready_timeout"]):
+            raise TimeoutError(f"switches not {'forwarding (STP)' if spec['stp'] else 'connected to the controller'} "
+                               f"after {spec['ready_timeout']}s")
+
+    def _link_opts(self, cfg):
+        bw = cfg.get("bw", self.spec["link_bw"])
+        opts = {"bw": bw} if bw else {}
+        for key in ("delay", "loss", "jitter", "max_queue_size"):
+            if key in cfg:
+                opts[key] = cfg[key]
+        return opts
+
+    # ── Steps ────────────────────────────────────────────────────────
+    def step_captures(self):
+        from mininet.log import info
+        from capture_manager import CaptureManager
+
+        spec = self.spec
+        settings = dict(spec["captures"]["settings"])
+        if isinstance(settings.get("snaplen"), str):
+            settings["snaplen"] = SNAPLEN_NAMES[settings["snaplen"]]
+        self.captures = CaptureManager(spec["output_dir"], spec["seed"], scenario=spec["name"], **settings)
+        info('\n*** Starting captures\n')
+        for cp in spec["captures"]["points"]:
+            node = self.nodes[cp["node"]]
+            snaplen = cp.get("snaplen")
+            snaplen = SNAPLEN_NAMES.get(snaplen, snaplen) if snaplen is not None else None
+            intf = cp.get("intf", "default")
+            ports = [i for i in node.intfList() if 'lo' not in i.name]
+            if intf == "*":
+                intfs = ports
+            elif intf == "first":
+                intfs = ports[:1]   # intfList()[0] of a switch is its loopback
+            elif intf == "default":
+                intfs = [node.defaultIntf()]
+            else:
+                intfs = [f"{self.prefix}{intf}" if intf.startswith(cp["node"]) else intf]
+            for i in intfs:
+                self.captures.start(node, i, snaplen, cp.get("profile"), name=cp["node"])
+        waited = self.captures.wait_ready(spec["ready_timeout"])
+        info(f"✅ {len(self.captures.captures)} captures listening ({waited:.1f}s)\n")
+
+    def step_broker(self):
+        from mininet.log import info
+        b = self.spec["broker"]
+        host = self.nodes[b["host"]]
+        conf_file = f"/tmp/mosquitto_{self.tmp_tag}.conf"
+        host.cmd(f"echo 'listener {b['port']} 0.0.0.0\nallow_anonymous true' > {conf_file}")
+        self._background_cmd(host, f"mosquitto -c {conf_file} -v > {self._log('mosquitto')} 2>&1")
+        waited = wait_listening(host, b["port"], self.spec["ready_timeout"])
+        info(f"✅ MQTT broker started at {self.ip_of(b['host'])}:{b['port']} ({waited:.1f}s)\n")
+
+    def step_subscriber(self):
+        from mininet.log import info
+        sub = self.spec["subscriber"]
+        if not sub:
+            return
+        args = ["--store", sub.get("store", "text")] + [str(a) for a in sub.get("args", [])]
+        log_dir, name = self.spec["log_dir"], self.spec["name"]
+        for flag, path in (("--log", self._log("sensor_subscriber_messages")),
+                           ("--out", f"{log_dir}/sensor_subscriber_{name}"),
+                           ("--latency-out", f"{log_dir}/subscriber_latency_{name}.json")):
+            if flag not in args:   # spec args win
+                args += [flag, path]
+        log_file = self._log("sensor_subscriber")
+        self._background_cmd(self.nodes[sub["host"]],
+                             f"python3 sensor_subscriber.py {' '.join(args)} > {log_file} 2>&1")
+        waited = self._wait_connected([sub["host"]], "subscriber")
+        info(f"✅ MQTT subscriber connected from {sub['host']} ({waited:.1f}s), log: {log_file}\n")
+
+    def _wait_connected(self, hosts, what):
+        b = self.spec["broker"]
+        return wait_clients(self.nodes[b["host"]], b["port"], [self.ip_of(h) for h in hosts],
+                            self.spec["ready_timeout"], what)
+
+    def step_publishers(self):
+        from mininet.log import info
+        spec = self.spec
+        broker_ip = self.ip_of(spec["broker"]["host"])
+        for p in spec["publishers"]:
+            if p.get("await_previous") and self.started:
+                self._wait_connected(self.started, "earlier publishers")
+            if p.get("delay"):
+                time.sleep(p["delay"])
+            host = self.nodes[p["host"]]
+            if spec["publisher_mode"] == "agent":
+                self._add_to_agent(host, p, broker_ip)
+                continue
+            log_file = self._log(f"sensor_publisher_{p.get('name', p['sensor'])}")
+            env = dict(os.environ, **self._publisher_env())
+            env["PUBLISHER_CLIENT_PREFIX"] = host.name   # per-host MQTT client ids (mqtt_client_pool.py)
+            env.update({k: str(v) for k, v in p.get("env", {}).items()})
+            self.procs.append(host.popen(
+                ["python3", p.get("script", "sensor_publisher.py"), broker_ip,
+                 p.get("topic", "sensors"), p["sensor"]] + [str(a) for a in p.get("args", [])],
+                stdout=open(log_file, "w"),
+                stderr=open(log_file.replace(".log", ".err"), "w"),
+                env=env,
+            ))
+            if p.get("wait", True):
+                self.started.append(p["host"])
+            info(f"✅ Publisher {p['sensor']} started on {p['host']}, log: {log_file}\n")
+        if self.started:
+            waited = self._wait_connected(self.started, "publishers")
+            info(f"✅ {len(set(self.started))} publisher host(s) connected ({waited:.1f}s)\n")
+
+    def _add_to_agent(self, host, p, broker_ip):
+        from mininet.log import info
+        from sensor_agent import AgentPool
+        if self.agents is None:
+            self.agents = AgentPool(self.tmp_tag, self.spec["log_dir"], env=self._publisher_env())
+        script = p.get("script", "sensor_publisher.py")
+        profile = p.get("profile") or ("s5" if "s5" in script.lower() else "s1")
+        extra = {"name": p["name"]} if p.get("name") and p["sensor"] != "all" else {}
+        added = self.agents.add(host, p["sensor"], broker_ip, self.spec["broker"]["port"],
+                                profile=profile, **extra)
+        if p.get("wait", True):
+            self.started.append(p["host"])
+        info(f"✅ Publisher {p['sensor']} ({len(added)} sensor(s)) added to agent on {p['host']}\n")
+
+    def step_background(self):
+        from mininet.log import info
+        for bg in self.spec["background"]:
+            if bg.get("delay"):
+                time.sleep(bg["delay"])
+            kind = bg["type"]
+            if kind == "ping":
+                dst = self.ip_of(bg["dst"])
+                log_file = self._log(f"monitor_ping_{bg['src']}")
+                self._background_cmd(self.nodes[bg["src"]], f"ping {dst} > {log_file} 2>&1")
+                info(f"📡 Ping monitoring started ({bg['src']} → {dst})\n")
+            elif kind == "iperf_server":
+                self._background_cmd(self.nodes[bg["host"]], "iperf -s -u > /dev/null 2>&1")
+                info(f"📡 iperf UDP server started on {bg['host']}\n")
+            elif kind == "iperf":
+                dst = self.ip_of(bg["dst"])
+                rate, duration = bg.get("rate", "1M"), bg.get("duration", 600)
+                log_file = self._log(f"iperf_{bg['src']}")
+                self._background_cmd(self.nodes[bg["src"]],
+                                     f"iperf -u -c {dst} -b {rate} -t {duration} > {log_file} 2>&1")
+                info(f"📶 iperf background: {bg['src']} → {dst} @ {rate}\n")
+            elif kind == "emergency_bursts":
+                threading.Thread(target=self._emergency_bursts, args=(bg,), daemon=True).start()
+                info(f"🚨 Emergency ping bursts armed on {bg['host']} (p={bg.get('prob', 0.05)}/s)\n")
+
+    def _emergency_bursts(self, bg):
+        from mininet.log import info
+        host, dst = self.nodes[bg["host"]], self.ip_of(bg["dst"])
+        for _ in range(int(bg.get("duration", 120))):
+            if self._stop.is_set():
+                return
+            if self.rng.random() < bg.get("prob", 0.05):
+                info("🚨 Emergency event triggered!\n")
+                self.procs.append(host.popen(
+                    ["ping", "-c", str(bg.get("count", 20)), "-i", str(bg.get("interval", 0.05)), dst],
+                    stdout=open(f"/tmp/emergency_ping_{self.tmp_tag}.log", "w"),
+                    stderr=open(f"/tmp/emergency_ping_{self.tmp_tag}.err", "w"),
+                ))
+            time.sleep(1)
+
+    def step_connectivity(self):
+        from mininet.log import info
+        conn = self.spec["connectivity"]
+        if conn == "none":
+            return
+        info('\n*** Verifying connectivity\n')
+        if conn == "all":
+            self.net.pingAll()
+        else:
+            self.net.ping([self.nodes[h] for h in conn])
+
+    # ── Lifecycle ────────────────────────────────────────────────────
+    def run(self, duration=None):
+        from mininet.log import info
+
+        spec = self.spec
+        os.makedirs(spec["output_dir"], exist_ok=True)
+        os.makedirs(spec["log_dir"], exist_ok=True)
+        duration = spec["duration"] if duration is None else duration
+        try:
+            self.build()   # inside try: a failed net.start / shaping still tears down bridges and veths
+            for step in spec["order"]:
+                if step.startswith("sleep:"):
+                    time.sleep(float(step[6:]))
+                else:
+                    getattr(self, f"step_{step}")()
+            self.save_spec()
+            info(f"\n*** Scenario {spec['name']} running — "
+                 f"{f'{duration}s' if duration else 'Ctrl+C to stop'} ***\n")
+            deadline = time.monotonic() + duration if duration else None
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            info(f"\n*** Caught Ctrl+C, shutting down {spec['name']}...\n")
+        finally:
+            self.teardown()
+
+    def teardown(self):
+        from mininet.log import info
+        info("\n*** Stopping background processes...\n")
+        self._stop.set()
+        for p in self.procs:
+            if p.poll() is None:
+                p.terminate()
+        for node, pid in self.pids:
+            node.cmd(f"kill {pid} 2>/dev/null")
+        if self.agents is not None:
+            self.agents.stop()
+        if self.captures is not None:
+            self.captures.stop()
+        for p in self.procs:
+            try:
+                p.wait(timeout=5)
+            except Exception:
+                p.kill()
+        info("\n*** Stopping network\n")
+        if self.net is not None:
+            self.net.stop()
+        info(f"\n*** {self.spec['name']} simulation ended cleanly.\n")
+
+    def save_spec(self):
+        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = f"{self.spec['output_dir']}/scenario_{self.tag}_{ts}.json"
+        with open(path, "w") as f:
+            json.dump(self.spec, f, indent=2)
+        return path
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a declarative Mininet MQTT scenario")
+    parser.add_argument("spec", help="scenario file (.json, or .yaml with PyYAML)")
+    parser.add_argument("--duration", type=float, default=None, help="seconds (overrides the spec; 0 = until Ctrl+C)")
+    parser.add_argument("--check", action="store_true", help="validate the spec and exit")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_scenario(args.spec)
+    except ValueError as e:
+        print(f"❌ {args.spec}: {e}")
+        return 1
+    if args.check:
+        print(f"✅ {args.spec}: {len(spec['hosts'])} hosts, {len(spec['publishers'])} publishers, "
+              f"{len(spec['captures']['points'])} capture points")
+        return 0
+
+    from mininet.log import setLogLevel, info
+    setLogLevel('info')
+    info(f"\n*** Starting scenario {spec['name']} (seed {spec['seed']}) ***\n")
+    signal.signal(signal.SIGTERM, _interrupt)   # sweep drivers stop runs with SIGTERM
+    ScenarioRunner(spec).run(args.duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,19 @@ to
 	 1. Remove labellling logic
 	 2. added validattion in  mqtt_extract_and_validate_all					
 """
+import argparse
 import os
 import subprocess
-import pandas as pd
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dataset_store import ParquetDatasetWriter, PartitionMap, pyarrow_available
+from dataset_summary import DatasetSummary
+from extraction_cache import ExtractionCache
+from pipeline_profile import PROFILERS, PipelineProfile, count_lines, profiler, wait_with_rusage
+from packet_labels import LABEL_COLUMNS, label_frame
+from streaming_merge import stream_merge_dedup
 
 # === CONFIGURATION ===
 BASE_DIR = "/home/ictlab7/Documents/Learning_Mininet"
@@ -18,7 +27,29 @@ EXTRACT_SCRIPT = os.path.join(BASE_DIR, "extract_pcap_to_csv_labeled.sh")
 #EXTRACT_SCRIPT = os.path.join(BASE_DIR, "mqtt_extract_and_validate_all.sh")#Changed
 
 OUTPUT_FILE = os.path.join(CSV_DIR, "all_labeled_data_clean.csv")
+OUTPUT_DATASET = os.path.join(CSV_DIR, "all_labeled_data_clean.parquet")   # scenario=/seed= partitions
 SUMMARY_FILE = os.path.join(CSV_DIR, "dataset_summary.txt")
+SUMMARY_JSON = os.path.join(CSV_DIR, "dataset_summary.json")
+PROFILE_DIR = os.path.join(CSV_DIR, "profiles")   # pipeline_profile_<ts>.json per run
+
+EXTRACT_WORKERS = os.cpu_count() or 1   # parallel extraction processes
+FAIL_FAST = False                       # True → stop all extraction on the first failure
+
+# Incremental extraction: skip PCAPs whose CSV is up to date (see extraction_cache.py)
+MANIFEST_FILE = os.path.join(CSV_DIR, "extraction_manifest.json")
+CSV_NAME_TEMPLATE = "{stem}_labeled.csv"   # CSV the extraction script writes per PCAP
+TSHARK_FIELDS = [
+    "frame.number", "frame.time_epoch", "frame.time_delta", "frame.len",
+    "ip.src", "ip.dst", "ip.proto",
+    "tcp.srcport", "tcp.dstport", "tcp.len", "tcp.flags",
+    "mqtt.clientid", "mqtt.topic", "mqtt.qos", "mqtt.msgtype", "mqtt.msg",
+]
+
+MERGE_MEMORY_BUDGET_MB = 1024   # dedup hash set budget; above it the merge spills to disk
+MERGE_CHUNK_ROWS = 200_000      # rows per read_csv chunk
+LABEL_PACKETS = True            # add sensor/value/unit/priority_class while merging (packet_labels.py)
+WRITE_PARQUET = True            # typed, partitioned Parquet dataset (dataset_store.py; needs pyarrow)
+WRITE_CSV = False               # optional CSV export of the same rows
 
 DUPLICATE_KEYS = [
     "frame.time_relative", "ip.src", "ip.dst",
@@ -26,8 +57,65 @@ DUPLICATE_KEYS = [
 ]
 
 
-def run_extraction_script():
-    """Run extraction shell script for ALL PCAP files."""
+def _list_pcaps():
+    return sorted([
+        os.path.join(PCAP_DIR, f)
+        for f in os.listdir(PCAP_DIR)
+        if f.endswith(".pcap") or f.endswith(".pcapng")
+    ])
+
+
+def _csv_for(pcap):
+    stem = os.path.splitext(os.path.basename(pcap))[0]
+    return os.path.join(CSV_DIR, CSV_NAME_TEMPLATE.format(stem=stem))
+
+
+def _extract_one(pcap, cancel, procs, lock, fail_fast=False):
+    """Run EXTRACT_SCRIPT on one PCAP, streaming its output line by line."""
+    name = os.path.basename(pcap)
+    start = time.time()
+    if cancel.is_set():
+        return pcap, None, 0.0, None
+
+    proc = subprocess.Popen(
+        ["bash", EXTRACT_SCRIPT, pcap],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,   # interleave warnings with progress, in order
+        text=True,
+        bufsize=1,
+        cwd=BASE_DIR,
+    )
+    with lock:
+        # fail-fast may have fired between the check above and Popen — the
+        # main thread only terminates procs it can see, so stop this one here
+        if cancel.is_set():
+            proc.terminate()
+            proc.stdout.close()
+            proc.wait()
+            return pcap, None, 0.0, None
+        procs.add(proc)
+    try:
+        for line in proc.stdout:
+            with lock:
+                print(f"   [{name}] {line.rstrip()}", flush=True)
+        returncode, usage = wait_with_rusage(proc)   # + CPU / peak RSS of bash + tshark
+        if returncode != 0 and fail_fast:
+            cancel.set()   # before this worker can pick up the next PCAP
+    finally:
+        with lock:
+            procs.discard(proc)
+    return pcap, returncode, time.time() - start, usage
+
+
+def _dir_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def run_extraction_script(workers=EXTRACT_WORKERS, fail_fast=FAIL_FAST, use_cache=True, profile=None):
+    """Run extraction shell script for ALL PCAP files, `workers` at a time.
+    `profile` (pipeline_profile.PipelineProfile) gets one record per extracted PCAP."""
     print(f"🚀 Running extraction script on PCAP directory: {PCAP_DIR}")
 
     if not os.path.exists(EXTRACT_SCRIPT):
@@ -38,105 +126,161 @@ def run_extraction_script():
         print(f"❌ PCAP directory not found: {PCAP_DIR}")
         return False
 
-    pcap_files = sorted([
-        os.path.join(PCAP_DIR, f)
-        for f in os.listdir(PCAP_DIR)
-        if f.endswith(".pcap") or f.endswith(".pcapng")
-    ])
+    pcap_files = _list_pcaps()
 
     if not pcap_files:
         print(f"❌ No PCAP files found in {PCAP_DIR}")
         return False
 
-    print(f"📦 Found {len(pcap_files)} PCAP files")
-
-    for pcap in pcap_files:
-        print(f"\n🔄 Processing PCAP: {os.path.basename(pcap)}")
-
-        try:
-            result = subprocess.run(
-                ["bash", EXTRACT_SCRIPT, pcap],
-                capture_output=True,
-                text=True,
-                cwd=BASE_DIR,
-                check=False
-            )
-
-            print(result.stdout)
-
-            if result.stderr.strip():
-                print("⚠️ Script warnings/errors:\n", result.stderr)
-
-            if result.returncode != 0:
-                print(f"❌ Script failed for {pcap}")
-                return False
-
-        except Exception as e:
-            print(f"❌ Failed to process {pcap}: {e}")
+    cache = ExtractionCache(MANIFEST_FILE, fields=TSHARK_FIELDS, script=EXTRACT_SCRIPT)
+    if use_cache:
+        cached = [p for p in pcap_files if cache.is_fresh(p, [_csv_for(p)])]
+        for pcap in cached:
+            print(f"♻️ Up to date, skipping: {os.path.basename(pcap)}")
+        pcap_files = [p for p in pcap_files if p not in cached]
+        cache.save()
+        if not pcap_files:
+            print(f"\n✅ All {len(cached)} PCAP files already extracted.")
+            return True
+
+    workers = max(1, min(workers, len(pcap_files)))
+    policy = "fail-fast" if fail_fast else "continue-on-error"
+    print(f"📦 Found {len(pcap_files)} PCAP files to extract — {workers} worker(s), {policy}")
+
+    # Each job is an external bash/tshark process, so a thread per worker is
+    # enough to babysit it — the extraction itself runs in parallel processes.
+    cancel = threading.Event()
+    procs = set()
+    lock = threading.Lock()
+    failed, timings = [], []
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_one, p, cancel, procs, lock, fail_fast) for p in pcap_files]
+        for future in as_completed(futures):
+            try:
+                pcap, returncode, elapsed, usage = future.result()
+            except Exception as e:
+                print(f"❌ Extraction worker crashed: {e}")
+                failed.append(("?", str(e)))
+                continue
+            if returncode is None:
+                continue   # cancelled before it started
+            done += 1
+            name = os.path.basename(pcap)
+            if returncode == 0:
+                timings.append((name, elapsed))
+                cache.record(pcap, [_csv_for(pcap)])
+                cache.save()
+                if profile is not None and os.path.exists(_csv_for(pcap)):
+                    profile.file("extraction", pcap, elapsed, usage, bytes_in=os.path.getsize(pcap),
+                                 bytes_out=os.path.getsize(_csv_for(pcap)),
+                                 packets=max(0, count_lines(_csv_for(pcap)) - 1))
+                print(f"✅ [{done}/{len(pcap_files)}] {name} done in {elapsed:.1f}s")
+                continue
+
+            failed.append((name, f"exit code {returncode}"))
+            print(f"❌ [{done}/{len(pcap_files)}] Script failed for {name} after {elapsed:.1f}s")
+            if fail_fast:
+                cancel.set()
+                for f in futures:
+                    f.cancel()
+                with lock:
+                    for proc in procs:
+                        proc.terminate()
+
+    if timings:
+        total = sum(t for _, t in timings)
+        slowest = max(timings, key=lambda x: x[1])
+        print(f"\n⏱️ Extraction: {len(timings)} ok, {len(failed)} failed, "
+              f"{total:.1f}s of work, slowest {slowest[0]} ({slowest[1]:.1f}s)")
+
+    if failed:
+        for name, reason in failed:
+            print(f"   ❌ {name}: {reason}")
+        if fail_fast or not timings:
             return False
+        print(f"\n⚠️ Extraction finished: {len(timings)} ok, {len(failed)} failed — "
+              f"continuing with the PCAPs that extracted successfully.")
+        return True
 
     print("\n✅ Extraction completed for all PCAP files.")
     return True
 
 
 
-def merge_and_clean_csvs(folder):
-    """Merge labeled CSVs and remove duplicates."""
+def merge_and_clean_csvs(folder, memory_budget_mb=MERGE_MEMORY_BUDGET_MB, label=LABEL_PACKETS,
+                         parquet=WRITE_PARQUET, csv=WRITE_CSV, summary=None):
+    """Merge labeled CSVs and remove duplicates (streaming, bounded memory).
+    `summary` (dataset_summary.DatasetSummary) is fed the merged chunks in the same pass."""
     print(f"📂 Searching labeled CSVs in: {folder}")
-    all_files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith("_labeled.csv")]
+    all_files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith("_labeled.csv"))
 
     if not all_files:
         print(f"❌ No labeled CSV files found in {folder}")
         return None
 
-    dataframes = []
-    for file in all_files:
-        print(f"📦 Loading {os.path.basename(file)} ...")
-        try:
-            df = pd.read_csv(file)
-            df["source_file"] = os.path.basename(file)
-            dataframes.append(df)
-        except Exception as e:
-            print(f"⚠️ Skipping {file} due to error: {e}")
-
-    print("🔄 Merging all CSVs ...")
-    merged_df = pd.concat(dataframes, ignore_index=True)
-
-    # Drop duplicates
-    existing_cols = [col for col in DUPLICATE_KEYS if col in merged_df.columns]
-    if existing_cols:
-        before = len(merged_df)
-        merged_df.drop_duplicates(subset=existing_cols, inplace=True)
-        after = len(merged_df)
-        print(f"🧹 Removed {before - after} duplicates using {existing_cols}")
-    else:
-        print("⚠️ No duplicate-check columns found; skipping deduplication.")
-
-    # Save merged file
-    print(f"💾 Saving cleaned merged CSV to: {OUTPUT_FILE}")
-    merged_df.to_csv(OUTPUT_FILE, index=False)
-    print(f"✅ Done! Final rows: {len(merged_df)}")
-
-    return merged_df
-
-
-def summarize_dataset(df, start_time):
-    """Generate summary statistics of the merged dataset."""
+    if parquet and not pyarrow_available():
+        print("⚠️ pyarrow not installed — writing the merged CSV instead of the Parquet dataset")
+        parquet, csv = False, True
+    if not parquet:
+        csv = True
+
+    # Chunked read + uint64 row-hash dedup + incremental write (streaming_merge.py);
+    # each written chunk is labelled with the canonical priority class on the way out
+    # and goes to the Parquet dataset (partitioned by scenario/seed) and/or the CSV,
+    # and to the summary counters
+    dataset = ParquetDatasetWriter(OUTPUT_DATASET, PartitionMap(PCAP_DIR)) if parquet else None
+    sinks = [s for s in (dataset, summary) if s is not None]
+    try:
+        stats = stream_merge_dedup(
+            all_files, OUTPUT_FILE if csv else None, DUPLICATE_KEYS,
+            memory_budget_mb=memory_budget_mb, chunk_rows=MERGE_CHUNK_ROWS,
+            transform=label_frame if label else None,
+            transform_columns=LABEL_COLUMNS if label else (),
+            sinks=sinks, work_dir=CSV_DIR,
+        )
+    finally:
+        if dataset is not None:
+            dataset.close()
+    if stats.dedup_keys:
+        print(f"🧹 Removed {stats.duplicates} duplicates using {stats.dedup_keys}")
+
+    if dataset is not None:
+        stats.outputs.append(OUTPUT_DATASET)
+        print(f"💾 Saved Parquet dataset ({len(dataset.rows)} scenario/seed partitions) to: {OUTPUT_DATASET}")
+    if csv:
+        print(f"💾 Saved cleaned merged CSV to: {OUTPUT_FILE}")
+    print(f"✅ Done! Final rows: {stats.rows}")
+
+    return stats
+
+
+def summarize_dataset(stats, start_time, summary=None, timings=None):
+    """Generate summary statistics of the merged dataset (from MergeStats and,
+    if given, the DatasetSummary filled during the merge) → text + JSON."""
     print("📊 Generating dataset summary...")
     elapsed_time = time.time() - start_time
-    total_rows = len(df)
-    total_cols = len(df.columns)
+    total_rows = stats.rows
+    total_cols = len(stats.columns)
     summary_lines = [
         "========== DATASET SUMMARY ==========",
-        f"📁 Output CSV File : {OUTPUT_FILE}",
+        *(f"📁 Output : {path}" for path in stats.outputs),
         f"🕒 Total Processing Time : {elapsed_time:.2f} seconds",
         f"📦 Total Packets : {total_rows}",
         f"📐 Total Columns : {total_cols}",
-        "",
-        
     ]
 
-  
+    if summary is not None:
+        summary.timings.update(timings or {})
+        summary.timings["total"] = elapsed_time
+        summary_lines += summary.text_lines()
+        summary.save(SUMMARY_JSON, merge={
+            "files": stats.files, "skipped_files": stats.skipped_files, "rows_in": stats.rows_in,
+            "duplicates": stats.duplicates, "dedup_keys": stats.dedup_keys,
+            "partitions": stats.partitions, "columns": stats.columns, "outputs": stats.outputs,
+        })
+    summary_lines.append("")
 
     # Save summary report
     with open(SUMMARY_FILE, "w") as f:
@@ -144,19 +288,65 @@ def summarize_dataset(df, start_time):
 
     # Print to console too
     print("\n".join(summary_lines))
+    if summary is not None:
+        print(f"🧾 JSON summary: {SUMMARY_JSON}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PCAP → CSV extraction, merge and summary")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS,
+                        help="parallel extraction processes (1 = sequential)")
+    parser.add_argument("--fail-fast", action="store_true", default=FAIL_FAST,
+                        help="abort remaining extractions on the first failure")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the extraction manifest and re-extract every PCAP")
+    parser.add_argument("--memory-budget-mb", type=int, default=MERGE_MEMORY_BUDGET_MB,
+                        help="memory budget for merge deduplication")
+    parser.add_argument("--no-labels", action="store_true",
+                        help="merge without the sensor/value/unit/priority_class columns")
+    parser.add_argument("--csv", action="store_true", default=WRITE_CSV,
+                        help=f"also export the merged rows to {os.path.basename(OUTPUT_FILE)}")
+    parser.add_argument("--no-parquet", action="store_true",
+                        help="skip the Parquet dataset (CSV only)")
+    parser.add_argument("--profile", choices=PROFILERS, default=None,
+                        help=f"also run the pipeline under a profiler (output in {PROFILE_DIR})")
+    args = parser.parse_args()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile = PipelineProfile(PROFILE_DIR)
     start_time = time.time()
-
-    # Step 1: Run the extraction shell script
-    if run_extraction_script():
-        # Step 2: Merge and clean CSVs
-        merged_df = merge_and_clean_csvs(CSV_DIR)
-
-        # Step 3: Generate dataset summary
-        if merged_df is not None:
-            summarize_dataset(merged_df, start_time)
-    else:
-        print("❌ Extraction failed; skipping merge and summary.")
-
+    merge_stats = None
+
+    with profiler(args.profile, os.path.join(PROFILE_DIR, f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}")):
+        # Step 1: Run the extraction shell script
+        with profile.stage("extraction") as stage:
+            extracted = run_extraction_script(workers=args.workers, fail_fast=args.fail_fast,
+                                              use_cache=not args.force, profile=profile)
+            stage.bytes_in, stage.bytes_out, stage.packets = profile.file_totals("extraction")
+
+        if extracted:
+            # Step 2: Merge and clean CSVs (the summary counters fill in the same pass)
+            summary = DatasetSummary(PartitionMap(PCAP_DIR))
+            with profile.stage("merge") as stage:
+                merge_stats = merge_and_clean_csvs(CSV_DIR, memory_budget_mb=args.memory_budget_mb,
+                                                   label=not args.no_labels,
+                                                   parquet=not args.no_parquet, csv=args.csv,
+                                                   summary=summary)
+                if merge_stats is not None:
+                    for f in merge_stats.file_stats:
+                        profile.file("merge", f["file"], f["seconds"], bytes_in=f["bytes"], packets=f["rows_in"])
+                    stage.bytes_in = sum(f["bytes"] for f in merge_stats.file_stats)
+                    stage.bytes_out = sum(_dir_bytes(p) for p in merge_stats.outputs if os.path.exists(p))
+                    stage.packets = merge_stats.rows_in
+                    stage.extra = {"rows_out": merge_stats.rows, "summary_s": round(summary.elapsed, 3)}
+
+            # Step 3: Generate dataset summary
+            if merge_stats is not None:
+                with profile.stage("summary"):
+                    summarize_dataset(merge_stats, start_time, summary, profile.timings())
+        else:
+            print("❌ Extraction failed; skipping merge and summary.")
+
+    print("\n⏱️ Pipeline profile:")
+    print("\n".join(profile.report_lines()))
+    print(f"🧾 Profile: {profile.save()}")
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+dataset_store.py — Typed, partitioned Parquet dataset for the merged packets
+============================================================================
+all_labeled_data_clean.csv is every value as text: loading it means parsing
+every number again, pcap_to_csv_postprocess.py used to reread and rewrite
+the whole file just to drop mqtt.msg, and every run/seed lands in one file.
+ParquetDatasetWriter receives the merged, deduplicated chunks from
+streaming_merge.stream_merge_dedup() and writes a hive-partitioned dataset:
+
+  <root>/scenario=<name>/seed=<n>/part-0.parquet   (zstd, ROW_GROUP_ROWS per row group)
+
+with a FIXED schema — every file of every run has the same column types:
+
+  ints         frame.number int64, frame.len / tcp.len int32,
+               ip.proto uint8, tcp.srcport / tcp.dstport uint16,
+               tcp.flags uint16 (tshark's "0x0018" → 24),
+               payload_class / priority_class int8
+  float64      frame.time_epoch, frame.time_delta, frame.time_relative, value
+  categorical  ip.src, ip.dst, mqtt.clientid, mqtt.topic, mqtt.qos,
+               mqtt.msgtype, sensor, unit, source_file (dictionary<int32, string>;
+               qos / msgtype stay text because tshark joins several MQTT
+               messages of one frame as "3,3")
+  string       mqtt.msg, value_text and any column not listed here
+
+scenario / seed come from the capture manifests (capture_manager.py) in the
+PCAP directory, else from the <node>_<intf>_<seed>[_<scenario>]_<ts> file
+name, else "unknown" / -1.
+
+Reading projects columns instead of rewriting files:
+  load_dataset(root)                                  # all columns but mqtt.msg
+  load_dataset(root, columns=["frame.time_epoch", "mqtt.topic"], scenario="s5", seed=2025)
+  export_csv(root, "all_labeled_data_clean.csv")      # optional CSV export
+
+pyarrow is an optional dependency (as in subscriber_store.py): it is only
+imported when a dataset is written or read.
+
+Usage:
+  python3 scripts/dataset_store.py <root> --csv out.csv [--columns a,b] [--scenario s5] [--seed 2025]
+  python3 scripts/dataset_store.py <root> --info
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# ── Fixed schema: column → arrow type name ───────────────────────────
+SCHEMA = {
+    "frame.number": "int64",
+    "frame.time_epoch": "float64",
+    "frame.time_delta": "float64",
+    "frame.time_relative": "float64",
+    "frame.len": "int32",
+    "ip.src": "category",
+    "ip.dst": "category",
+    "ip.proto": "uint8",
+    "tcp.srcport": "uint16",
+    "tcp.dstport": "uint16",
+    "tcp.len": "int32",
+    "tcp.flags": "uint16",
+    "mqtt.clientid": "category",
+    "mqtt.topic": "category",
+    "mqtt.qos": "category",
+    "mqtt.msgtype": "category",
+    "mqtt.msg": "string",
+    "source_file": "category",
+    # packet_labels.LABEL_COLUMNS
+    "sensor": "category",
+    "value": "float64",
+    "unit": "category",
+    "value_text": "string",
+    "payload_class": "int8",
+    "priority_class": "int8",
+}
+PARTITION_COLUMNS = ["scenario", "seed"]
+DROP_ON_LOAD = ["mqtt.msg"]   # raw payload: parsed into the label columns already
+UNKNOWN_SCENARIO, UNKNOWN_SEED = "unknown", -1
+COMPRESSION = "zstd"
+ROW_GROUP_ROWS = 256_000   # rows buffered per partition before a row group is written
+PART_NAME = "part-0.parquet"
+
+# <node>_<intf>_<seed>[_<scenario>]_<YYYYmmdd_HHMMSS>[_NNN] — scenario names start with a letter
+_NAME_RE = re.compile(r"_(?P<seed>\d+)(?:_(?P<scenario>[A-Za-z][\w-]*?))?_\d{8}_\d{6}(?:_\d{3})?(?:_|\.|$)")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa   # optional dependency — only needed for the Parquet dataset
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("the Parquet dataset needs pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+
+def pyarrow_available():
+    try:
+        _pyarrow()
+    except RuntimeError:
+        return False
+    return True
+
+
+def arrow_schema(columns):
+    """pyarrow schema for `columns` in order; columns missing from SCHEMA are strings."""
+    pa, _ = _pyarrow()
+    types = {
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "string": pa.string(),
+    }
+    return pa.schema([(c, types.get(SCHEMA.get(c, "string")) or pa.type_for_alias(SCHEMA[c]))
+                      for c in columns])
+
+
+# =====================================================================
+# Partition keys
+# =====================================================================
+
+class PartitionMap:
+    """source_file (CSV or PCAP name) → (scenario, seed)."""
+
+    def __init__(self, manifest_dir=None):
+        self.stems = {}
+        if manifest_dir and os.path.isdir(manifest_dir):
+            for path in sorted(glob.glob(os.path.join(manifest_dir, "capture_manifest_*.json"))):
+                self.add_manifest(path)
+
+    def add_manifest(self, path):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        key = (manifest.get("scenario") or UNKNOWN_SCENARIO, int(manifest.get("seed", UNKNOWN_SEED)))
+        for cap in manifest.get("captures", []):
+            for entry in cap.get("files", []):
+                self.stems[_stem(entry["path"])] = key
+
+    def lookup(self, source_file):
+        name = os.path.basename(str(source_file))
+        for stem, key in self.stems.items():
+            if name.startswith(stem):   # <stem>_labeled.csv / <stem>.pcap
+                return key
+        m = _NAME_RE.search(name)
+        if m:
+            return m.group("scenario") or UNKNOWN_SCENARIO, int(m.group("seed"))
+        return UNKNOWN_SCENARIO, UNKNOWN_SEED
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+# =====================================================================
+# pandas chunk → arrow table
+# =====================================================================
+
+def _text_ints(column):
+    """"0x0018" / "24" → float64 (NaN if missing or not a number), each distinct value converted once."""
+    codes, uniques = pd.factorize(column)
+    values = []
+    for u in uniques:
+        try:
+            values.append(int(u, 16) if u[:2].lower() == "0x" else float(u))
+        except (TypeError, ValueError):
+            values.append(np.nan)
+    return np.append(np.asarray(values, dtype="float64"), np.nan)[codes]
+
+
+def _array(pa, series, type_):
+    """One pandas column → arrow array of `type_` (NA → null)."""
+    if pa.types.is_dictionary(type_):
+        return _array(pa, series, pa.string()).dictionary_encode()
+    if pa.types.is_string(type_):
+        values = series.astype(object).where(series.notna(), None)
+        return pa.array(values.to_numpy(), type=type_, from_pandas=True)
+    if pa.types.is_integer(type_):
+        if not pd.api.types.is_numeric_dtype(series):   # tcp.flags, or a column read as text
+            values = _text_ints(series)
+        else:
+            values = series.astype("float64").to_numpy(na_value=np.nan)
+        mask = np.isnan(values)
+        return pa.array(np.where(mask, 0, values).astype("int64"), mask=mask).cast(type_)
+    return pa.array(pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan),
+                    type=type_, from_pandas=True)
+
+
+def to_table(chunk, schema):
+    """DataFrame chunk → arrow table with exactly `schema` (missing columns all null)."""
+    pa, _ = _pyarrow()
+    missing = pd.Series([None] * len(chunk), dtype=object)
+    arrays = [_array(pa, chunk[f.name] if f.name in chunk else missing, f.type) for f in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+# =====================================================================
+# Writer
+# =====================================================================
+
+class ParquetDatasetWriter:
+    """write(chunk) per merged chunk, close() at the end; one ParquetWriter per partition.
+    The schema is fixed from the first chunk's columns (stream_merge_dedup reindexes
+    every chunk to the same union of columns). Small chunks — partitioned merges
+    emit one per spill partition — are buffered into ROW_GROUP_ROWS row groups."""
+
+    def __init__(self, root, partitions=None):
+        self.pa, self.pq = _pyarrow()
+        self.root = root
+        self.partitions = partitions or PartitionMap()
+        self.schema = None
+        self.writers = {}
+        self.pending = {}
+        self.rows = {}
+        if os.path.isdir(root):
+            shutil.rmtree(root)   # a dataset is rewritten as a whole, like the merged CSV
+        os.makedirs(root)
+
+    def _writer(self, key):
+        if key not in self.writers:
+            scenario, seed = key
+            folder = os.path.join(self.root, f"scenario={scenario}", f"seed={seed}")
+            os.makedirs(folder, exist_ok=True)
+            self.writers[key] = self.pq.ParquetWriter(os.path.join(folder, PART_NAME), self.schema,
+                                                      compression=COMPRESSION)
+            self.pending[key] = []
+            self.rows[key] = 0
+        return self.writers[key]
+
+    def _flush(self, key):
+        tables = self.pending[key]
+        if tables:
+            self.writers[key].write_table(self.pa.concat_tables(tables), row_group_size=ROW_GROUP_ROWS)
+            self.pending[key] = []
+
+    def write(self, chunk):
+        if not len(chunk):
+            return
+        if self.schema is None:
+            self.schema = arrow_schema([c for c in chunk.columns if c not in PARTITION_COLUMNS])
+        sources = chunk["source_file"] if "source_file" in chunk else pd.Series("", index=chunk.index)
+        keys = sources.map({s: self.partitions.lookup(s) for s in sources.unique()})
+        for key in keys.unique():
+            part = chunk[(keys == key).to_numpy()]
+            self._writer(key)
+            self.pending[key].append(to_table(part, self.schema))
+            self.rows[key] += len(part)
+            if sum(t.num_rows for t in self.pending[key]) >= ROW_GROUP_ROWS:
+                self._flush(key)
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    def close(self):
+        for key, writer in self.writers.items():
+            self._flush(key)
+            writer.close()
+        self.writers = {}
+
+
+# =====================================================================
+# Reading
+# =====================================================================
+
+def _dataset(root):
+    pa, _ = _pyarrow()
+    import pyarrow.dataset as ds
+    partitioning = ds.partitioning(pa.schema([("scenario", pa.string()), ("seed", pa.int64())]), flavor="hive")
+    return ds.dataset(root, format="parquet", partitioning=partitioning)
+
+
+def _scan(root, columns=None, scenario=None, seed=None):
+    """(dataset, projected columns, partition filter) — only the requested files/columns are read."""
+    import pyarrow.dataset as ds
+    dataset = _dataset(root)
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in DROP_ON_LOAD]
+    expr = None
+    for name, value in (("scenario", scenario), ("seed", seed)):
+        if value is not None:
+            term = ds.field(name) == (int(value) if name == "seed" else str(value))
+            expr = term if expr is None else expr & term
+    return dataset, columns, expr
+
+
+def _nullable_ints():
+    """arrow int → pandas nullable Int dtype, so missing ports/classes don't turn ints into floats."""
+    pa, _ = _pyarrow()
+    return {pa.int8(): pd.Int8Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+            pa.uint8(): pd.UInt8Dtype(), pa.uint16(): pd.UInt16Dtype()}
+
+
+def load_dataset(root, columns=None, scenario=None, seed=None):
+    """DataFrame of `columns` (default: everything but DROP_ON_LOAD, plus scenario/seed)."""
+    dataset, columns, expr = _scan(root, columns, scenario, seed)
+    return dataset.to_table(columns=columns, filter=expr).to_pandas(types_mapper=_nullable_ints().get)
+
+
+def export_csv(root, out_csv, columns=None, scenario=None, seed=None):
+    """Optional CSV export, batch by batch; returns the number of rows."""
+    dataset, columns, expr = _scan(root, columns, scenario, seed)
+    rows = 0
+    for batch in dataset.to_batches(columns=columns, filter=expr):
+        batch.to_pandas(types_mapper=_nullable_ints().get).to_csv(out_csv, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+        rows += batch.num_rows
+    if rows == 0:
+        pd.DataFrame(columns=columns).to_csv(out_csv, index=False)
+    return rows
+
+
+def dataset_info(root):
+    """{partition: rows} plus on-disk bytes."""
+    _, pq = _pyarrow()
+    parts, size = {}, 0
+    for path in sorted(glob.glob(os.path.join(root, "scenario=*", "seed=*", "*.parquet"))):
+        key = "/".join(os.path.relpath(path, root).split(os.sep)[:2])
+        parts[key] = parts.get(key, 0) + pq.ParquetFile(path).metadata.num_rows
+        size += os.path.getsize(path)
+    return {"root": root, "partitions": parts, "rows": sum(parts.values()), "bytes": size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect / export the partitioned Parquet packet dataset")
+    parser.add_argument("root", help="dataset directory written by Pcap_To_csv_Summary.py")
+    parser.add_argument("--csv", default=None, help="export to this CSV (mqtt.msg left out unless in --columns)")
+    parser.add_argument("--columns", default=None, help="comma-separated columns to export")
+    parser.add_argument("--scenario", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--info", action="store_true", help="rows per partition and size on disk")
+    args = parser.parse_args(argv)
+    if not pyarrow_available():
+        raise SystemExit("❌ the Parquet dataset needs pyarrow (pip install pyarrow)")
+
+    if args.info or not args.csv:
+        info = dataset_info(args.root)
+        for part, rows in info["partitions"].items():
+            print(f"   {part:<40} {rows:>12,} rows")
+        print(f"📦 {info['rows']:,} rows in {len(info['partitions'])} partition(s), "
+              f"{info['bytes'] / 1e6:.1f} MB on disk")
+    if args.csv:
+        start = time.perf_counter()
+        columns = args.columns.split(",") if args.columns else None
+        rows = export_csv(args.root, args.csv, columns, args.scenario, args.seed)
+        print(f"💾 {rows:,} rows → {args.csv} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
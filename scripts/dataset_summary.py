@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+dataset_summary.py — Dataset summary computed while the merge writes
+====================================================================
+summarize_dataset() used to report rows, columns and elapsed time only;
+class balance or per-sensor counts meant loading the merged CSV again.
+DatasetSummary is a stream_merge_dedup() sink: it sees every merged,
+deduplicated, labelled chunk once — the same chunks the CSV / Parquet
+writers get — and keeps only counters and sketches:
+
+  scenarios      rows, MQTT rows, PUBLISH rows and priority classes per
+                 scenario/seed (dataset_store.PartitionMap)
+  classes        priority_class balance (+ rows without a class)
+  sensors        packets per sensor
+  msgtypes       MQTT message-type distribution (tshark's "3,3" = two PUBLISH)
+  coverage       MQTT rows / rows, labelled PUBLISH / PUBLISH
+  inter-arrival  frame.time_delta in µs, per scenario — the capture's own
+                 spacing, so dropped duplicates do not stretch it
+  size           frame.len in bytes, per scenario
+  timings        per-stage wall time passed in by the pipeline, plus the
+                 time spent in the summary itself
+
+Quantiles come from latency_metrics.LatencyHistogram (log-linear buckets,
+~1.5% relative error, memory bounded by the value range), fed one numpy
+array per chunk instead of one record() call per row.
+
+Output: text lines for dataset_summary.txt and as_dict() → dataset_summary.json.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # latency_metrics.py
+from latency_metrics import LatencyHistogram
+
+from dataset_store import PartitionMap
+from pcap_features import MQTT_CONNECT, MQTT_PUBACK, MQTT_PUBLISH
+
+MSGTYPE_NAMES = {
+    MQTT_CONNECT: "CONNECT", 2: "CONNACK", MQTT_PUBLISH: "PUBLISH", MQTT_PUBACK: "PUBACK",
+    5: "PUBREC", 6: "PUBREL", 7: "PUBCOMP", 8: "SUBSCRIBE", 9: "SUBACK",
+    10: "UNSUBSCRIBE", 11: "UNSUBACK", 12: "PINGREQ", 13: "PINGRESP", 14: "DISCONNECT",
+}
+QUANTILES = [50, 90, 99]
+TOP_SENSORS = 20   # sensors listed in the text summary (the JSON has all)
+
+
+class Sketch(LatencyHistogram):
+    """LatencyHistogram that records a whole array per call."""
+
+    def record_array(self, values):
+        v = np.asarray(values, dtype="float64")
+        v = np.rint(v[~np.isnan(v)]).clip(min=0).astype("int64")
+        if not len(v):
+            return
+        # vectorized _index(): values < 2·SUB map 1:1, above that log-linear
+        bits = np.frexp(v.astype("float64"))[1]             # int.bit_length() (exact < 2**53)
+        e = np.maximum(bits - self.SUB_BITS - 1, 1)
+        idx = np.where(v < 2 * self.SUB, v, 2 * self.SUB + (e - 1) * self.SUB + ((v >> e) - self.SUB))
+        for i, n in zip(*np.unique(idx, return_counts=True)):
+            self.counts[int(i)] = self.counts.get(int(i), 0) + int(n)
+        self.total += len(v)
+        self.sum += int(v.sum())
+        self.max = max(self.max, int(v.max()))
+        self.min = int(v.min()) if self.min is None else min(self.min, int(v.min()))
+
+    def summary(self):
+        if not self.total:
+            return {"count": 0}
+        out = {"count": self.total, "min": self.min, "mean": round(self.sum / self.total, 1)}
+        out.update({f"p{q}": self.percentile(q) for q in QUANTILES})
+        out["max"] = self.max
+        return out
+
+
+def _count(counter, series):
+    for key, n in series.value_counts().items():
+        counter[key] += int(n)
+
+
+class DatasetSummary:
+    """Sink for stream_merge_dedup(): write(chunk) per merged chunk, then as_dict() / text_lines()."""
+
+    def __init__(self, partitions=None):
+        self.partitions = partitions or PartitionMap()
+        self.rows = 0
+        self.mqtt_rows = 0
+        self.publish_rows = 0
+        self.labelled_publish = None   # stays None without packet_labels columns
+        self.scenarios = defaultdict(Counter)   # "scenario/seed" → rows, mqtt, publish, class_<n>
+        self.classes = Counter()
+        self.sensors = Counter()
+        self.msgtypes = Counter()
+        self.iat = defaultdict(Sketch)          # µs, per scenario
+        self.size = defaultdict(Sketch)         # bytes, per scenario
+        self.timings = {}
+        self.elapsed = 0.0
+
+    def _scenario_keys(self, chunk):
+        if "source_file" not in chunk:
+            return pd.Series("unknown/-1", index=chunk.index)
+        sources = chunk["source_file"]
+        names = {s: "/".join(map(str, self.partitions.lookup(s))) for s in sources.dropna().unique()}
+        return sources.map(names).fillna("unknown/-1")
+
+    def write(self, chunk):
+        if not len(chunk):
+            return
+        start = time.perf_counter()
+        self.rows += len(chunk)
+        scenario = self._scenario_keys(chunk)
+
+        msgtype = chunk["mqtt.msgtype"] if "mqtt.msgtype" in chunk else pd.Series(pd.NA, index=chunk.index)
+        mqtt = msgtype.notna() & (msgtype.astype("string") != "")
+        publish = msgtype.astype("string").str.split(",").str[0] == str(MQTT_PUBLISH)
+        publish = publish.fillna(False).astype(bool) & mqtt
+        self.mqtt_rows += int(mqtt.sum())
+        self.publish_rows += int(publish.sum())
+        # "3,3" is two messages in one frame → count each
+        _count(self.msgtypes, msgtype[mqtt].astype("string").str.split(",").explode().str.strip())
+
+        for field, rows in (("rows", scenario), ("mqtt", scenario[mqtt]), ("publish", scenario[publish])):
+            for key, n in rows.value_counts().items():
+                self.scenarios[key][field] += int(n)
+
+        if "priority_class" in chunk:
+            klass = chunk["priority_class"]
+            _count(self.classes, klass.dropna().astype("int64"))
+            self.classes["none"] += int(klass.isna().sum())
+            by_class = pd.DataFrame({"s": scenario, "c": klass}).dropna().value_counts()
+            for (s, c), n in by_class.items():
+                self.scenarios[s][f"class_{int(c)}"] += int(n)
+        if "sensor" in chunk:
+            sensor = chunk["sensor"].astype("string")
+            named = sensor.notna() & (sensor != "")
+            _count(self.sensors, sensor[named])
+            self.labelled_publish = (self.labelled_publish or 0) + int((named & publish).sum())
+
+        for key, rows in scenario.groupby(scenario).groups.items():
+            if "frame.time_delta" in chunk:
+                delta = pd.to_numeric(chunk.loc[rows, "frame.time_delta"], errors="coerce")
+                self.iat[key].record_array(delta.to_numpy(dtype="float64", na_value=np.nan) * 1e6)
+            if "frame.len" in chunk:
+                length = pd.to_numeric(chunk.loc[rows, "frame.len"], errors="coerce")
+                self.size[key].record_array(length.to_numpy(dtype="float64", na_value=np.nan))
+        self.elapsed += time.perf_counter() - start
+
+    # ── Output ───────────────────────────────────────────────────────
+    @staticmethod
+    def _merged(sketches):
+        total = Sketch()
+        for s in sketches.values():
+            for idx, n in s.counts.items():
+                total.counts[idx] = total.counts.get(idx, 0) + n
+            total.total += s.total
+            total.sum += s.sum
+            total.max = max(total.max, s.max)
+            if s.min is not None:
+                total.min = s.min if total.min is None else min(total.min, s.min)
+        return total
+
+    def as_dict(self):
+        msgtypes = {MSGTYPE_NAMES.get(int(k), k) if str(k).isdigit() else k: n
+                    for k, n in self.msgtypes.most_common()}
+        return {
+            "rows": self.rows,
+            "coverage": {
+                "mqtt_rows": self.mqtt_rows,
+                "mqtt_fraction": round(self.mqtt_rows / self.rows, 4) if self.rows else None,
+                "publish_rows": self.publish_rows,
+                "labelled_publish_fraction":
+                    round(self.labelled_publish / self.publish_rows, 4)
+                    if self.publish_rows and self.labelled_publish is not None else None,
+            },
+            "scenarios": {s: dict(c) for s, c in sorted(self.scenarios.items())},
+            "classes": {str(k): n for k, n in sorted(self.classes.items(), key=lambda kv: str(kv[0]))},
+            "sensors": dict(self.sensors.most_common()),
+            "msgtypes": msgtypes,
+            "inter_arrival_us": {"all": self._merged(self.iat).summary(),
+                                 **{s: sk.summary() for s, sk in sorted(self.iat.items())}},
+            "frame_len_bytes": {"all": self._merged(self.size).summary(),
+                                **{s: sk.summary() for s, sk in sorted(self.size.items())}},
+            "timings_s": {**{k: round(v, 3) for k, v in self.timings.items()},
+                          "summary_in_merge": round(self.elapsed, 3)},
+        }
+
+    def text_lines(self):
+        d = self.as_dict()
+        cov = d["coverage"]
+        lines = ["", "---------- Coverage ----------",
+                 f"📡 MQTT rows : {cov['mqtt_rows']} ({_pct(cov['mqtt_fraction'])})",
+                 f"🏷️ PUBLISH rows with a sensor : {_pct(cov['labelled_publish_fraction'])} of {cov['publish_rows']}",
+                 "", "---------- Scenarios ----------"]
+        for s, c in d["scenarios"].items():
+            classes = "  ".join(f"{k[6:]}:{n}" for k, n in sorted(c.items()) if k.startswith("class_"))
+            lines.append(f"   {s:<24} rows {c.get('rows', 0):>10}  mqtt {c.get('mqtt', 0):>10}  "
+                         f"publish {c.get('publish', 0):>9}  classes {classes or '-'}")
+        if d["classes"]:
+            lines += ["", "---------- Priority classes ----------"]
+            lines += [f"   {k:<6} {n:>10}" for k, n in d["classes"].items()]
+        if d["sensors"]:
+            lines += ["", f"---------- Sensors (top {TOP_SENSORS}) ----------"]
+            lines += [f"   {k:<24} {n:>10}" for k, n in list(d["sensors"].items())[:TOP_SENSORS]]
+        lines += ["", "---------- MQTT message types ----------"]
+        lines += [f"   {k:<12} {n:>10}" for k, n in d["msgtypes"].items()]
+        for title, key, unit in (("Inter-arrival", "inter_arrival_us", "µs"), ("Frame size", "frame_len_bytes", "B")):
+            lines += ["", f"---------- {title} ({unit}) ----------"]
+            for s, q in d[key].items():
+                if q["count"]:
+                    lines.append(f"   {s:<24} n {q['count']:>10}  " +
+                                 "  ".join(f"{k} {q[k]}" for k in ("min", *(f"p{p}" for p in QUANTILES), "max")))
+        lines += ["", "---------- Stage timings (s) ----------"]
+        lines += [f"   {k:<20} {v:>10.3f}" for k, v in d["timings_s"].items()]
+        return lines
+
+    def save(self, json_path, **extra):
+        """as_dict() (+ extra top-level sections, e.g. merge=...) → JSON."""
+        with open(json_path, "w") as f:
+            json.dump({**self.as_dict(), **extra}, f, indent=2)
+
+
+def _pct(fraction):
+    return "n/a" if fraction is None else f"{fraction * 100:.1f}%"
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+extraction_cache.py — Incremental PCAP → CSV extraction manifest
+================================================================
+Every pipeline run used to re-extract every PCAP, even when nothing had
+changed. The manifest (JSON, next to the CSVs) records for each PCAP:
+
+  size, mtime_ns      → cheap first check
+  hash                → blake2b of the content, recomputed ONLY when
+                        size/mtime changed (touch / copy keeps the cache valid)
+  fields              → tshark -e field list the CSV was produced with
+  script_hash         → hash of the extraction script itself
+  outputs             → {csv_path: mtime_ns} written for this PCAP
+
+A PCAP is skipped when all of the above still match and every output CSV
+still exists unmodified.
+
+Python:
+  cache = ExtractionCache(manifest_path, fields=TSHARK_FIELDS, script=EXTRACT_SCRIPT)
+  if cache.is_fresh(pcap, [csv]): skip
+  ... extract ...
+  cache.record(pcap, [csv]); cache.save()
+
+Shell (pcap_to_csv_s5_v6.sh):
+  python3 scripts/extraction_cache.py check  <manifest> <pcap> <csv> [--fields f1,f2] [--script S]
+      exit 0 → up to date, 1 → needs extraction
+  python3 scripts/extraction_cache.py record <manifest> <pcap> <csv> [--fields f1,f2] [--script S]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1 << 20   # 1 MiB reads
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """Manifest of PCAP fingerprints → produced CSVs."""
+
+    def __init__(self, manifest_path, fields=(), script=None):
+        self.manifest_path = manifest_path
+        self.fields        = list(fields)
+        self.script_hash   = file_hash(script) if script and os.path.exists(script) else None
+        self.entries       = {}
+        self._dirty        = False
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path) as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                print(f"⚠️ Ignoring unreadable extraction manifest: {manifest_path}")
+
+    def _fingerprint(self, pcap, entry=None):
+        st = os.stat(pcap)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            digest = entry["hash"]      # unchanged on disk — reuse stored hash
+        else:
+            digest = file_hash(pcap)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+
+    def is_fresh(self, pcap, outputs):
+        """True when `pcap` was already extracted to `outputs` with the same settings."""
+        key = os.path.abspath(pcap)
+        entry = self.entries.get(key)
+        if not entry:
+            return False
+        if entry.get("fields") != self.fields or entry.get("script_hash") != self.script_hash:
+            return False
+        recorded = entry.get("outputs", {})
+        for out in outputs:
+            out = os.path.abspath(out)
+            if out not in recorded or not os.path.exists(out):
+                return False
+            if os.stat(out).st_mtime_ns != recorded[out]:
+                return False
+        fp = self._fingerprint(pcap, entry)
+        if fp["hash"] != entry["hash"]:
+            return False
+        if fp["mtime_ns"] != entry["mtime_ns"]:
+            # touched/copied but identical content — remember the new mtime
+            entry.update(fp)
+            self._dirty = True
+        return True
+
+    def record(self, pcap, outputs):
+        key = os.path.abspath(pcap)
+        entry = self._fingerprint(pcap, self.entries.get(key))
+        entry.update({
+            "fields": self.fields,
+            "script_hash": self.script_hash,
+            "outputs": {os.path.abspath(o): os.stat(o).st_mtime_ns
+                        for o in outputs if os.path.exists(o)},
+            "extracted_at": time.time(),
+        })
+        self.entries[key] = entry
+        self._dirty = True
+
+    def forget(self, pcap):
+        if self.entries.pop(os.path.abspath(pcap), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+        self._dirty = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PCAP extraction cache manifest")
+    parser.add_argument("action", choices=["check", "record", "forget"])
+    parser.add_argument("manifest")
+    parser.add_argument("pcap")
+    parser.add_argument("outputs", nargs="*")
+    parser.add_argument("--fields", default="", help="comma-separated tshark field list")
+    parser.add_argument("--script", default=None, help="extraction script to fingerprint")
+    args = parser.parse_args(argv)
+
+    fields = [f for f in args.fields.split(",") if f]
+    cache = ExtractionCache(args.manifest, fields=fields, script=args.script)
+    if args.action == "check":
+        fresh = cache.is_fresh(args.pcap, args.outputs)
+        cache.save()
+        return 0 if fresh else 1
+    if args.action == "record":
+        cache.record(args.pcap, args.outputs)
+    else:
+        cache.forget(args.pcap)
+    cache.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+flow_features.py — Streaming per-flow feature aggregation (one pass, bounded memory)
+====================================================================================
+The pipeline stops at per-packet rows (the 16 columns of
+pcap_to_csv_s5_v6.sh); "MQTT coverage per TCP flow window" and the other
+flow features were computed downstream by re-grouping the merged CSV in
+pandas. This stage consumes packets as a stream — decoded pcap records
+(pcap_features / pcap_merge) or rows of an extracted 16-column CSV — and
+keeps one small state object per flow:
+
+  key      bidirectional 5-tuple (proto, client ip/port, server ip/port);
+           the MQTT broker side (port 1883) is the server, otherwise the
+           lower (ip, port) endpoint is the client
+  counts   packets / bytes (frame.len) / TCP payload bytes, per direction
+  timing   inter-arrival mean / std (Welford) / min / max, duration
+  TCP      SYN / FIN / RST counts
+  MQTT     PUBLISH / PUBACK / CONNECT / other message counts, QoS 0/1/2
+           mix, first topic + number of distinct topics, sensor and
+           payload Class=N of the first PUBLISH, canonical priority_class
+           (packet_labels / sensor_config.PRIORITY_CLASSES),
+           mqtt_coverage = MQTT packets / packets
+
+Emission — one CSV row per flow per window:
+  window   tumbling windows of `window` seconds aligned to the epoch; the
+           first packet of a flow in a new window emits the previous one
+  idle     flows silent for `idle_timeout` seconds are emitted and dropped
+           (checked every `sweep_every` packets, oldest flow first)
+  fin/rst  a RST, or the ACK after a FIN from both sides, closes the flow
+  capacity beyond `max_flows` live flows the least recently seen is emitted
+  end      whatever is left when the input ends
+
+Flows live in an OrderedDict kept in last-seen order, so idle eviction and
+the capacity limit only ever touch the oldest entries. Memory is bounded
+by max_flows × one FlowState (~1 kB), independent of the input size.
+
+Usage:
+  python3 scripts/flow_features.py all_packets_extracted_s5.csv --out flows_s5.csv
+  python3 scripts/flow_features.py <pcap> [<pcap> ...] --out flows.csv --window 30 --idle 15
+"""
+
+import argparse
+import csv
+import math
+import sys
+import time
+from collections import OrderedDict
+
+from pcap_features import FIELDS, MQTT_CONNECT, MQTT_PORT, MQTT_PUBACK, MQTT_PUBLISH, Packet, _ts, iter_packets
+from pcap_merge import merged_packets
+from packet_labels import PRIORITY_CLASS_OFFSET, PRIORITY_CLASSES
+
+DEFAULT_WINDOW      = 60.0      # s — tumbling feature window
+DEFAULT_IDLE        = 30.0      # s — evict flows silent this long
+DEFAULT_MAX_FLOWS   = 100_000
+DEFAULT_SWEEP_EVERY = 10_000    # packets between idle sweeps
+MAX_TOPICS          = 32        # distinct topics tracked per flow (count saturates)
+
+TCP_FIN, TCP_SYN, TCP_RST = 0x01, 0x02, 0x04
+
+FLOW_FIELDS = [
+    "window_start", "first_ts", "last_ts", "duration",
+    "proto", "client_ip", "client_port", "server_ip", "server_port",
+    "pkts", "bytes", "fwd_pkts", "bwd_pkts", "fwd_bytes", "bwd_bytes", "payload_bytes",
+    "iat_mean", "iat_std", "iat_min", "iat_max",
+    "syn", "fin", "rst",
+    "mqtt_publish", "mqtt_puback", "mqtt_connect", "mqtt_other",
+    "qos0", "qos1", "qos2", "mqtt_coverage",
+    "topic", "topics", "sensor", "sensor_class", "priority_class", "close_reason",
+]
+
+
+# =====================================================================
+# Per-flow state
+# =====================================================================
+
+class FlowState:
+    """Counters of one flow in the current window."""
+
+    __slots__ = ("window_start", "first_ns", "last_ns", "pkts", "bytes", "fwd_pkts", "bwd_pkts",
+                 "fwd_bytes", "bwd_bytes", "payload_bytes", "iat_n", "iat_mean", "iat_m2",
+                 "iat_min", "iat_max", "syn", "fin", "rst", "fin_dirs", "closed", "publish", "puback",
+                 "connect", "mqtt_other", "qos", "topic", "topics", "sensor", "sensor_class")
+
+    def __init__(self, window_start, ts_ns):
+        self.window_start = window_start
+        self.first_ns = self.last_ns = ts_ns
+        self.pkts = self.bytes = self.fwd_pkts = self.bwd_pkts = 0
+        self.fwd_bytes = self.bwd_bytes = self.payload_bytes = 0
+        self.iat_n, self.iat_mean, self.iat_m2 = 0, 0.0, 0.0
+        self.iat_min = self.iat_max = None
+        self.syn = self.fin = self.rst = 0
+        self.fin_dirs = 0                  # bit 1 = client FIN, bit 2 = server FIN
+        self.closed = False                # RST, or the ACK after both FINs
+        self.publish = self.puback = self.connect = self.mqtt_other = 0
+        self.qos = [0, 0, 0]
+        self.topic = None
+        self.topics = set()
+        self.sensor = self.sensor_class = None
+
+    def add(self, pkt, forward):
+        size = pkt.frame_len or 0
+        if self.pkts:
+            iat = max(0, pkt.ts_ns - self.last_ns) / 1e9   # out-of-order input → 0
+            self.iat_n += 1
+            delta = iat - self.iat_mean
+            self.iat_mean += delta / self.iat_n
+            self.iat_m2 += delta * (iat - self.iat_mean)
+            self.iat_min = iat if self.iat_min is None else min(self.iat_min, iat)
+            self.iat_max = iat if self.iat_max is None else max(self.iat_max, iat)
+        self.last_ns = max(self.last_ns, pkt.ts_ns)
+        self.pkts += 1
+        self.bytes += size
+        self.payload_bytes += pkt.tcp_len or 0
+        if forward:
+            self.fwd_pkts += 1
+            self.fwd_bytes += size
+        else:
+            self.bwd_pkts += 1
+            self.bwd_bytes += size
+
+        flags = pkt.tcp_flags or 0
+        if flags & TCP_SYN:
+            self.syn += 1
+        if flags & TCP_FIN:
+            self.fin += 1
+            self.fin_dirs |= 1 if forward else 2
+        elif self.fin_dirs == 3:
+            self.closed = True
+        if flags & TCP_RST:
+            self.rst += 1
+            self.closed = True
+
+        msgtype = pkt.mqtt_msgtype
+        if msgtype is None:
+            return
+        if msgtype == MQTT_PUBLISH:
+            self.publish += 1
+            if pkt.mqtt_qos is not None and 0 <= pkt.mqtt_qos <= 2:
+                self.qos[pkt.mqtt_qos] += 1
+            topic = pkt.mqtt_topic
+            if topic is not None:
+                if self.topic is None:
+                    self.topic = topic
+                if len(self.topics) < MAX_TOPICS:
+                    self.topics.add(topic)
+            if self.sensor is None and pkt.mqtt_msg:
+                self.sensor, self.sensor_class = payload_label(pkt.mqtt_msg)
+        elif msgtype == MQTT_PUBACK:
+            self.puback += 1
+        elif msgtype == MQTT_CONNECT:
+            self.connect += 1
+        else:
+            self.mqtt_other += 1
+
+    def row(self, key, reason):
+        proto, client_ip, client_port, server_ip, server_port = key
+        mqtt_pkts = self.publish + self.puback + self.connect + self.mqtt_other
+        std = math.sqrt(self.iat_m2 / (self.iat_n - 1)) if self.iat_n > 1 else 0.0
+        priority = PRIORITY_CLASSES.get(self.sensor)
+        if priority is None and self.sensor_class is not None:
+            priority = self.sensor_class - PRIORITY_CLASS_OFFSET
+        return [
+            _ts(self.window_start), _ts(self.first_ns), _ts(self.last_ns),
+            f"{(self.last_ns - self.first_ns) / 1e9:.6f}",
+            proto, client_ip, client_port, server_ip, server_port,
+            self.pkts, self.bytes, self.fwd_pkts, self.bwd_pkts, self.fwd_bytes, self.bwd_bytes,
+            self.payload_bytes,
+            f"{self.iat_mean:.6f}", f"{std:.6f}",
+            "" if self.iat_min is None else f"{self.iat_min:.6f}",
+            "" if self.iat_max is None else f"{self.iat_max:.6f}",
+            self.syn, self.fin, self.rst,
+            self.publish, self.puback, self.connect, self.mqtt_other,
+            self.qos[0], self.qos[1], self.qos[2],
+            f"{mqtt_pkts / self.pkts:.4f}" if self.pkts else "0",
+            self.topic or "", len(self.topics), self.sensor or "",
+            "" if self.sensor_class is None else self.sensor_class,
+            "" if priority is None else priority,
+            reason,
+        ]
+
+
+def payload_label(msg):
+    """(sensor, Class=N) from an mqtt.msg value (hex as tshark/pcap_features write it, or text)."""
+    text = msg
+    if len(msg) % 2 == 0:
+        try:
+            text = bytes.fromhex(msg).decode("utf-8", errors="replace")
+        except ValueError:
+            pass
+    sensor = text.split(":", 1)[0] if ":" in text else None
+    i = text.find("Class=")
+    if i < 0:
+        return sensor, None
+    digits = ""
+    for ch in text[i + 6:]:
+        if not ch.isdigit():
+            break
+        digits += ch
+    return sensor, int(digits) if digits else None
+
+
+def flow_key(pkt):
+    """(key, forward) — forward = packet goes client → server."""
+    sport, dport = pkt.src_port or 0, pkt.dst_port or 0
+    a, b = (pkt.ip_src, sport), (pkt.ip_dst, dport)
+    if sport == MQTT_PORT and dport != MQTT_PORT:
+        return (pkt.ip_proto, *b, *a), False
+    if dport == MQTT_PORT or a <= b:
+        return (pkt.ip_proto, *a, *b), True
+    return (pkt.ip_proto, *b, *a), False
+
+
+# =====================================================================
+# Aggregator
+# =====================================================================
+
+class FlowAggregator:
+    """Feed packets in (roughly) time order; emitted rows go to `emit(row)`."""
+
+    def __init__(self, emit, window=DEFAULT_WINDOW, idle_timeout=DEFAULT_IDLE,
+                 max_flows=DEFAULT_MAX_FLOWS, sweep_every=DEFAULT_SWEEP_EVERY):
+        self.emit         = emit
+        self.window_ns    = int(window * 1e9)
+        self.idle_ns      = int(idle_timeout * 1e9)
+        self.max_flows    = max_flows
+        self.sweep_every  = sweep_every
+        self.flows        = OrderedDict()   # key → FlowState, least recently seen first
+        self.now_ns       = 0
+        self.packets      = 0
+        self.skipped      = 0               # non-IP frames
+        self.peak_flows   = 0
+        self.emitted      = {"window": 0, "idle": 0, "fin": 0, "rst": 0, "capacity": 0, "end": 0}
+
+    def _emit(self, key, state, reason):
+        self.emitted[reason] += 1
+        self.emit(state.row(key, reason))
+
+    def add(self, pkt):
+        self.packets += 1
+        if pkt.ip_src is None:
+            self.skipped += 1
+            return
+        ts = pkt.ts_ns
+        if ts > self.now_ns:
+            self.now_ns = ts
+        key, forward = flow_key(pkt)
+        window_start = ts - ts % self.window_ns
+        state = self.flows.get(key)
+        if state is not None and window_start > state.window_start:
+            del self.flows[key]   # re-inserted below at the most recently seen end
+            self._emit(key, state, "window")
+            state = None
+        if state is None:
+            state = FlowState(window_start, ts)
+            self.flows[key] = state
+            if len(self.flows) > self.max_flows:
+                old_key, old = self.flows.popitem(last=False)
+                self._emit(old_key, old, "capacity")
+            self.peak_flows = max(self.peak_flows, len(self.flows))
+        else:
+            self.flows.move_to_end(key)
+        state.add(pkt, forward)
+        if state.closed:
+            del self.flows[key]
+            self._emit(key, state, "rst" if state.rst else "fin")
+        if self.packets % self.sweep_every == 0:
+            self.sweep()
+
+    def sweep(self):
+        """Emit and drop flows idle for longer than idle_timeout."""
+        cutoff = self.now_ns - self.idle_ns
+        while self.flows:
+            key, state = next(iter(self.flows.items()))
+            if state.last_ns >= cutoff:
+                break
+            del self.flows[key]
+            self._emit(key, state, "idle")
+
+    def flush(self):
+        while self.flows:
+            key, state = self.flows.popitem(last=False)
+            self._emit(key, state, "end")
+
+    def summary(self):
+        return {"packets": self.packets, "non_ip": self.skipped, "peak_flows": self.peak_flows,
+                "rows": sum(self.emitted.values()), "emitted": dict(self.emitted)}
+
+
+# =====================================================================
+# Inputs / output
+# =====================================================================
+
+def _int(value):
+    if not value:
+        return None
+    return int(value, 16) if value.startswith("0x") else int(value)
+
+
+def _ts_ns(value):
+    sec, _, frac = value.partition(".")
+    return int(sec) * 1_000_000_000 + int((frac + "000000000")[:9])
+
+
+def csv_packets(path):
+    """Packets from an extracted 16-column CSV (tshark or pcap_features.py output)."""
+    with open(path, newline="", buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        missing = [c for c in FIELDS if c not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+        idx = [header.index(c) for c in FIELDS]
+        for row in reader:
+            (_, epoch, _, flen, src, dst, proto, sport, dport, tlen, flags,
+             clientid, topic, qos, msgtype, msg) = (row[i] if i < len(row) else "" for i in idx)
+            if not epoch:
+                continue
+            pkt = Packet(_ts_ns(epoch), _int(flen))
+            pkt.ip_src, pkt.ip_dst = src or None, dst or None
+            pkt.ip_proto = _int(proto)
+            pkt.src_port, pkt.dst_port = _int(sport), _int(dport)
+            pkt.tcp_len, pkt.tcp_flags = _int(tlen), _int(flags)
+            pkt.mqtt_clientid, pkt.mqtt_topic = clientid or None, topic or None
+            pkt.mqtt_qos = _int(qos.split(",")[0])
+            pkt.mqtt_msgtype = _int(msgtype.split(",")[0])
+            pkt.mqtt_msg = msg or None
+            yield pkt
+
+
+def input_packets(paths):
+    """CSV inputs are read one after another; pcaps are merged in time order."""
+    pcaps = [p for p in paths if not p.endswith(".csv")]
+    for path in paths:
+        if path.endswith(".csv"):
+            yield from csv_packets(path)
+    if len(pcaps) == 1:
+        yield from iter_packets(pcaps[0])
+    elif pcaps:
+        yield from merged_packets(pcaps)
+
+
+def aggregate(paths, out_csv, window=DEFAULT_WINDOW, idle_timeout=DEFAULT_IDLE,
+              max_flows=DEFAULT_MAX_FLOWS):
+    """Write one row per flow window for the packets in `paths`; returns the summary."""
+    with open(out_csv, "w", newline="", buffering=1 << 20) as out:
+        writer = csv.writer(out)
+        writer.writerow(FLOW_FIELDS)
+        agg = FlowAggregator(writer.writerow, window, idle_timeout, max_flows)
+        for pkt in input_packets(paths):
+            agg.add(pkt)
+        agg.flush()
+    return agg.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming per-flow features from packets (CSV or PCAP)")
+    parser.add_argument("inputs", nargs="+", help="16-column CSVs and/or PCAPs")
+    parser.add_argument("--out", required=True, help="flow feature CSV")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW, help="seconds per feature window")
+    parser.add_argument("--idle", type=float, default=DEFAULT_IDLE, help="idle timeout in seconds")
+    parser.add_argument("--max-flows", type=int, default=DEFAULT_MAX_FLOWS, help="live flow cap")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    s = aggregate(args.inputs, args.out, args.window, args.idle, args.max_flows)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {s['packets']} packets → {s['rows']} flow windows → {args.out} in {elapsed:.2f}s "
+          f"({s['packets'] / elapsed if elapsed else 0:,.0f} pkt/s, peak {s['peak_flows']} live flows)")
+    print("   📤 " + ", ".join(f"{k}: {v}" for k, v in s["emitted"].items() if v))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+packet_dedup.py — Cross-interface packet deduplication for multi-point captures
+===============================================================================
+start_tcpdump() captures the same MQTT packet on broker-eth0, s3-eth1,
+h13-eth0 and the s1 ports, so pcap_to_csv_s5_v6.sh used to pick ONE capture
+and throw the rest away. This engine reads ALL captures of a run in one
+timestamp-ordered pass and collapses copies of the same packet:
+
+  fingerprint = (ip.src, ip.dst, ip.id, tcp ports, tcp seq/ack, tcp.len)
+                                                   — TCP (the segment is
+                                                     identified, no digest)
+              = (ip.src, ip.dst, ip.id, ports, blake2b of the first
+                 PAYLOAD_PREFIX bytes after the IP header)   — other IPv4
+              = blake2b of the first RAW_PREFIX bytes of the frame — the rest
+  Only prefixes are hashed because capture points differ in snaplen:
+  s1/s2 may be captured headers-only (capture_manager.SNAPLEN_HEADERS,
+  128 bytes) while broker-eth0 keeps whole frames, and both copies must
+  get the same fingerprint.
+  copies      = same fingerprint seen within `window` seconds of the first
+
+Output:
+  • one canonical record per packet (16-column CSV, same schema and
+    formatting as pcap_features.py — first observation's timestamp)
+  • optional long-form hop CSV: frame.number, hop, point, time_epoch,
+    offset_us — every capture point that saw the packet, in time order
+  • per-hop latency summary (consecutive capture points) as JSON
+
+Memory is bounded by the packets seen in the last `window` seconds
+(pending fingerprints are emitted as soon as the window passes) and
+hard-capped at `max_pending`. All Mininet hosts share one kernel clock,
+so per-point timestamps are directly comparable.
+
+Input comes from pcap_merge.merge_pcaps(); capture point names from the
+start_tcpdump() file name (pcap_merge.capture_point()).
+
+Usage:
+  python3 scripts/packet_dedup.py <pcap> [<pcap> ...] --out canonical.csv \\
+          [--hops-out hops.csv] [--summary-out hops.json] [--window 0.1]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+
+from pcap_features import FIELDS, decode_packet, ip_offset, packet_row
+from pcap_merge import merge_pcaps
+
+DEFAULT_WINDOW = 0.1          # s — Linux min RTO is 200 ms, so retransmits stay distinct
+DEFAULT_MAX_PENDING = 500_000
+# Hashed prefixes stay inside capture_manager.SNAPLEN_HEADERS (128 bytes):
+# Ethernet 14 + IPv4 ≤ 60 + 32 = 106, and 96 for non-IP frames.
+PAYLOAD_PREFIX = 32
+RAW_PREFIX     = 96
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def fingerprint(linktype, pkt, data):
+    if pkt.ip_src is None:
+        return ("raw", _digest(data[:RAW_PREFIX]))
+    if pkt.ip_proto == 6 and pkt.tcp_seq is not None:
+        # ip.id + seq/ack + length identify the segment; a payload digest
+        # would differ between full and headers-only captures of it
+        payload = None
+    else:   # ICMP / UDP / fragments — start of what follows the IP header
+        off = ip_offset(linktype, data)
+        start = off + (data[off] & 0x0F) * 4
+        payload = _digest(data[start:start + PAYLOAD_PREFIX])
+    return (pkt.ip_src, pkt.ip_dst, pkt.ip_proto, pkt.ip_id,
+            pkt.src_port, pkt.dst_port, pkt.tcp_seq, pkt.tcp_ack, pkt.tcp_len,
+            payload)
+
+
+class CanonicalPacket:
+    """First-seen Packet plus every (point, ts_ns) it was observed at."""
+
+    __slots__ = ("packet", "observations")
+
+    def __init__(self, packet, point):
+        self.packet = packet
+        self.observations = [(point, packet.ts_ns)]
+
+
+class HopStats:
+    """count / min / mean / max of one point → point delay (µs)."""
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count, self.total, self.min, self.max = 0, 0.0, None, 0.0
+
+    def record(self, us):
+        self.count += 1
+        self.total += us
+        self.max = max(self.max, us)
+        self.min = us if self.min is None else min(self.min, us)
+
+    def as_dict(self):
+        return {"count": self.count, "min_us": self.min,
+                "mean_us": self.total / self.count if self.count else None, "max_us": self.max}
+
+
+class DedupEngine:
+    """Time-windowed fingerprint table; feed() packets in timestamp order."""
+
+    def __init__(self, window=DEFAULT_WINDOW, max_pending=DEFAULT_MAX_PENDING):
+        self.window_ns      = int(window * 1e9)
+        self.max_pending    = max_pending
+        self._pending       = OrderedDict()   # fingerprint → CanonicalPacket, first-seen order
+        self._now           = 0
+        self.packets_in     = 0
+        self.canonical      = 0
+        self.forced_evictions = 0
+        self.point_counts   = {}
+        self.hops           = {}
+
+    def feed(self, point, linktype, ts_ns, orig_len, data):
+        """Add one observation; yields CanonicalPackets whose window has closed."""
+        self.packets_in += 1
+        self.point_counts[point] = self.point_counts.get(point, 0) + 1
+        self._now = max(self._now, ts_ns)
+        pkt = decode_packet(linktype, ts_ns, orig_len, data)
+        key = fingerprint(linktype, pkt, data)
+        entry = self._pending.get(key)
+        if entry is not None and ts_ns - entry.packet.ts_ns <= self.window_ns:
+            entry.observations.append((point, ts_ns))
+        else:
+            if entry is not None:   # same fingerprint, outside the window → new packet
+                yield self._emit(self._pending.pop(key))
+            self._pending[key] = CanonicalPacket(pkt, point)
+        yield from self._evict()
+
+    def _evict(self):
+        horizon = self._now - self.window_ns
+        pending = self._pending
+        while pending:
+            key, entry = next(iter(pending.items()))
+            if entry.packet.ts_ns >= horizon and len(pending) <= self.max_pending:
+                break
+            if entry.packet.ts_ns >= horizon:
+                self.forced_evictions += 1
+            del pending[key]
+            yield self._emit(entry)
+
+    def flush(self):
+        while self._pending:
+            yield self._emit(self._pending.popitem(last=False)[1])
+
+    def _emit(self, entry):
+        self.canonical += 1
+        obs = entry.observations
+        if len(obs) > 1:
+            obs.sort(key=lambda o: o[1])
+            entry.packet.ts_ns = obs[0][1]   # earliest sighting, even if fed late
+            for (a, ta), (b, tb) in zip(obs, obs[1:]):
+                self.hops.setdefault(f"{a}>{b}", HopStats()).record((tb - ta) / 1000)
+        return entry
+
+    def summary(self):
+        return {
+            "packets_in": self.packets_in,
+            "canonical_packets": self.canonical,
+            "duplicates_removed": self.packets_in - self.canonical,
+            "forced_evictions": self.forced_evictions,
+            "window_s": self.window_ns / 1e9,
+            "per_point_packets": dict(sorted(self.point_counts.items())),
+            "per_hop_latency": {hop: s.as_dict() for hop, s in sorted(self.hops.items())},
+        }
+
+
+def dedup_pcaps(files, out_csv, hops_csv=None, window=DEFAULT_WINDOW,
+                max_pending=DEFAULT_MAX_PENDING):
+    """One timestamp-ordered pass over `files`; returns the DedupEngine (for summary())."""
+    engine = DedupEngine(window, max_pending)
+    number, prev_ns = 0, None
+    hops = open(hops_csv, "w", buffering=1 << 20) if hops_csv else None
+    try:
+        with open(out_csv, "w", buffering=1 << 20) as out:
+            out.write(",".join(FIELDS) + "\n")
+            if hops:
+                hops.write("frame.number,hop,point,time_epoch,offset_us\n")
+
+            def write(entry):
+                nonlocal number, prev_ns
+                number += 1
+                pkt = entry.packet
+                out.write(packet_row(pkt, number, 0 if prev_ns is None else pkt.ts_ns - prev_ns))
+                out.write("\n")
+                prev_ns = pkt.ts_ns
+                if hops:
+                    for hop, (point, ts) in enumerate(entry.observations):
+                        hops.write(f"{number},{hop},{point},{ts // 1_000_000_000}.{ts % 1_000_000_000:09d},{(ts - pkt.ts_ns) / 1000:.3f}\n")
+
+            for rec in merge_pcaps(files):
+                for entry in engine.feed(rec.point, rec.linktype, rec.ts_ns, rec.orig_len, rec.data):
+                    write(entry)
+            for entry in engine.flush():
+                write(entry)
+    finally:
+        if hops:
+            hops.close()
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicate packets across multi-point captures")
+    parser.add_argument("pcaps", nargs="+")
+    parser.add_argument("--out", required=True, help="canonical 16-column CSV")
+    parser.add_argument("--hops-out", default=None, help="long-form per-hop observation CSV")
+    parser.add_argument("--summary-out", default=None, help="per-hop latency summary JSON")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW,
+                        help=f"seconds within which equal fingerprints are copies (default {DEFAULT_WINDOW})")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    engine = dedup_pcaps(args.pcaps, args.out, args.hops_out, args.window, args.max_pending)
+    summary = engine.summary()
+    print(f"✅ {summary['packets_in']} packets from {len(args.pcaps)} captures → "
+          f"{summary['canonical_packets']} canonical ({summary['duplicates_removed']} copies removed) "
+          f"in {time.perf_counter() - start:.2f}s")
+    for hop, s in summary["per_hop_latency"].items():
+        print(f"   ⏱️ {hop}: n={s['count']} mean={s['mean_us']:.1f}µs max={s['max_us']:.1f}µs")
+    if summary["forced_evictions"]:
+        print(f"⚠️ {summary['forced_evictions']} packets emitted early (raise --max-pending)")
+    if args.summary_out:
+        with open(args.summary_out, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+packet_labels.py — Vectorized payload parsing + priority-class labels
+=====================================================================
+Every publisher formats its payload as
+
+  <sensor_key>:<value><unit>:Class=<N>[:pub=<id>:seq=<n>:ts=<epoch ns>]
+
+with Class=1–4 in every profile, while preprocessing trains on a 0–3
+priority class (the S5 sensors' 3/4 become 2/3) — a remapping that used
+to live outside the repo. label_frame() does both for a whole DataFrame
+chunk at once — no Python call per row:
+
+  mqtt.msg     hex (tshark / pcap_features default) or text → decoded by
+               ONE bytes.fromhex over the chunk, split back on newlines
+  parsing      ONE re.findall (MULTILINE) over the chunk's joined payloads
+               per pattern; pandas' .str.extract calls a Python function
+               per element unless pyarrow strings are in use
+  sensor       payload field 1, else the topic suffix (sensor/<key>)
+  value, unit  numeric prefix / remainder of payload field 2
+               (value NaN and unit "" for categorical readings)
+  value_text   payload field 2 as published
+  payload_class   Class=N from the payload (<NA> if absent)
+  priority_class  sensor_config.PRIORITY_CLASSES[sensor] — one table
+               derived from SENSOR_CONFIG + S5_SENSOR_CONFIG — else
+               payload_class − PRIORITY_CLASS_OFFSET; <NA> for admin
+               heartbeats, PUBACKs and non-MQTT packets
+
+Usage:
+  python3 scripts/packet_labels.py all_packets_extracted_s5.csv --out labeled_s5.csv
+  (merge_and_clean_csvs() in Pcap_To_csv_Summary.py labels while merging)
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # sensor_config.py
+from sensor_config import PRIORITY_CLASS_OFFSET, PRIORITY_CLASSES
+
+LABEL_COLUMNS = ["sensor", "value", "unit", "value_text", "payload_class", "priority_class"]
+CHUNK_ROWS = 200_000
+
+# Applied with re.findall(MULTILINE) to the newline-joined chunk: every line
+# matches exactly once, so the match list lines up with the rows.
+_PAYLOAD_RE = re.compile(r"^(?:([^:\n]*):([^:\n]*)(?::Class=(\d+))?)?[^\n]*$", re.MULTILINE)
+_VALUE_RE   = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)?([^\n]*)$", re.MULTILINE)
+_TOPIC_RE   = r"^sensors?/(?P<sensor>[^/]+)$"
+
+
+def decode_msg(msg):
+    """mqtt.msg values (list) → payload text; hex decoded by one bytes.fromhex, text passed through."""
+    try:
+        # "0a" = "\n": join → one fromhex → decode → split
+        lines = bytes.fromhex("0a".join(msg)).decode("utf-8", errors="replace").split("\n")
+    except ValueError:
+        return msg   # --msg-format text extraction — already text
+    if len(lines) != len(msg):   # a payload with an embedded newline — decode one by one
+        lines = [bytes.fromhex(m).decode("utf-8", errors="replace") for m in msg]
+    return lines
+
+
+def _findall(pattern, lines):
+    """One regex pass over the joined lines → one tuple of groups per line."""
+    text = "\n".join(lines)
+    if text.count("\n") == len(lines) - 1:   # no line holds a newline of its own
+        rows = pattern.findall(text)
+        if len(rows) == len(lines):
+            return rows
+    return [tuple(g or "" for g in pattern.match(line.replace("\n", " ")).groups()) for line in lines]
+
+
+def _numbers(column):
+    """Numeric strings → float64 ("" / missing → NaN), converting each distinct value once."""
+    codes, uniques = pd.factorize(column)
+    numbers = pd.to_numeric(pd.Series(uniques, dtype=object).replace("", None), errors="coerce")
+    numbers = np.append(numbers.to_numpy(dtype="float64"), np.nan)   # code -1 (missing) → NaN
+    return pd.Series(numbers[codes], index=column.index)
+
+
+def label_frame(df, msg_col="mqtt.msg", topic_col="mqtt.topic"):
+    """Return `df` with LABEL_COLUMNS added (existing columns untouched)."""
+    out = df.copy()
+    index = out.index
+    parsed = pd.DataFrame(columns=["sensor", "value_text", "payload_class", "value", "unit"])
+
+    # Only rows that carry a payload (PUBLISH) are parsed
+    if msg_col in out.columns:
+        msg = out[msg_col]
+        present = (msg.notna() & (msg.astype("string") != "")).to_numpy(dtype=bool)
+        if present.any():
+            payload = decode_msg(msg[present].astype(str).tolist())
+            parsed = pd.DataFrame(_findall(_PAYLOAD_RE, payload), index=index[present],
+                                  columns=["sensor", "value_text", "payload_class"])
+            parsed[["value", "unit"]] = _findall(_VALUE_RE, parsed["value_text"].tolist())
+    parsed = parsed.reindex(index)
+
+    sensor = parsed["sensor"].fillna("").astype(object)
+    value_text = parsed["value_text"].fillna("").astype(object)
+    payload_class = _numbers(parsed["payload_class"]).astype("Int8")
+    value = _numbers(parsed["value"])
+    unit = parsed["unit"].where(value.notna(), "").fillna("").astype(object)
+
+    # No sensor in the payload → topic sensor/<key> (few rows; str.extract is fine here)
+    if topic_col in out.columns:
+        missing = (sensor == "") & out[topic_col].notna()
+        if missing.any():
+            from_topic = out.loc[missing, topic_col].astype("string").str.extract(_TOPIC_RE)["sensor"]
+            sensor[missing] = from_topic.fillna("").astype(object)
+
+    mapped = sensor.map(PRIORITY_CLASSES).astype("Int8")
+    out["sensor"] = sensor
+    out["value"] = value
+    out["unit"] = unit
+    out["value_text"] = value_text
+    out["payload_class"] = payload_class
+    out["priority_class"] = mapped.fillna(payload_class - PRIORITY_CLASS_OFFSET).astype("Int8")
+    return out
+
+
+def label_csv(in_csv, out_csv, chunk_rows=CHUNK_ROWS):
+    """Label an extracted CSV chunk by chunk; returns the number of rows."""
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(in_csv, chunksize=chunk_rows, dtype="string")):
+        labeled = label_frame(chunk)
+        labeled.to_csv(out_csv, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(labeled)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add sensor/value/unit/priority_class columns to an extracted CSV")
+    parser.add_argument("csv")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    rows = label_csv(args.csv, args.out, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {rows} rows labeled → {args.out} in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+pcap_features.py — Native PCAP → 16-column CSV extractor (no tshark)
+====================================================================
+pcap_to_csv_s5_v6.sh runs `tshark -T fields` with 16 -e fields and full
+dissection, the slowest stage of the pipeline by far. This module reads
+the capture directly and emits the SAME 16-column schema:
+
+  frame.number, frame.time_epoch, frame.time_delta, frame.len,
+  ip.src, ip.dst, ip.proto,
+  tcp.srcport, tcp.dstport, tcp.len, tcp.flags,
+  mqtt.clientid, mqtt.topic, mqtt.qos, mqtt.msgtype, mqtt.msg
+
+How:
+  • PcapReader memory-maps the file and yields one record at a time
+    (classic libpcap, µs or ns timestamps, either byte order)
+  • link types: Ethernet (1), Linux cooked / `-i any` (113), raw IPv4 (101, 228)
+  • Ethernet (+802.1Q) → IPv4 → TCP parsed with struct.unpack_from
+  • MQTT (TCP port 1883): fixed header, CONNECT client id, PUBLISH
+    topic / QoS / message, PUBACK — first message of the segment only,
+    same as tshark's `-E occurrence=f`
+
+Output formatting follows tshark -T fields -E separator=, -E quote=d:
+present values are double-quoted, absent values are empty; epoch/delta
+have 9 decimals; tcp.flags is 0x%04x; mqtt.msg is hex (MSG_FORMAT="text"
+decodes it as UTF-8 instead, like Wireshark's "show msg as text").
+
+Limits vs tshark: no TCP reassembly (an MQTT message split across
+segments is only decoded from the segment holding its fixed header), no
+pcapng (tcpdump -w writes classic pcap), no IPv6 fields (tshark's ip.*
+is IPv4-only too).
+
+Usage:
+  python3 scripts/pcap_features.py <pcap> <out.csv> [--msg-format hex|text]
+  python3 scripts/pcap_features.py <pcap> <out.csv> --benchmark   # vs tshark
+"""
+
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import time
+
+FIELDS = [
+    "frame.number", "frame.time_epoch", "frame.time_delta", "frame.len",
+    "ip.src", "ip.dst", "ip.proto",
+    "tcp.srcport", "tcp.dstport", "tcp.len", "tcp.flags",
+    "mqtt.clientid", "mqtt.topic", "mqtt.qos", "mqtt.msgtype", "mqtt.msg",
+]
+
+MQTT_PORT = 1883
+MSG_FORMAT = "hex"
+
+LINKTYPE_ETHERNET  = 1
+LINKTYPE_RAW       = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4      = 228
+
+MQTT_CONNECT = 1
+MQTT_PUBLISH = 3
+MQTT_PUBACK  = 4
+
+_MAGICS = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000),      # little-endian, µs
+    b"\xa1\xb2\xc3\xd4": (">", 1000),      # big-endian, µs
+    b"\x4d\x3c\xb2\xa1": ("<", 1),         # little-endian, ns
+    b"\xa1\xb2\x3c\x4d": (">", 1),         # big-endian, ns
+}
+_PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+
+
+# =====================================================================
+# Reader
+# =====================================================================
+
+class PcapReader:
+    """Memory-mapped classic pcap reader; iterate → (ts_ns, orig_len, data)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < 24:
+            raise ValueError(f"{path}: too short to be a pcap file")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self._mm[:4]
+        if magic == _PCAPNG_MAGIC:
+            raise ValueError(f"{path}: pcapng is not supported — convert with "
+                             f"`editcap -F pcap` or capture with tcpdump -w")
+        if magic not in _MAGICS:
+            raise ValueError(f"{path}: not a pcap file (magic {magic.hex()})")
+        self._endian, self._frac_to_ns = _MAGICS[magic]
+        _, _, _, _, self.snaplen, self.linktype = struct.unpack_from(self._endian + "HHiIII", self._mm, 4)
+        self.linktype &= 0x0FFFFFFF
+        self._rec = struct.Struct(self._endian + "IIII")
+        self.size = size
+
+    def __iter__(self):
+        mm, rec, frac_to_ns = self._mm, self._rec, self._frac_to_ns
+        pos, end, hdr = 24, self.size, rec.size
+        while pos + hdr <= end:
+            ts_sec, ts_frac, incl_len, orig_len = rec.unpack_from(mm, pos)
+            pos += hdr
+            if pos + incl_len > end:
+                break   # truncated last record (capture killed mid-write)
+            yield ts_sec * 1_000_000_000 + ts_frac * frac_to_ns, orig_len, mm[pos:pos + incl_len]
+            pos += incl_len
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =====================================================================
+# Decoder
+# =====================================================================
+
+class Packet:
+    """Decoded header fields of one frame (None = absent, like tshark)."""
+
+    __slots__ = ("ts_ns", "frame_len", "ip_src", "ip_dst", "ip_proto", "ip_id",
+                 "src_port", "dst_port", "tcp_len", "tcp_flags", "tcp_seq", "tcp_ack",
+                 "tcp_payload", "mqtt_clientid", "mqtt_topic", "mqtt_qos",
+                 "mqtt_msgtype", "mqtt_msg")
+
+    def __init__(self, ts_ns, frame_len):
+        self.ts_ns = ts_ns
+        self.frame_len = frame_len
+        self.ip_src = self.ip_dst = self.ip_proto = self.ip_id = None
+        self.src_port = self.dst_port = self.tcp_len = self.tcp_flags = None
+        self.tcp_seq = self.tcp_ack = None
+        self.tcp_payload = b""
+        self.mqtt_clientid = self.mqtt_topic = self.mqtt_qos = None
+        self.mqtt_msgtype = self.mqtt_msg = None
+
+
+def ip_offset(linktype, data):
+    """Offset of the IPv4 header in `data`, or None when not IPv4."""
+    if linktype == LINKTYPE_ETHERNET:
+        if len(data) < 14:
+            return None
+        ethertype = (data[12] << 8) | data[13]
+        off = 14
+        while ethertype in (0x8100, 0x88A8) and len(data) >= off + 4:   # VLAN tags
+            ethertype = (data[off + 2] << 8) | data[off + 3]
+            off += 4
+        return off if ethertype == 0x0800 else None
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(data) < 16:
+            return None
+        return 16 if ((data[14] << 8) | data[15]) == 0x0800 else None
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        return 0 if data and (data[0] >> 4) == 4 else None
+    return None
+
+
+def _remaining_length(buf, pos):
+    """MQTT variable-length integer → (value, next_pos) or (None, pos)."""
+    value, mult = 0, 1
+    for i in range(4):
+        if pos + i >= len(buf):
+            return None, pos
+        b = buf[pos + i]
+        value += (b & 0x7F) * mult
+        if not b & 0x80:
+            return value, pos + i + 1
+        mult *= 128
+    return None, pos
+
+
+def _mqtt_string(buf, pos):
+    if pos + 2 > len(buf):
+        return None, pos
+    n = (buf[pos] << 8) | buf[pos + 1]
+    pos += 2
+    return bytes(buf[pos:pos + n]).decode("utf-8", errors="replace"), pos + n
+
+
+def _decode_mqtt(pkt, buf):
+    if len(buf) < 2:
+        return
+    first = buf[0]
+    msgtype = first >> 4
+    if msgtype == 0 or msgtype > 15:
+        return
+    remaining, pos = _remaining_length(buf, 1)
+    if remaining is None:
+        return
+    pkt.mqtt_msgtype = msgtype
+    end = min(len(buf), pos + remaining)
+    body = buf[:end]
+
+    if msgtype == MQTT_PUBLISH:
+        qos = (first >> 1) & 0x03
+        pkt.mqtt_qos = qos
+        topic, p = _mqtt_string(body, pos)
+        pkt.mqtt_topic = topic
+        if topic is None:
+            return
+        if qos > 0:
+            p += 2   # packet identifier
+        msg = bytes(body[p:end])
+        pkt.mqtt_msg = msg.decode("utf-8", errors="replace") if MSG_FORMAT == "text" else msg.hex()
+    elif msgtype == MQTT_CONNECT:
+        proto, p = _mqtt_string(body, pos)
+        if proto is None:
+            return
+        level = body[p] if p < end else 0
+        p += 1 + 1 + 2   # protocol level, connect flags, keepalive
+        if level >= 5:
+            props_len, p = _remaining_length(body, p)   # MQTT 5 properties
+            p += props_len or 0
+        clientid, _ = _mqtt_string(body, p)
+        pkt.mqtt_clientid = clientid
+
+
+def decode_packet(linktype, ts_ns, orig_len, data):
+    """Decode one frame into a Packet."""
+    pkt = Packet(ts_ns, orig_len)
+    off = ip_offset(linktype, data)
+    if off is None or len(data) < off + 20:
+        return pkt
+    ihl = (data[off] & 0x0F) * 4
+    total_len = (data[off + 2] << 8) | data[off + 3]
+    pkt.ip_id = (data[off + 4] << 8) | data[off + 5]
+    pkt.ip_proto = data[off + 9]
+    pkt.ip_src = "%d.%d.%d.%d" % tuple(data[off + 12:off + 16])
+    pkt.ip_dst = "%d.%d.%d.%d" % tuple(data[off + 16:off + 20])
+    frag = ((data[off + 6] & 0x1F) << 8) | data[off + 7]
+    if pkt.ip_proto != 6 or frag != 0:
+        return pkt
+
+    t = off + ihl
+    if len(data) < t + 20:
+        return pkt
+    pkt.src_port = (data[t] << 8) | data[t + 1]
+    pkt.dst_port = (data[t + 2] << 8) | data[t + 3]
+    pkt.tcp_seq, pkt.tcp_ack = struct.unpack_from("!II", data, t + 4)
+    data_off = (data[t + 12] >> 4) * 4
+    pkt.tcp_flags = ((data[t + 12] & 0x0F) << 8) | data[t + 13]
+    ip_end = off + total_len if total_len else len(data)
+    pkt.tcp_len = max(0, ip_end - t - data_off)
+    payload = data[t + data_off:min(ip_end, len(data))]
+    pkt.tcp_payload = payload
+    if payload and MQTT_PORT in (pkt.src_port, pkt.dst_port):
+        _decode_mqtt(pkt, payload)
+    return pkt
+
+
+def iter_packets(path):
+    """Yield decoded Packets from a pcap file in capture order."""
+    with PcapReader(path) as reader:
+        linktype = reader.linktype
+        for ts_ns, orig_len, data in reader:
+            yield decode_packet(linktype, ts_ns, orig_len, data)
+
+
+# =====================================================================
+# CSV output (tshark -T fields compatible)
+# =====================================================================
+
+def _q(value):
+    return "" if value is None else f'"{value}"'
+
+
+def _ts(ns):
+    return f"{ns // 1_000_000_000}.{ns % 1_000_000_000:09d}"
+
+
+def packet_row(pkt, number, delta_ns):
+    """Format one Packet as a CSV line in FIELDS order."""
+    return ",".join((
+        _q(number), _q(_ts(pkt.ts_ns)), _q(_ts(delta_ns)), _q(pkt.frame_len),
+        _q(pkt.ip_src), _q(pkt.ip_dst), _q(pkt.ip_proto),
+        _q(pkt.src_port), _q(pkt.dst_port), _q(pkt.tcp_len),
+        _q(None if pkt.tcp_flags is None else f"0x{pkt.tcp_flags:04x}"),
+        _q(pkt.mqtt_clientid), _q(pkt.mqtt_topic), _q(pkt.mqtt_qos),
+        _q(pkt.mqtt_msgtype), _q(pkt.mqtt_msg),
+    ))
+
+
+def extract_to_csv(pcap, out_csv, header=True):
+    """Write the 16-column CSV for `pcap`; returns the number of packets."""
+    return write_csv(iter_packets(pcap), out_csv, header)
+
+
+def write_csv(packets, out_csv, header=True):
+    """Write Packets (any iterable, e.g. pcap_merge.merge_pcaps) as the 16-column CSV."""
+    count = 0
+    prev_ns = None
+    with open(out_csv, "w", buffering=1 << 20) as out:
+        if header:
+            out.write(",".join(FIELDS) + "\n")
+        for pkt in packets:
+            count += 1
+            delta = 0 if prev_ns is None else pkt.ts_ns - prev_ns
+            prev_ns = pkt.ts_ns
+            out.write(packet_row(pkt, count, delta))
+            out.write("\n")
+    return count
+
+
+# =====================================================================
+# Benchmark vs tshark
+# =====================================================================
+
+def _tshark_to_csv(pcap, out_csv):
+    cmd = ["tshark", "-r", pcap, "-T", "fields"]
+    for f in FIELDS:
+        cmd += ["-e", f]
+    cmd += ["-E", "header=y", "-E", "separator=,", "-E", "quote=d", "-E", "occurrence=f"]
+    with open(out_csv, "w") as out:
+        subprocess.run(cmd, stdout=out, stderr=subprocess.DEVNULL, check=True)
+
+
+def _compare(native_csv, tshark_csv, limit=5):
+    """Count rows whose cells differ; print the first `limit` differences."""
+    import csv
+    mismatches = 0
+    with open(native_csv, newline="") as a, open(tshark_csv, newline="") as b:
+        ra, rb = csv.reader(a), csv.reader(b)
+        next(ra), next(rb)
+        for row_a, row_b in zip(ra, rb):
+            if row_a != row_b:
+                mismatches += 1
+                if mismatches <= limit:
+                    diff = [(FIELDS[i], x, y) for i, (x, y) in enumerate(zip(row_a, row_b)) if x != y]
+                    print(f"   ≠ frame {row_a[0]}: {diff}")
+    return mismatches
+
+
+def benchmark(pcap, out_csv):
+    size_mb = os.path.getsize(pcap) / 1e6
+    start = time.perf_counter()
+    packets = extract_to_csv(pcap, out_csv)
+    native = time.perf_counter() - start
+    print(f"🐍 native : {packets} packets in {native:.2f}s "
+          f"({packets / native:,.0f} pkt/s, {size_mb / native:.1f} MB/s)")
+
+    if not shutil.which("tshark"):
+        print("⚠️ tshark not found — skipping comparison")
+        return
+    tshark_csv = out_csv + ".tshark.csv"
+    start = time.perf_counter()
+    _tshark_to_csv(pcap, tshark_csv)
+    ts = time.perf_counter() - start
+    print(f"🦈 tshark : {packets} packets in {ts:.2f}s "
+          f"({packets / ts:,.0f} pkt/s, {size_mb / ts:.1f} MB/s)")
+    print(f"⚡ speed-up: {ts / native:.1f}×")
+    mismatches = _compare(out_csv, tshark_csv)
+    print(f"🔍 rows differing from tshark: {mismatches}")
+
+
+def main(argv=None):
+    global MSG_FORMAT
+    parser = argparse.ArgumentParser(description="Native PCAP → 16-column CSV extractor")
+    parser.add_argument("pcap")
+    parser.add_argument("out_csv")
+    parser.add_argument("--msg-format", choices=["hex", "text"], default=MSG_FORMAT)
+    parser.add_argument("--benchmark", action="store_true", help="time against tshark and compare output")
+    args = parser.parse_args(argv)
+    MSG_FORMAT = args.msg_format
+
+    if args.benchmark:
+        benchmark(args.pcap, args.out_csv)
+    else:
+        start = time.perf_counter()
+        n = extract_to_csv(args.pcap, args.out_csv)
+        print(f"✅ {n} packets → {args.out_csv} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
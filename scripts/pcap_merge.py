@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+pcap_merge.py — Time-ordered k-way merge of per-interface PCAPs (no mergecap)
+=============================================================================
+Documentaion.txt mentions merging switch PCAPs with mergecap
+(MERGE_SWITCH_PCAPS), which writes a whole new capture to disk. Here the
+merge is an iterator instead:
+
+  PcapMerger(files)  — heap of (ts_ns, source) over one PcapReader per file;
+                       each step pops the oldest record and refills from the
+                       same file, so memory is O(k) records for k captures
+  merge_pcaps(files)     → MergedRecord(ts_ns, source, point, linktype, orig_len, data)
+  merged_packets(files)  → pcap_features.Packet, ready for write_csv()
+
+Each file is expected in capture order (tcpdump writes it that way); a
+record older than its predecessor in the same file is still yielded and
+counted in `out_of_order` for that capture point.
+
+run_captures() selects the captures of one run from OUTPUT_DIR by the
+start_tcpdump() name <node>_<intf>_<seed>[_<scenario>]_<YYYYmmdd_HHMMSS>.pcap;
+captures_from_manifest() takes them from a capture_manager.py manifest.
+capture_parts() returns every rotated part (<stem>.pcap, <stem>_NNN.pcap)
+of the capture one file belongs to — what the extraction scripts read when
+tcpdump -C rotation split a capture.
+
+Usage:
+  python3 scripts/pcap_merge.py <pcap> [<pcap> ...] --out merged.csv
+  python3 scripts/pcap_merge.py --dir PcapForExpt --seed 2029 --match '^s\\d+_' --out switches.csv
+  python3 scripts/pcap_merge.py --manifest PcapForExpt/capture_manifest_2029_<ts>.json --out all.csv
+  python3 scripts/pcap_merge.py --parts-of PcapForExpt/broker_broker-eth0_2025_s5_<ts>.pcap
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from typing import NamedTuple
+
+from pcap_features import PcapReader, decode_packet, write_csv
+
+
+# <node>_<intf>_<seed>[_<scenario>]_<YYYYmmdd_HHMMSS>[_<rotation part>]
+_CAPTURE_NAME_RE = re.compile(r"^(?P<point>.+?)_\d+(?:_[A-Za-z]\w*)?_\d{8}_\d{6}(?:_\d{3})?$")
+
+
+def capture_point(path):
+    """'s1_s1-eth1_2029_20250101_120000.pcap' / '..._s5_..._002.pcap' → 's1_s1-eth1'."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = _CAPTURE_NAME_RE.match(stem)
+    return m.group("point") if m else stem
+
+
+class MergedRecord(NamedTuple):
+    ts_ns: int
+    source: int        # index into the merger's file list
+    point: str         # capture point, e.g. "s1_s1-eth2"
+    linktype: int
+    orig_len: int
+    data: bytes
+
+
+class PcapMerger:
+    """Iterate the records of several pcap files in global timestamp order."""
+
+    def __init__(self, files):
+        self.files        = list(files)
+        self.points       = [capture_point(f) for f in self.files]
+        self.records      = [0] * len(self.files)
+        self.out_of_order = [0] * len(self.files)
+
+    def __iter__(self):
+        readers = [PcapReader(f) for f in self.files]
+        try:
+            iters = [iter(r) for r in readers]
+            heap = []
+            for i, it in enumerate(iters):
+                first = next(it, None)
+                if first is not None:
+                    heap.append((first[0], i, first))
+            heapq.heapify(heap)
+            while heap:
+                _, i, (ts_ns, orig_len, data) = heap[0]
+                self.records[i] += 1
+                yield MergedRecord(ts_ns, i, self.points[i], readers[i].linktype, orig_len, data)
+                nxt = next(iters[i], None)
+                if nxt is None:
+                    heapq.heappop(heap)
+                else:
+                    if nxt[0] < ts_ns:
+                        self.out_of_order[i] += 1
+                    heapq.heapreplace(heap, (nxt[0], i, nxt))
+        finally:
+            for r in readers:
+                r.close()
+
+    def packets(self):
+        """Decoded Packets in merged order."""
+        for rec in self:
+            yield decode_packet(rec.linktype, rec.ts_ns, rec.orig_len, rec.data)
+
+    def summary(self):
+        return {
+            point: {"records": n, "out_of_order": ooo}
+            for point, n, ooo in zip(self.points, self.records, self.out_of_order)
+        }
+
+
+def merge_pcaps(files):
+    return iter(PcapMerger(files))
+
+
+def merged_packets(files):
+    return PcapMerger(files).packets()
+
+
+def run_captures(directory, seed=None, match=None, include_loopback=False):
+    """start_tcpdump() captures in `directory`, optionally one seed / point regex."""
+    pattern = f"*_{seed}_*.pcap" if seed is not None else "*.pcap"
+    point_re = re.compile(match) if match else None
+    files = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        point = capture_point(path)
+        if not include_loopback and point.endswith("_lo"):
+            continue
+        if point_re and not point_re.search(point):
+            continue
+        files.append(path)
+    return files
+
+
+def captures_from_manifest(manifest_path, match=None):
+    """Files recorded by capture_manager.CaptureManager, optionally one point regex."""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    point_re = re.compile(match) if match else None
+    files = []
+    for cap in manifest.get("captures", []):
+        if point_re and not point_re.search(cap["point"]):
+            continue
+        files += [entry["path"] for entry in cap.get("files", []) if os.path.exists(entry["path"])]
+    return files
+
+
+_PART_SUFFIX_RE = re.compile(r"_\d{3}$")
+
+
+def capture_parts(path):
+    """All rotated parts of the capture `path` belongs to, in order: from a
+    capture manifest next to it if one lists the file, else by name."""
+    directory, name = os.path.split(path)
+    for manifest_path in sorted(glob.glob(os.path.join(directory or ".", "capture_manifest_*.json"))):
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for cap in manifest.get("captures", []):
+            names = [os.path.basename(entry["path"]) for entry in cap.get("files", [])]
+            if name in names:
+                # manifest paths are absolute on the capture host; look next to `path`
+                return [p for p in (os.path.join(directory, n) for n in names) if os.path.exists(p)]
+    stem = _PART_SUFFIX_RE.sub("", os.path.splitext(path)[0])
+    return sorted(set(glob.glob(stem + ".pcap") + glob.glob(stem + "_[0-9][0-9][0-9].pcap"))) or [path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming time-ordered merge of PCAPs → 16-column CSV")
+    parser.add_argument("pcaps", nargs="*")
+    parser.add_argument("--dir", default=None, help="select captures from this directory")
+    parser.add_argument("--manifest", default=None, help="capture manifest JSON from capture_manager.py")
+    parser.add_argument("--seed", default=None, help="only captures of this EXPERIMENT_SEED")
+    parser.add_argument("--match", default=None, help="regex on the capture point, e.g. '^s\\d+_'")
+    parser.add_argument("--out", default=None, help="merged 16-column CSV")
+    parser.add_argument("--parts-of", default=None, metavar="PCAP",
+                        help="print every rotated part of this capture (one per line) and exit")
+    args = parser.parse_args(argv)
+
+    if args.parts_of:
+        print("\n".join(capture_parts(args.parts_of)))
+        return 0
+    if not args.out:
+        parser.error("--out is required")
+
+    files = list(args.pcaps)
+    if args.dir:
+        files += run_captures(args.dir, args.seed, args.match)
+    if args.manifest:
+        files += captures_from_manifest(args.manifest, args.match)
+    if not files:
+        print("❌ No PCAP files to merge")
+        return 1
+
+    merger = PcapMerger(files)
+    start = time.perf_counter()
+    n = write_csv(merger.packets(), args.out)
+    print(f"✅ {n} packets from {len(files)} captures merged → {args.out} "
+          f"in {time.perf_counter() - start:.2f}s")
+    for point, s in merger.summary().items():
+        warn = f" ⚠️ {s['out_of_order']} out of order" if s["out_of_order"] else ""
+        print(f"   📦 {point}: {s['records']}{warn}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,43 @@
+import os
 import sys
+
 import pandas as pd
-import os
+
+from dataset_store import DROP_ON_LOAD, export_csv, pyarrow_available
+
+# Column projection instead of read-everything → drop → rewrite:
+#   <dataset dir>  → <dataset>.csv without mqtt.msg (dataset_store.export_csv)
+#   <csv_file>     → rewritten in chunks, mqtt.msg never parsed (usecols)
+CHUNK_ROWS = 200_000
 
 if len(sys.argv) < 2:
-    print("Usage: python3 pcap_to_csv_postprocess.py <csv_file>")
+    print("Usage: python3 pcap_to_csv_postprocess.py <csv_file | parquet dataset dir>")
     sys.exit(1)
 
-csv_file = sys.argv[1]
+path = sys.argv[1].rstrip("/")
+
+if os.path.isdir(path):
+    if not pyarrow_available():
+        print("❌ Error: the Parquet dataset needs pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    out_csv = os.path.splitext(path)[0] + ".csv"
+    print(f"🧹 Exporting dataset: {path}")
+    rows = export_csv(path, out_csv)
+    print(f"✅ Exported {rows} rows without {', '.join(DROP_ON_LOAD)}: {out_csv}")
+    sys.exit(0)
+
+csv_file = path
 print(f"🧹 Cleaning CSV: {csv_file}")
 
 try:
-    df = pd.read_csv(csv_file)
-    # Drop mqtt.msg if present
-    if "mqtt.msg" in df.columns:
-        df.drop(columns=["mqtt.msg"], inplace=True)
-    # Fill empty cells with NaN for Excel readability
-    df = df.fillna("")
-    df.to_csv(csv_file, index=False)
+    # Drop mqtt.msg if present — by not reading it
+    columns = [c for c in pd.read_csv(csv_file, nrows=0).columns if c not in DROP_ON_LOAD]
+    tmp_file = csv_file + ".tmp"
+    # Everything stays text; empty cells are written back empty for Excel readability
+    for i, chunk in enumerate(pd.read_csv(csv_file, usecols=columns, dtype=str, keep_default_na=False,
+                                          chunksize=CHUNK_ROWS)):
+        chunk.to_csv(tmp_file, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    os.replace(tmp_file, csv_file)
     print(f"✅ Cleaned and saved: {csv_file}")
 except Exception as e:
     print(f"❌ Error: {e}")
-
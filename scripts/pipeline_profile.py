@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+pipeline_profile.py — Per-stage / per-file profile of the PCAP → dataset pipeline
+=================================================================================
+One overall elapsed time does not say whether extraction, the merge or the
+summary is the slow part, nor which PCAP. PipelineProfile records per stage
+
+  wall_s             time.perf_counter()
+  cpu_s              this process, user + sys (os.times)
+  children_cpu_s     reaped child processes (bash / tshark extraction)
+  peak_rss_mb        this process during the stage — Linux resets the
+                     high-water mark (/proc/self/clear_refs "5", VmHWM) at
+                     stage start; elsewhere ru_maxrss (peak so far)
+  children_peak_rss_mb  largest reaped child so far (ru_maxrss, never reset)
+  io_read / io_write bytes this process read / wrote (/proc/self/io rchar /
+                     wchar, Linux only — page cache included)
+  bytes_in / bytes_out / packets   what the stage consumed / produced
+                     (set by the caller) → pkt_per_s, mb_per_s
+
+and per file (file(...)): wall, child CPU and peak RSS from os.wait4() for
+extraction jobs, rows/bytes/seconds per input CSV for the merge. A child's
+ru_maxrss includes the pipeline's own RSS at fork (Linux keeps the pre-exec
+high-water mark), so per-file RSS is for comparing files, not absolute.
+
+save() → <out_dir>/pipeline_profile_<YYYYmmdd_HHMMSS>.json; report_lines()
+for the console. Two runs' JSON files diff cleanly for regression tracking.
+
+Optional profiler hook around the whole run (profiler(kind, prefix)):
+  cprofile     → <prefix>.prof (python3 -m pstats / snakeviz)
+  pyinstrument → <prefix>.html — needs pyinstrument (optional dependency)
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILERS = ["cprofile", "pyinstrument"]
+MB = 1024 * 1024
+
+
+# =====================================================================
+# Process counters
+# =====================================================================
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system, t.children_user + t.children_system
+
+
+def _proc_status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Restart the VmHWM high-water mark (Linux ≥ 4.0); False if not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb(reset_ok):
+    kb = _proc_status_kb("VmHWM") if reset_ok else None
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KiB on Linux
+        if sys.platform == "darwin":
+            kb //= 1024   # bytes there
+    return round(kb / 1024, 1)
+
+
+def _io():
+    """(rchar, wchar) of this process, or (None, None) without /proc/self/io."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def wait_with_rusage(proc):
+    """proc.wait() that also returns the child's resource usage (os.wait4, POSIX).
+
+    Another thread's proc.poll() / proc.terminate() (which polls first) may
+    reap the child before wait4 does; then there is no rusage left to read
+    and this falls back to proc.wait() with usage None."""
+    if not hasattr(os, "wait4"):
+        return proc.wait(), None
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        return proc.wait(), None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, usage
+
+
+def count_lines(path, block=1 << 20):
+    """Newlines in a file (rows + header of a CSV), read in 1 MiB blocks."""
+    n = 0
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                return n
+            n += buf.count(b"\n")
+
+
+# =====================================================================
+# Stages
+# =====================================================================
+
+class Stage:
+    """Counters of one pipeline stage; the caller may set bytes_in/bytes_out/packets."""
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes_in = None
+        self.bytes_out = None
+        self.packets = None
+        self.extra = {}
+        self.wall_s = self.cpu_s = self.children_cpu_s = 0.0
+        self.peak_rss_mb = self.children_peak_rss_mb = None
+        self.io_read = self.io_write = None
+
+    def start(self):
+        self._reset_ok = _reset_peak_rss()
+        self._io = _io()
+        self._cpu = _cpu()
+        self._wall = time.perf_counter()
+
+    def stop(self):
+        self.wall_s = time.perf_counter() - self._wall
+        cpu, children = _cpu()
+        self.cpu_s = cpu - self._cpu[0]
+        self.children_cpu_s = children - self._cpu[1]
+        self.peak_rss_mb = _peak_rss_mb(self._reset_ok)
+        self.children_peak_rss_mb = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+        read, write = _io()
+        if read is not None and self._io[0] is not None:
+            self.io_read, self.io_write = read - self._io[0], write - self._io[1]
+
+    def as_dict(self):
+        d = {
+            "stage": self.name,
+            "wall_s": round(self.wall_s, 3),
+            "cpu_s": round(self.cpu_s, 3),
+            "children_cpu_s": round(self.children_cpu_s, 3),
+            "cpu_util": round((self.cpu_s + self.children_cpu_s) / self.wall_s, 2) if self.wall_s else None,
+            "peak_rss_mb": self.peak_rss_mb,
+            "children_peak_rss_mb": self.children_peak_rss_mb,
+            "io_read_bytes": self.io_read,
+            "io_write_bytes": self.io_write,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "packets": self.packets,
+            "pkt_per_s": round(self.packets / self.wall_s) if self.packets and self.wall_s else None,
+            "mb_per_s": round(self.bytes_in / MB / self.wall_s, 1) if self.bytes_in and self.wall_s else None,
+        }
+        d.update(self.extra)
+        return d
+
+
+class PipelineProfile:
+    """Stages + per-file records of one pipeline run → JSON."""
+
+    def __init__(self, out_dir, argv=None):
+        self.out_dir = out_dir
+        self.argv = list(sys.argv if argv is None else argv)
+        self.started_at = time.time()
+        self.stages = []
+        self.files = []
+
+    @contextmanager
+    def stage(self, name):
+        st = Stage(name)
+        st.start()
+        try:
+            yield st
+        finally:
+            st.stop()
+            self.stages.append(st)
+
+    def file(self, stage, path, wall_s, usage=None, **counters):
+        """One per-file record; `usage` is the os.wait4 rusage of the job's process."""
+        rec = {"stage": stage, "file": os.path.basename(path), "wall_s": round(wall_s, 3)}
+        if usage is not None:
+            rec["cpu_s"] = round(usage.ru_utime + usage.ru_stime, 3)
+            rec["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+        rec.update({k: v for k, v in counters.items() if v is not None})
+        if rec.get("packets") and wall_s:
+            rec["pkt_per_s"] = round(rec["packets"] / wall_s)
+        self.files.append(rec)
+        return rec
+
+    def file_totals(self, stage):
+        """(bytes_in, bytes_out, packets) summed over the stage's file records (None if none)."""
+        recs = [r for r in self.files if r["stage"] == stage]
+        if not recs:
+            return None, None, None
+        return tuple(sum(r.get(k, 0) for r in recs) for k in ("bytes_in", "bytes_out", "packets"))
+
+    def timings(self):
+        return {st.name: st.wall_s for st in self.stages}
+
+    def as_dict(self):
+        return {
+            "started_at": self.started_at,
+            "argv": self.argv,
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "stages": [st.as_dict() for st in self.stages],
+            "files": self.files,
+        }
+
+    def save(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        ts = datetime.fromtimestamp(self.started_at).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.out_dir, f"pipeline_profile_{ts}.json")
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+        return path
+
+    def report_lines(self):
+        lines = [f"   {'stage':<12} {'wall s':>8} {'cpu s':>8} {'child s':>8} {'rss MB':>8} "
+                 f"{'packets':>10} {'pkt/s':>10}"]
+        for st in self.stages:
+            d = st.as_dict()
+            lines.append(f"   {st.name:<12} {d['wall_s']:>8.2f} {d['cpu_s']:>8.2f} {d['children_cpu_s']:>8.2f} "
+                         f"{d['peak_rss_mb'] or 0:>8.1f} {d['packets'] or '-':>10} {d['pkt_per_s'] or '-':>10}")
+        slow = sorted(self.files, key=lambda r: r["wall_s"], reverse=True)[:3]
+        if slow:
+            lines.append("   slowest files: " + ", ".join(f"{r['file']} ({r['stage']}, {r['wall_s']:.1f}s)"
+                                                    for r in slow))
+        return lines
+
+
+# =====================================================================
+# Optional profiler hook
+# =====================================================================
+
+@contextmanager
+def profiler(kind, prefix):
+    """Profile the enclosed block with cProfile or pyinstrument (kind None → no-op)."""
+    if not kind:
+        yield None
+        return
+    if kind == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield prof
+        finally:
+            prof.disable()
+            prof.dump_stats(prefix + ".prof")
+            print(f"🔬 cProfile → {prefix}.prof (python3 -m pstats {prefix}.prof)")
+    elif kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler   # optional dependency — only for --profile pyinstrument
+        except ImportError:
+            raise SystemExit("❌ --profile pyinstrument needs pyinstrument (pip install pyinstrument)")
+        prof = Profiler()
+        prof.start()
+        try:
+            yield prof
+        finally:
+            prof.stop()
+            with open(prefix + ".html", "w") as f:
+                f.write(prof.output_html())
+            print(f"🔬 pyinstrument → {prefix}.html")
+    else:
+        raise ValueError(f"unknown profiler {kind!r} (choose from {', '.join(PROFILERS)})")
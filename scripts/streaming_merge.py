@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+streaming_merge.py — Out-of-core merge + dedup of extracted CSVs
+================================================================
+merge_and_clean_csvs() used to pd.read_csv every *_labeled.csv, pd.concat
+them and drop_duplicates — peak memory several times the dataset size.
+
+stream_merge_dedup() instead:
+  1. reads only the headers first → union of columns (+ source_file)
+  2. reads every CSV in chunks of `chunk_rows` with explicit dtypes
+  3. hashes the DUPLICATE_KEYS columns of each row to one uint64
+     (pd.util.hash_pandas_object) and keeps the hashes of rows already
+     written in a sorted numpy array — 8 bytes per unique row
+  4. appends the surviving rows of each chunk straight to the output CSV
+     and/or hands them to sinks (dataset_store.ParquetDatasetWriter,
+     dataset_summary.DatasetSummary)
+
+If the hash array would not fit in `memory_budget_mb` (estimated from the
+input sizes), rows are first spilled into N hash partitions on disk and
+each partition is deduplicated on its own, so memory stays bounded by
+budget / N. First-occurrence-wins semantics are the same in both modes;
+only the row order of the output differs in partitioned mode (grouped by
+partition, file order kept inside each).
+
+A file that fails part-way (malformed row, bad value for its dtype, read
+error) is logged, listed in MergeStats.skipped_files and the merge goes on
+with the next file; its rows read before the error stay in the output (in
+partitioned mode: in the spill partitions). Write errors still abort.
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+HASH_BYTES = 8          # one uint64 per unique row
+HASH_OVERHEAD = 2       # np.insert copies the set: old + new array while it runs
+SAMPLE_BYTES = 1 << 16  # bytes read to estimate the average row size
+
+# Explicit dtypes for the tshark columns — everything else is read as str.
+# Nullable Int64 because non-TCP / non-IP packets leave these empty.
+CSV_DTYPES = {
+    "frame.number": "Int64",
+    "frame.time_epoch": "float64",
+    "frame.time_delta": "float64",
+    "frame.time_relative": "float64",
+    "frame.len": "Int64",
+    "ip.src": "string",
+    "ip.dst": "string",
+    "ip.proto": "Int64",
+    "tcp.srcport": "Int64",
+    "tcp.dstport": "Int64",
+    "tcp.len": "Int64",
+    "tcp.flags": "string",
+    "mqtt.clientid": "string",
+    "mqtt.topic": "string",
+    "mqtt.qos": "string",
+    "mqtt.msgtype": "string",
+    "mqtt.msg": "string",
+}
+
+
+@dataclass
+class MergeStats:
+    output_file: str
+    columns: list = field(default_factory=list)
+    rows_in: int = 0
+    rows: int = 0
+    files: int = 0
+    skipped_files: list = field(default_factory=list)
+    partitions: int = 1
+    dedup_keys: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)   # files / datasets written
+    file_stats: list = field(default_factory=list)   # per input: file, bytes, rows_in, seconds
+
+    @property
+    def duplicates(self):
+        return self.rows_in - self.rows
+
+
+class _HashSet:
+    """Sorted uint64 array used as a compact 'already written' set."""
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def filter_new(self, hashes):
+        """Return a mask of first occurrences (vs. the set AND within `hashes`)."""
+        # first occurrence within the chunk
+        _, first_idx = np.unique(hashes, return_index=True)
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first_idx] = True
+        # not already seen in earlier chunks
+        if len(self.hashes):
+            pos = np.searchsorted(self.hashes, hashes)
+            pos[pos == len(self.hashes)] = 0
+            mask &= self.hashes[pos] != hashes
+        # merge the sorted new hashes in at their positions — one O(n) copy,
+        # instead of re-sorting the whole set per chunk (np.union1d)
+        new = np.sort(hashes[mask])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, new), new)
+        return mask
+
+
+def _estimate_rows(path):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    lines = max(1, sample.count(b"\n"))
+    return int(size / (len(sample) / lines)) if sample else 0
+
+
+def _read_columns(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _chunks(path, columns, chunk_rows, tag_source=True):
+    dtypes = {c: CSV_DTYPES.get(c, "string") for c in columns}
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes):
+        if tag_source:
+            chunk["source_file"] = os.path.basename(path)
+        yield chunk.reindex(columns=columns)
+
+
+def _input_chunks(stats, path, columns, chunk_rows, log):
+    """_chunks() of one input file; a read error skips the rest of the file."""
+    rows_in = 0
+    try:
+        for chunk in _chunks(path, columns, chunk_rows):
+            rows_in += len(chunk)
+            yield chunk
+    except Exception as e:   # only reading / parsing — errors of the caller's loop body are not seen here
+        log(f"⚠️ Skipping rest of {path} after {rows_in:,} rows due to error: {e}")
+        stats.skipped_files.append(path)
+        stats.files -= 1
+
+
+def _row_hashes(chunk, keys):
+    return pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy(dtype=np.uint64)
+
+
+def _append(df, path, header):
+    df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+
+
+def _file_stat(stats, path, rows_in, started):
+    stats.file_stats.append({"file": path, "bytes": os.path.getsize(path), "rows_in": rows_in,
+                             "seconds": time.perf_counter() - started})
+
+
+def stream_merge_dedup(files, output_file, dedup_keys, memory_budget_mb=1024,
+                       chunk_rows=200_000, log=print, transform=None, transform_columns=(),
+                       sinks=(), work_dir=None):
+    """Merge `files` into `output_file`, dropping duplicate rows on `dedup_keys`.
+
+    transform(chunk) → chunk runs on every deduplicated chunk just before it
+    is written (e.g. packet_labels.label_frame) and adds `transform_columns`.
+    sink.write(chunk) for every sink in `sinks` receives the same chunks;
+    output_file=None writes no CSV.
+    Spill partitions go to `work_dir` (default: next to output_file)."""
+    stats = MergeStats(output_file=output_file, outputs=[output_file] if output_file else [])
+
+    def write(chunk, header):
+        if transform is not None:
+            chunk = transform(chunk)
+        if output_file:
+            _append(chunk, output_file, header)
+        for sink in sinks:
+            sink.write(chunk)
+
+    readable = []
+    columns = []
+    for path in files:
+        try:
+            for c in _read_columns(path):
+                if c not in columns:
+                    columns.append(c)
+            readable.append(path)
+        except Exception as e:
+            log(f"⚠️ Skipping {path} due to error: {e}")
+            stats.skipped_files.append(path)
+    columns.append("source_file")
+    stats.columns = columns + [c for c in transform_columns if c not in columns]
+    stats.files = len(readable)
+    stats.dedup_keys = [k for k in dedup_keys if k in columns]
+    if not stats.dedup_keys:
+        log("⚠️ No duplicate-check columns found; skipping deduplication.")
+
+    est_rows = sum(_estimate_rows(p) for p in readable)
+    budget = memory_budget_mb * 1024 * 1024
+    need = est_rows * HASH_BYTES * HASH_OVERHEAD
+    stats.partitions = max(1, math.ceil(need / budget)) if stats.dedup_keys else 1
+    log(f"🔄 Streaming merge of {len(readable)} CSVs (~{est_rows:,} rows, "
+        f"{stats.partitions} partition(s), budget {memory_budget_mb} MB)")
+
+    if stats.partitions == 1:
+        seen = _HashSet()
+        header = True
+        for path in readable:
+            log(f"📦 Streaming {os.path.basename(path)} ...")
+            started, rows_in = time.perf_counter(), stats.rows_in
+            for chunk in _input_chunks(stats, path, columns, chunk_rows, log):
+                stats.rows_in += len(chunk)
+                if stats.dedup_keys:
+                    chunk = chunk[seen.filter_new(_row_hashes(chunk, stats.dedup_keys))]
+                write(chunk, header)
+                header = False
+                stats.rows += len(chunk)
+            _file_stat(stats, path, stats.rows_in - rows_in, started)
+        if header and output_file:   # no rows at all — still write the header
+            _append(pd.DataFrame(columns=stats.columns), output_file, True)
+        return stats
+
+    # ── Partitioned (spill-to-disk) mode ─────────────────────────────
+    work_dir = work_dir or (os.path.dirname(os.path.abspath(output_file)) if output_file else None)
+    spill_dir = tempfile.mkdtemp(prefix="merge_spill_", dir=work_dir)
+    try:
+        part_paths = [os.path.join(spill_dir, f"part_{i:04d}.csv") for i in range(stats.partitions)]
+        part_started = [False] * stats.partitions
+        for path in readable:
+            log(f"📦 Partitioning {os.path.basename(path)} ...")
+            started, rows_in = time.perf_counter(), stats.rows_in
+            for chunk in _input_chunks(stats, path, columns, chunk_rows, log):
+                stats.rows_in += len(chunk)
+                hashes = _row_hashes(chunk, stats.dedup_keys)
+                part_of = hashes % np.uint64(stats.partitions)
+                for p in np.unique(part_of):
+                    part = chunk[part_of == p]
+                    _append(part, part_paths[p], not part_started[p])
+                    part_started[p] = True
+            _file_stat(stats, path, stats.rows_in - rows_in, started)   # pass 1 only
+
+        header = True
+        for p, part_path in enumerate(part_paths):
+            if not part_started[p]:
+                continue
+            seen = _HashSet()
+            # spilled rows already carry source_file from pass 1
+            for chunk in _chunks(part_path, columns, chunk_rows, tag_source=False):
+                chunk = chunk[seen.filter_new(_row_hashes(chunk, stats.dedup_keys))]
+                write(chunk, header)
+                header = False
+                stats.rows += len(chunk)
+            os.remove(part_path)
+        if header and output_file:
+            _append(pd.DataFrame(columns=stats.columns), output_file, True)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return stats
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+sensor_agent.py — Long-lived per-host sensor agents fed over a control socket
+=============================================================================
+The collectors `host.popen` a fresh `python3 S5_sensor_publisher.py` per
+sensor (and BaseCode one `sensor_publisher.py all` per host), so every
+sensor pays interpreter start-up + paho import and keeps its own ~15 MB
+interpreter resident.
+
+Here the expensive part happens once:
+
+  zygote   python3 sensor_agent.py --zygote /tmp/sensor_zygote_<tag>.sock
+           imports paho, sensor_config and publisher_engine in the root
+           namespace, then for every {"op": "spawn"} forks a child, moves
+           it into the Mininet host's network namespace (setns on
+           /proc/<host pid>/ns/net) and runs an agent there
+  agent    one asyncio loop per host (publisher_engine's paho ↔ asyncio
+           bridge and SimulatedSensor), one MQTT connection per broker
+           shared by its sensors ("dedicated": own connection), listening
+           on a Unix control socket; adding a sensor is one task on the
+           loop — no process, no import
+           (python3 sensor_agent.py --control /tmp/agent_h9.sock runs a
+           single agent directly, e.g. from host.popen)
+
+Control protocol — one JSON object per line, one JSON reply per line:
+  {"op": "add", "sensor": "infusion_pump", "broker": "10.0.0.2",
+   "port": 1883, "profile": "s5", "name": "infusion_pump", "dedicated": false}
+  {"op": "remove", "name": "infusion_pump"}
+  {"op": "list"}   {"op": "stats"}   {"op": "shutdown"}
+  zygote: {"op": "spawn", "netns_pid": 1234, "host": "h9",
+           "control": "/tmp/agent_h9.sock", "log": "/tmp/agent_h9.log"}
+
+Payloads, topics, QoS, seeds and admin heartbeats are those of
+publisher_engine.py (and so of sensor_publisher.py). sensor_config's
+EXPERIMENT_SEED / PUBLISH_INTERVAL_SCALE are read once, in the zygote.
+
+AgentPool is the root-namespace side used by scenario_runner.py
+("publisher_mode": "agent") and the collectors (USE_SENSOR_AGENTS).
+
+Usage:
+  python3 sensor_agent.py --zygote /tmp/sensor_zygote.sock
+  python3 sensor_agent.py --control /tmp/agent_h9.sock [--log /tmp/agent_h9.log]
+  python3 sensor_agent.py --benchmark 100 [--broker 127.0.0.1]
+"""
+
+import argparse
+import asyncio
+import ctypes
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+BROKER_PORT     = 1883
+CONNECT_WAIT    = 10.0    # s to wait for a control socket to appear
+CLONE_NEWNET    = 0x40000000
+DEFAULT_PROFILE = "s1"    # sensor_config.PROFILES key, as publisher_engine.py
+
+
+# =====================================================================
+# Agent (runs inside the host's network namespace)
+# =====================================================================
+
+class SensorAgent:
+    """Sensors of one host on one event loop, driven by control requests."""
+
+    def __init__(self, control_path, log_file=None, host=None):
+        from publisher_log import get_logger
+        # Mininet hosts share the root UTS namespace — gethostname() is the same
+        # everywhere, so client ids use the host label the caller passes in
+        self.host         = host or socket.gethostname()
+        self.control_path = control_path
+        self.log          = get_logger(log_file or f"/tmp/agent_{self.host}.log")
+        self.connections  = {}     # (broker, port) or sensor name → AsyncioMqttConnection
+        self.sensors      = {}     # name → (SimulatedSensor, task, connection key)
+        self.started      = time.time()
+        self._stop        = None
+        self._conn_seq    = 0
+
+    async def _connection(self, key, client_id, broker, port):
+        from publisher_engine import AsyncioMqttConnection
+        conn = self.connections.get(key)
+        if conn is None:
+            conn = AsyncioMqttConnection(asyncio.get_running_loop(), client_id, broker, port, self.log)
+            self.connections[key] = conn
+            self._conn_seq += 1
+            asyncio.get_running_loop().create_task(conn.connect())
+        return conn
+
+    async def add(self, sensor, broker, port=BROKER_PORT, profile=DEFAULT_PROFILE, name=None,
+                  dedicated=False):
+        from publisher_engine import SimulatedSensor
+        from sensor_config import PROFILES
+        config, aliases = PROFILES[profile]
+        key = aliases.get(sensor.lower(), sensor.lower())
+        if key not in config:
+            raise ValueError(f"unknown sensor {sensor!r} for profile {profile}")
+        name = name or key
+        if name in self.sensors:
+            raise ValueError(f"sensor {name!r} already running")
+        conn_key = name if dedicated else (broker, port)
+        client_id = f"agent-{self.host}-{name if dedicated else self._conn_seq}"
+        conn = await self._connection(conn_key, client_id, broker, port)
+        sim = SimulatedSensor(name, key, config[key], conn, self.log)
+        task = asyncio.get_running_loop().create_task(sim.run(self._stop))
+        self.sensors[name] = (sim, task, conn_key)
+        return {"name": name, "sensor": key, "class": config[key]["class"]}
+
+    async def remove(self, name):
+        sim, task, conn_key = self.sensors.pop(name)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        if not any(k == conn_key for _, _, k in self.sensors.values()):
+            self.connections.pop(conn_key).close()
+        return {"name": name, "published": sim.published}
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "rss_kb": rss_kb(os.getpid()),
+            "connections": len(self.connections),
+            "sensors": {name: {"sensor": sim.sensor_key, "published": sim.published, "failed": sim.failed}
+                        for name, (sim, _, _) in self.sensors.items()},
+        }
+
+    async def handle(self, request):
+        op = request.get("op")
+        if op == "add":
+            args = {k: request[k] for k in ("sensor", "broker", "port", "profile", "name", "dedicated")
+                    if k in request}
+            return await self.add(**args)
+        if op == "remove":
+            return await self.remove(request["name"])
+        if op == "list":
+            return sorted(self.sensors)
+        if op == "stats":
+            return self.stats()
+        if op == "shutdown":
+            self._stop.set()
+            return {"sensors": len(self.sensors)}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def _client(self, reader, writer):
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.CancelledError, ConnectionError):   # agent shutting down
+                break
+            if not line:
+                break
+            try:
+                reply = {"ok": True, "result": await self.handle(json.loads(line))}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+        writer.close()
+
+    async def serve(self):
+        from publisher_log import INFO
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop.set)
+        if os.path.exists(self.control_path):
+            os.remove(self.control_path)
+        server = await asyncio.start_unix_server(self._client, path=self.control_path)
+        self.log.log(f"[Agent] {self.host} pid {os.getpid()} listening on {self.control_path}", INFO)
+        await self._stop.wait()
+
+        server.close()
+        for name in list(self.sensors):
+            await self.remove(name)
+        await asyncio.sleep(0.2)   # let DISCONNECT packets drain through the loop
+        if os.path.exists(self.control_path):
+            os.remove(self.control_path)
+        self.log.log("[Agent] Stopped cleanly.", INFO)
+
+
+def run_agent(control_path, log_file=None, host=None):
+    from publisher_log import close_all
+    try:
+        asyncio.run(SensorAgent(control_path, log_file, host).serve())
+    finally:
+        close_all()
+
+
+# =====================================================================
+# Zygote (root namespace): preimport once, fork one agent per host
+# =====================================================================
+
+def _setns(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "setns"):   # Python 3.12+
+            os.setns(fd, CLONE_NEWNET)
+        elif ctypes.CDLL(None, use_errno=True).setns(fd, CLONE_NEWNET) != 0:
+            raise OSError(ctypes.get_errno(), f"setns {path}")
+    finally:
+        os.close(fd)
+
+
+def _spawn(request, *inherited):
+    pid = os.fork()
+    if pid:
+        return pid
+    # ── child ──
+    code = 0
+    try:
+        for sock in inherited:
+            sock.close()
+        os.setsid()
+        _setns(f"/proc/{request['netns_pid']}/ns/net")
+        run_agent(request["control"], request.get("log"), request.get("host"))
+    except BaseException as e:
+        print(f"❌ agent {request.get('control')}: {e}", file=sys.stderr)
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def run_zygote(control_path):
+    import paho.mqtt.client           # noqa: F401 — the import every agent would pay
+    import publisher_engine           # noqa: F401
+    import sensor_config              # noqa: F401
+
+    if os.path.exists(control_path):
+        os.remove(control_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(control_path)
+    listener.listen(64)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    children = {}
+    print(f"🧬 Sensor agent zygote pid {os.getpid()} on {control_path}", flush=True)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            with conn, conn.makefile("rwb") as f:
+                for line in f:
+                    request = json.loads(line)
+                    try:
+                        if request.get("op") == "spawn":
+                            pid = _spawn(request, listener, conn)
+                            children[pid] = request["control"]
+                            reply = {"ok": True, "result": {"pid": pid}}
+                        elif request.get("op") == "shutdown":
+                            f.write(b'{"ok": true, "result": null}\n')
+                            f.flush()
+                            return
+                        else:
+                            raise ValueError(f"unknown op {request.get('op')!r}")
+                    except Exception as e:
+                        reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                    f.write((json.dumps(reply) + "\n").encode())
+                    f.flush()
+                    while children:   # reap agents that already exited
+                        pid, _ = os.waitpid(-1, os.WNOHANG)
+                        if not pid:
+                            break
+                        children.pop(pid, None)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        if os.path.exists(control_path):
+            os.remove(control_path)
+
+
+# =====================================================================
+# Root-namespace side
+# =====================================================================
+
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class AgentClient:
+    """Blocking line-JSON client for an agent or the zygote."""
+
+    def __init__(self, path, timeout=CONNECT_WAIT):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(path)
+                break
+            except OSError:
+                self.sock.close()
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"no agent on {path} after {timeout:g}s")
+                time.sleep(0.05)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, op, **kwargs):
+        self.file.write((json.dumps({"op": op, **kwargs}) + "\n").encode())
+        self.file.flush()
+        reply = json.loads(self.file.readline() or b'{"ok": false, "error": "connection closed"}')
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class AgentPool:
+    """One zygote + one agent per Mininet host, addressed by node."""
+
+    def __init__(self, tag, log_dir="/tmp", env=None):
+        self.tag      = tag
+        self.log_dir  = log_dir
+        self.env      = env or {}
+        self.path     = f"/tmp/sensor_zygote_{tag}.sock"
+        self.zygote   = None
+        self.control  = None
+        self.agents   = {}     # node name → AgentClient
+
+    def start(self):
+        env = dict(os.environ, **{k: str(v) for k, v in self.env.items()})
+        here = os.path.dirname(os.path.abspath(__file__))
+        self.zygote = subprocess.Popen([sys.executable, os.path.join(here, "sensor_agent.py"), "--zygote", self.path],
+                                       cwd=here, env=env,
+                                       stdout=open(f"{self.log_dir}/sensor_zygote_{self.tag}.log", "w"),
+                                       stderr=subprocess.STDOUT)
+        self.control = AgentClient(self.path)
+
+    def agent_for(self, node):
+        if self.control is None:
+            self.start()
+        if node.name not in self.agents:
+            path = f"/tmp/sensor_agent_{self.tag}_{node.name}.sock"
+            self.control.request("spawn", netns_pid=node.pid, control=path, host=node.name,
+                                 log=f"{self.log_dir}/sensor_agent_{node.name}_{self.tag}.log")
+            self.agents[node.name] = AgentClient(path)
+        return self.agents[node.name]
+
+    def add(self, node, sensor, broker, port=BROKER_PORT, profile=DEFAULT_PROFILE, **kwargs):
+        """Assign one sensor (or "all" of the profile) to the agent on `node`."""
+        from sensor_config import PROFILES
+        agent = self.agent_for(node)
+        sensors = list(PROFILES[profile][0]) if sensor == "all" else [sensor]
+        return [agent.request("add", sensor=s, broker=broker, port=port, profile=profile, **kwargs)
+                for s in sensors]
+
+    def stop(self):
+        for agent in self.agents.values():
+            try:
+                agent.request("shutdown")
+                agent.close()
+            except (OSError, RuntimeError, ValueError):
+                pass
+        self.agents = {}
+        if self.control is not None:
+            try:
+                self.control.request("shutdown")
+            except (OSError, RuntimeError, ValueError):
+                pass
+            self.control.close()
+            self.control = None
+        if self.zygote is not None:
+            try:
+                self.zygote.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.zygote.kill()
+            self.zygote = None
+
+
+# =====================================================================
+# Benchmark: add latency and resident memory per sensor
+# =====================================================================
+
+def benchmark(count, broker="127.0.0.1", port=BROKER_PORT, profile="s5"):
+    """Local agent (no namespaces): time `count` adds, RSS before/after,
+    vs. the RSS of one bare publisher interpreter (paho + sensor_config)."""
+    from sensor_config import PROFILES
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = f"/tmp/sensor_agent_bench_{os.getpid()}.sock"
+    agent = subprocess.Popen([sys.executable, os.path.join(here, "sensor_agent.py"), "--control", path,
+                              "--log", f"/tmp/sensor_agent_bench_{os.getpid()}.log"],
+                             cwd=here, env=dict(os.environ, PUBLISHER_LOG_VERBOSITY="quiet"))
+    baseline = subprocess.Popen([sys.executable, "-c",
+                                 "import paho.mqtt.client, sensor_config, publish_scheduler, "
+                                 "latency_metrics, publisher_log, time; time.sleep(30)"], cwd=here)
+    try:
+        client = AgentClient(path)
+        rss0 = rss_kb(agent.pid)
+        keys = list(PROFILES[profile][0])
+        lat = []
+        for i in range(count):
+            t = time.perf_counter()
+            client.request("add", sensor=keys[i % len(keys)], name=f"{keys[i % len(keys)]}_{i}",
+                           broker=broker, port=port, profile=profile)
+            lat.append(time.perf_counter() - t)
+        time.sleep(1.0)            # sensor tasks have started publishing
+        rss1 = rss_kb(agent.pid)
+        per_process = rss_kb(baseline.pid)
+        lat.sort()
+        result = {
+            "sensors": count,
+            "add_us_median": round(lat[len(lat) // 2] * 1e6, 1),
+            "add_us_p99": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1e6, 1),
+            "agent_rss_kb_empty": rss0,
+            "agent_rss_kb": rss1,
+            "agent_kb_per_sensor": round((rss1 - rss0) / count, 1) if rss0 and rss1 else None,
+            "process_per_sensor_rss_kb": per_process,
+        }
+        client.request("shutdown")
+        client.close()
+    finally:
+        for p in (agent, baseline):
+            if p.poll() is None:
+                p.terminate()
+            p.wait()
+    print(f"⏱️  add: median {result['add_us_median']} µs, p99 {result['add_us_p99']} µs")
+    print(f"📦 agent RSS {result['agent_rss_kb_empty']} → {result['agent_rss_kb']} kB "
+          f"({result['agent_kb_per_sensor']} kB/sensor) vs {result['process_per_sensor_rss_kb']} kB "
+          f"per publisher process")
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-host sensor agents fed over a control socket")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--control", help="run one agent on this Unix socket")
+    mode.add_argument("--zygote", help="run the forking zygote on this Unix socket")
+    mode.add_argument("--benchmark", type=int, help="time N sensor adds on a local agent")
+    parser.add_argument("--log", default=None, help="agent log file")
+    parser.add_argument("--host", default=None, help="agent: host label for MQTT client ids")
+    parser.add_argument("--broker", default="127.0.0.1", help="benchmark: broker address")
+    parser.add_argument("--port", type=int, default=BROKER_PORT)
+    args = parser.parse_args(argv)
+
+    if args.control:
+        run_agent(args.control, args.log, args.host)
+    elif args.zygote:
+        run_zygote(args.zygote)
+    else:
+        benchmark(args.benchmark, args.broker, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+sensor_config.py — Shared sensor tables for every publisher
+============================================================
+Single source of truth for SENSOR_CONFIG / ALIASES so the publisher
+scripts, the asyncio publisher engine and the downstream stages all agree
+on sensor names, units, classes and intervals.
+
+  SENSOR_CONFIG / ALIASES        → S1–S4 (sensor_publisher.py, 4-class scheme)
+  S5_SENSOR_CONFIG / S5_ALIASES  → S5 (S5_sensor_publisher.py, sensor_publisher_s5.py)
+  PRIORITY_CLASSES               → sensor → canonical priority class 0–3
+                                   (scripts/packet_labels.py)
+
+Pure data — importing this module has no side effects. Two environment
+overrides let sweep_runner.py vary a run without editing this file:
+
+  EXPERIMENT_SEED=<int>            replaces the default seed below
+  PUBLISH_INTERVAL_SCALE=<float>   multiplies every sensor interval
+                                   (0.5 → twice the publish rate)
+"""
+
+import os
+
+# ── Reproducibility ──────────────────────────────────────────────────────────
+EXPERIMENT_SEED = int(os.environ.get("EXPERIMENT_SEED", 2025))
+
+ADMIN_VALUES   = ["sync", "idle", "config", "heartbeat_ok"]
+ADMIN_INTERVAL = 15.0   # seconds
+
+# ============================================================
+# ICU Traffic Classification Mapping (4 Categories)
+# ============================================================
+# Class 1 → Emergency & Important
+# Class 2 → Emergency but Not Important
+# Class 3 → Not Emergency but Important
+# Class 4 → Not Emergency & Not Important  (Background/Admin)
+# ============================================================
+
+SENSOR_CONFIG = {
+    # Class 1 - Emergency & Important
+    "ecg_monitor": {"class": 1, "unit": "bpm", "min": 60, "max": 120, "interval": 1.0},
+    "pulse_oximeter": {"class": 1, "unit": "%", "min": 85, "max": 100, "interval": 1.0},
+    "bp_sensor": {"class": 1, "unit": "mmHg", "min": 90, "max": 180, "interval": 1.5},
+    "fire_sensor": {"class": 1, "values": ["OK", "SMOKE_DETECTED", "FIRE_ALERT"], "interval": 1.0},
+
+    # Class 2 - Emergency but Not Important
+    "emg_sensor": {"class": 2, "unit": "mV", "min": 0, "max": 10, "interval": 1.5},
+    "airflow_sensor": {"class": 2, "unit": "L/s", "min": 0, "max": 5, "interval": 2.0},
+    "barometer": {"class": 2, "unit": "hPa", "min": 990, "max": 1030, "interval": 2.0},
+    "smoke_sensor": {"class": 2, "values": ["CLEAR", "SMOKE_DETECTED"], "interval": 2.0},
+
+    # Class 3 - Not Emergency but Important
+    "infusion_pump": {"class": 3, "unit": "mL/hr", "min": 5, "max": 120, "interval": 2.5},
+    "glucometer": {"class": 3, "unit": "mg/dL", "min": 70, "max": 180, "interval": 2.5},
+    "gsr_sensor": {"class": 3, "unit": "µS", "min": 0.1, "max": 10, "interval": 2.5},
+
+    # Class 4 - Not Emergency & Not Important
+    "humidity_sensor": {"class": 4, "unit": "%", "min": 20, "max": 80, "interval": 3.0},
+    "temperature_sensor": {"class": 4, "unit": "°C", "min": 20, "max": 35, "interval": 3.0},
+    "co_sensor": {"class": 4, "unit": "ppm", "min": 0, "max": 50, "interval": 3.0},
+}
+
+# Short aliases
+ALIASES = {
+    "ecg": "ecg_monitor",
+    "bp": "bp_sensor",
+    "oxygen": "pulse_oximeter",
+    "emg": "emg_sensor",
+    "airflow": "airflow_sensor",
+    "baro": "barometer",
+    "smoke": "smoke_sensor",
+    "infusion": "infusion_pump",
+    "glucose": "glucometer",
+    "gsr": "gsr_sensor",
+    "humidity": "humidity_sensor",
+    "temp": "temperature_sensor",
+    "co": "co_sensor",
+}
+
+
+# ── S5 Sensor Config — Class 3 sensors at 1.0s, emergency sensors at 0.5s ───
+#
+#  NOTE ON CLASS NUMBERS:
+#  sensor_publisher.py uses Class 1–4 (original 4-class scheme).
+#  preprocessing uses Class 0–3 (remapped). The SENSOR_CONFIG in
+#  preprossing_v6.py maps these sensors to class=2 (Continuous Monitoring).
+#  We keep Class=3 in the payload to match S1–S4 payload format exactly.
+#
+S5_SENSOR_CONFIG = {
+    "infusion_pump": {
+        "class"   : 3,                     # matches S1–S4 payload format
+        "unit"    : "mL/hr",
+        "min"     : 5,
+        "max"     : 120,
+        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
+    },
+    "glucometer": {
+        "class"   : 3,
+        "unit"    : "mg/dL",
+        "min"     : 70,
+        "max"     : 180,
+        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
+    },
+    "gsr_sensor": {
+        "class"   : 3,
+        "unit"    : "µS",
+        "min"     : 0.1,
+        "max"     : 10,
+        "interval": 1.0,                   # ← KEY CHANGE: was 2.5s
+    },
+    # ── Class 3 (Emergency Critical) ─────────────────────────────────
+    "emergency_button": {
+        "class"   : 4,           # maps to priority_class = 3 in preprocessing
+        "unit"    : "alert",
+        "min"     : 0,
+        "max"     : 1,
+        "interval": 0.5,         # faster publishing for urgency
+    },
+    "vital_signs_monitor": {
+        "class"   : 4,
+        "unit"    : "bpm",
+        "min"     : 60,
+        "max"     : 180,
+        "interval": 0.5,
+    },
+}
+
+S5_ALIASES = {
+    "infusion"   : "infusion_pump",
+    "glucose"    : "glucometer",
+    "gsr"        : "gsr_sensor",
+    "emergency"  : "emergency_button",
+    "vital"      : "vital_signs_monitor",
+}
+
+
+# ── Sweep override: scale every publish interval ────────────────────────────
+INTERVAL_SCALE = float(os.environ.get("PUBLISH_INTERVAL_SCALE", 1.0))
+if INTERVAL_SCALE != 1.0:
+    for _cfg in (*SENSOR_CONFIG.values(), *S5_SENSOR_CONFIG.values()):
+        _cfg["interval"] *= INTERVAL_SCALE
+
+
+# ── Named profiles (used by publisher_engine.py --profile) ───────────────────
+PROFILES = {
+    "s1": (SENSOR_CONFIG, ALIASES),
+    "s5": (S5_SENSOR_CONFIG, S5_ALIASES),
+}
+
+
+# ── Canonical priority classes for the downstream stages ────────────────────
+# Payloads carry Class=1–4 in every profile (S5 keeps the S1–S4 numbers, see
+# above); preprocessing labels with priority_class = Class − 1 (0–3). One
+# table for both profiles — a sensor must have the same class in each.
+PRIORITY_CLASS_OFFSET = 1
+
+
+def _sensor_classes():
+    table = {}
+    for name, (config, _) in PROFILES.items():
+        for sensor, cfg in config.items():
+            if table.setdefault(sensor, cfg["class"]) != cfg["class"]:
+                raise ValueError(f"sensor {sensor!r}: class {cfg['class']} in profile {name} "
+                                 f"but {table[sensor]} elsewhere")
+    return table
+
+
+SENSOR_CLASSES   = _sensor_classes()                                        # sensor → payload Class
+PRIORITY_CLASSES = {s: c - PRIORITY_CLASS_OFFSET for s, c in SENSOR_CLASSES.items()}   # sensor → 0–3
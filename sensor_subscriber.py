@@ -1,12 +1,44 @@
 #!/usr/bin/env python3
+"""
+sensor_subscriber.py — MQTT subscriber on the Monitor node
+
+Modes:
+  text (default)           → one log line per message (original behaviour)
+  binary / parquet / arrow → bulk mode: on_message only enqueues
+                             (recv_ns, topic, payload); a writer thread parses
+                             and appends batches (see subscriber_store.py)
+
+Usage:
+  python3 sensor_subscriber.py [--store text|binary|parquet|arrow]
+                               [--out PATH_PREFIX] [--topic 'sensors/#']
+                               [--latency] [--latency-out FILE] [--log FILE]
+  --latency aggregates publish→subscribe latency, loss and reordering from
+  payloads tagged by publishers run with PUBLISHER_LATENCY_TAGS=1.
+  --log / --out / --latency-out default to the mqtt_capture paths below;
+  scenario_runner.py points them at the scenario's log_dir.
+  NOTE: the publishers publish on sensor/<sensor_key>; pass --topic 'sensor/#'
+        to receive them (the default keeps the capture identical to S1–S5).
+"""
+import argparse
+import signal
+import time
+
 import paho.mqtt.client as mqtt
 from datetime import datetime
 
+from latency_metrics import LatencyAggregator
+from subscriber_store import BulkSink, WRITERS, open_writer, parse_payload
+
 # Subscriber runs on the Monitor node
 BROKER_IP = "10.0.0.2"      # Updated to match topology
 BROKER_PORT = 1883
 TOPIC = "sensors/#"          # Subscribe to all sensors
 LOG_FILE = "/home/ictlab7/Documents/Learning_Mininet/mqtt_capture/sensor_subscriber.log"
+STORE_PREFIX = "/home/ictlab7/Documents/Learning_Mininet/mqtt_capture/sensor_subscriber"
+LATENCY_FILE = "/home/ictlab7/Documents/Learning_Mininet/mqtt_capture/subscriber_latency.json"
+
+sink = None      # BulkSink when running in a bulk mode
+latency = None   # LatencyAggregator when --latency is given
 
 def log(msg):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -23,12 +55,56 @@ def on_message(client, userdata, message):
     payload = message.payload.decode()
     topic = message.topic
     log(f"[Subscriber] Received: {payload} on topic {topic}\n")
+    if latency is not None:
+        sensor, _, _, _, class_id = parse_payload(payload)
+        latency.observe(time.time_ns(), sensor, class_id, payload)
+
+def on_message_bulk(client, userdata, message):
+    # Network thread: timestamp + enqueue only, parsing/writing happen in BulkSink
+    sink.put(time.time_ns(), message.topic, message.payload)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensor MQTT subscriber")
+    parser.add_argument("--store", choices=["text"] + sorted(WRITERS), default="text")
+    parser.add_argument("--out", default=STORE_PREFIX, help="output path prefix for bulk modes")
+    parser.add_argument("--topic", default=TOPIC)
+    parser.add_argument("--batch", type=int, default=2048, help="records per batch write")
+    parser.add_argument("--queue", type=int, default=100_000, help="max queued messages")
+    parser.add_argument("--latency", action="store_true", help="aggregate latency/loss from tagged payloads")
+    parser.add_argument("--latency-out", default=LATENCY_FILE)
+    parser.add_argument("--latency-interval", type=float, default=30.0, help="seconds between dumps")
+    parser.add_argument("--log", default=LOG_FILE, help="subscriber log file")
+    args = parser.parse_args()
+    TOPIC = args.topic
+    LOG_FILE = args.log
+    if args.latency:
+        latency = LatencyAggregator(args.latency_out, dump_interval=args.latency_interval, log=log)
+
     client = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
     client.on_connect = on_connect
-    client.on_message = on_message
+    if args.store == "text":
+        client.on_message = on_message
+    else:
+        sink = BulkSink(open_writer(args.store, args.out),
+                        batch_size=args.batch, max_queue=args.queue, observer=latency, log=log)
+        client.on_message = on_message_bulk
+        log(f"[Subscriber] Bulk mode: {args.store} → {args.out}*\n")
 
     log(f"[Subscriber] Connecting to MQTT broker at {BROKER_IP}:{BROKER_PORT} ...\n")
     client.connect(BROKER_IP, BROKER_PORT)
-    client.loop_forever()
+    # SIGTERM/SIGHUP (pkill, net.stop) → leave loop_forever so the bulk store is flushed
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, lambda *_: client.disconnect())
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # close the sink first — its writer thread may still feed the aggregator
+        if sink is not None:
+            ok = sink.close()
+            log(f"[Subscriber] Bulk store closed{'' if ok else ' WITH ERRORS'}: received={sink.received} "
+                f"written={sink.written} dropped={sink.dropped} failed={sink.failed}"
+                + ("" if ok else f" error={type(sink.error).__name__}: {sink.error}") + "\n")
+        if latency is not None:
+            latency.dump()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+subscriber_store.py — Bulk persistence backend for sensor_subscriber.py
+=======================================================================
+sensor_subscriber.py used to decode every message and open/append/close a
+text log on the paho network thread, so a burst from many publishers
+backed up the socket.
+
+BulkSink moves everything except a queue.put_nowait() off that thread:
+  network thread:  on_message → (recv_ns, topic, payload bytes) → bounded queue
+  writer thread :  drain up to `batch_size` items → parse_payload() → writer
+
+If a batch cannot be written (disk full, writer or observer error) the sink
+logs it once, keeps the exception in `error` and stops writing: the rest of
+the queue and every later put() are counted in `failed`, and close() reports
+received / written / dropped / failed instead of the thread dying silently.
+
+Payload format (publish_sensor() in every publisher):
+  <sensor_key>:<value><unit>:Class=<N>     e.g. ecg_monitor:87.31bpm:Class=1
+                                                fire_sensor:FIRE_ALERT:Class=1
+  optionally followed by :pub=<id>:seq=<n>:ts=<epoch ns> (latency_metrics.py)
+
+Writers (append-only, one batch per write):
+  binary  → .sbin  — stdlib only; length-prefixed frames, see BinaryBatchWriter
+  parquet → .parquet — needs pyarrow; one row group per batch
+  arrow   → .arrow — needs pyarrow; Arrow IPC stream, one record batch per batch
+
+Record schema (all writers):
+  recv_ns int64 (time.time_ns() on receive), topic str, sensor str,
+  value float64 (NaN for categorical values), unit str, value_text str,
+  priority_class int8 (-1 when the payload has no Class=N)
+"""
+
+import math
+import os
+import queue
+import re
+import struct
+import threading
+import time
+
+_VALUE_RE = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(.*)$")
+
+FIELDS = ("recv_ns", "topic", "sensor", "value", "unit", "value_text", "priority_class")
+
+
+def parse_payload(payload):
+    """Split 'sensor:valueunit:Class=N' → (sensor, value, unit, value_text, class)."""
+    parts = payload.split(":")
+    sensor = parts[0] if parts else ""
+    value_text = parts[1] if len(parts) > 1 else ""
+    class_id = -1
+    # Class=N is the 3rd field; latency tags (:pub=..:seq=..:ts=..) may follow it
+    for part in parts[2:]:
+        if part.startswith("Class="):
+            try:
+                class_id = int(part[6:])
+            except ValueError:
+                pass
+            break
+    m = _VALUE_RE.match(value_text)
+    if m:
+        return sensor, float(m.group(1)), m.group(2), value_text, class_id
+    return sensor, math.nan, "", value_text, class_id
+
+
+# =====================================================================
+# Writers
+# =====================================================================
+
+class BinaryBatchWriter:
+    """
+    Append-only binary file, stdlib only.
+
+    File  = MAGIC, then frames.
+    Frame = <u32 n_records> records...
+    Record= <q recv_ns><d value><b class> then 4 × (<H len><utf-8 bytes>)
+            for topic, sensor, unit, value_text.
+    """
+
+    MAGIC   = b"SBIN1\n"
+    _HEAD   = struct.Struct("<qdb")
+    _LEN    = struct.Struct("<H")
+    _COUNT  = struct.Struct("<I")
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(self.MAGIC)
+
+    def write_batch(self, rows):
+        out = [self._COUNT.pack(len(rows))]
+        for recv_ns, topic, sensor, value, unit, value_text, class_id in rows:
+            out.append(self._HEAD.pack(recv_ns, value, class_id))
+            for text in (topic, sensor, unit, value_text):
+                raw = text.encode("utf-8")[:0xFFFF]
+                out.append(self._LEN.pack(len(raw)))
+                out.append(raw)
+        self._file.write(b"".join(out))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_binary(path):
+    """Yield record tuples (FIELDS order) from a BinaryBatchWriter file."""
+    head, length, count = BinaryBatchWriter._HEAD, BinaryBatchWriter._LEN, BinaryBatchWriter._COUNT
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(BinaryBatchWriter.MAGIC):
+        raise ValueError(f"{path}: not a subscriber .sbin file")
+    pos = len(BinaryBatchWriter.MAGIC)
+    while pos + count.size <= len(data):
+        (n,) = count.unpack_from(data, pos)
+        pos += count.size
+        for _ in range(n):
+            recv_ns, value, class_id = head.unpack_from(data, pos)
+            pos += head.size
+            texts = []
+            for _ in range(4):
+                (ln,) = length.unpack_from(data, pos)
+                pos += length.size
+                texts.append(data[pos:pos + ln].decode("utf-8"))
+                pos += ln
+            topic, sensor, unit, value_text = texts
+            yield recv_ns, topic, sensor, value, unit, value_text, class_id
+
+
+class _ArrowBatchWriter:
+    """Shared pyarrow plumbing for the parquet / arrow writers."""
+
+    def __init__(self, path):
+        import pyarrow as pa   # optional dependency — only needed for these formats
+        self.pa = pa
+        self.path = path
+        self.schema = pa.schema([
+            ("recv_ns", pa.int64()),
+            ("topic", pa.dictionary(pa.int32(), pa.string())),
+            ("sensor", pa.dictionary(pa.int32(), pa.string())),
+            ("value", pa.float64()),
+            ("unit", pa.dictionary(pa.int32(), pa.string())),
+            ("value_text", pa.string()),
+            ("priority_class", pa.int8()),
+        ])
+
+    def _table(self, rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for field, col in zip(self.schema, columns):
+            arr = self.pa.array(col, type=field.type.value_type
+                                if self.pa.types.is_dictionary(field.type) else field.type)
+            if self.pa.types.is_dictionary(field.type):
+                arr = arr.dictionary_encode()
+            arrays.append(arr)
+        return self.pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+class ParquetBatchWriter(_ArrowBatchWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        import pyarrow.parquet as pq
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write_batch(self, rows):
+        self._writer.write_table(self._table(rows))
+
+    def close(self):
+        self._writer.close()
+
+
+class ArrowBatchWriter(_ArrowBatchWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self._sink = self.pa.OSFile(path, "wb")
+        self._writer = self.pa.ipc.new_stream(self._sink, self.schema)
+
+    def write_batch(self, rows):
+        self._writer.write_table(self._table(rows))
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+WRITERS = {
+    "binary": (BinaryBatchWriter, ".sbin"),
+    "parquet": (ParquetBatchWriter, ".parquet"),
+    "arrow": (ArrowBatchWriter, ".arrow"),
+}
+
+
+def open_writer(fmt, path_prefix):
+    """Create a writer for fmt; parquet/arrow files get a start-time suffix (not appendable)."""
+    cls, ext = WRITERS[fmt]
+    if fmt == "binary":
+        return cls(path_prefix + ext)
+    return cls(f"{path_prefix}_{time.strftime('%Y%m%d_%H%M%S')}{ext}")
+
+
+# =====================================================================
+# Queue + writer thread
+# =====================================================================
+
+class BulkSink:
+    """Bounded hand-off queue between the paho thread and a batch writer."""
+
+    def __init__(self, writer, batch_size=2048, max_queue=100_000, flush_interval=1.0,
+                 observer=None, log=print):
+        self.writer         = writer
+        self.observer       = observer   # e.g. LatencyAggregator — runs on the writer thread
+        self.log            = log
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self.received       = 0
+        self.written        = 0
+        self.dropped        = 0        # queue full
+        self.failed         = 0        # not written because the writer failed
+        self.error          = None     # first write error; the sink stops writing after it
+        self._queue         = queue.Queue(maxsize=max_queue)
+        self._stop          = threading.Event()
+        self._thread        = threading.Thread(target=self._run, name="bulk-sink", daemon=True)
+        self._thread.start()
+
+    def put(self, recv_ns, topic, payload):
+        """Called on the network thread — never blocks."""
+        self.received += 1
+        if self.error is not None:
+            self.failed += 1
+            return
+        try:
+            self._queue.put_nowait((recv_ns, topic, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _take_batch(self):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        rows = []
+        for recv_ns, topic, payload in batch:
+            text = payload.decode("utf-8", errors="replace")
+            sensor, value, unit, value_text, class_id = parse_payload(text)
+            if self.observer is not None:
+                self.observer.observe(recv_ns, sensor, class_id, text)
+            rows.append((recv_ns, topic, sensor, value, unit, value_text, class_id))
+        self.writer.write_batch(rows)
+        self.written += len(rows)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.error = e
+                self.failed += len(batch)
+                self.log(f"[Subscriber] ❌ Bulk store write failed, no further messages will be "
+                         f"stored: {type(e).__name__}: {e}")
+                break
+        self._discard()
+
+    def _discard(self):
+        """Count what put() queued before it saw the error as failed."""
+        while self.error is not None:
+            try:
+                self._queue.get_nowait()
+                self.failed += 1
+            except queue.Empty:
+                break
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def close(self):
+        """Stop the writer thread and close the writer; returns ok."""
+        self._stop.set()
+        self._thread.join()
+        self._discard()
+        try:
+            self.writer.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self.log(f"[Subscriber] ❌ Closing the bulk store failed: {type(e).__name__}: {e}")
+        return self.ok
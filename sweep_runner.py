@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+sweep_runner.py — Batch experiments over a parameter grid
+=========================================================
+RunCode.sh runs one scenario until Ctrl+C with the seed and durations
+hard-coded in the collector. A sweep is a base scenario (scenarios/*.json)
+plus a grid; every grid point becomes one scenario_runner.py run with a
+fixed duration, automatic teardown and its own results directory:
+
+  {
+    "name": "s5_rates",
+    "scenario": "scenarios/s5_fixed.json",
+    "results_dir": "/home/ictlab7/Documents/Learning_Mininet/sweeps",
+    "duration": 300,                       # s per run (a grid key overrides it)
+    "concurrency": "auto",                 # int, or "auto" → CPUs / CPUS_PER_RUN
+    "grid": {
+      "seed":           [2025, 2026, 2027],
+      "interval_scale": [1.0, 0.5],        # × every sensor interval
+      "iperf_rate":     ["1M", "4M"],      # every "iperf" background entry
+      "link_bw":        [10, 100],         # default and every explicit bw
+      "captures.settings.buffer_kb": [8192] # any other key: dotted spec path
+    }
+  }
+
+Grid keys:
+  seed            spec seed + publisher_env EXPERIMENT_SEED (sensor_config.py)
+  interval_scale  publisher_env PUBLISH_INTERVAL_SCALE (sensor_config.py)
+  iperf_rate      "rate" of every iperf background entry
+  link_bw         link_bw and every explicit host / switch-link bw
+  duration        run length in seconds
+  a.b.0.c         any other spec value (list items by index)
+
+Concurrent runs each get a slot k: node_prefix "r<k>" (distinct veth and
+OVS bridge names in the one root namespace; every host already has its own
+network namespace) and controller_port 6653 + k. With concurrency 1 the
+spec keeps its plain names. A run that outlives duration + RUN_GRACE is
+sent SIGTERM (scenario_runner tears down on it), then SIGKILL.
+
+Results:
+  <results_dir>/<name>/<NNN>_<key><value>.../
+      spec.json     resolved scenario        run.log   scenario_runner output
+      pcap/         captures + manifest      logs/     broker / publisher logs
+      status.json   params, slot, returncode, timed_out, start/end, wall_s
+  <results_dir>/<name>/sweep_index.json + sweep_index.csv — one row per run
+
+Runs whose status.json records returncode 0 are skipped on re-run (--force
+repeats them).
+
+Usage:
+  sudo python3 sweep_runner.py scenarios/sweep_s5_example.json [--concurrency 2]
+  python3 sweep_runner.py scenarios/sweep_s5_example.json --dry-run
+"""
+
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+
+from scenario_runner import load_scenario, validate
+
+sys.stdout.reconfigure(line_buffering=True)
+
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+CPUS_PER_RUN  = 2        # broker + publishers + tcpdump of one scenario
+RUN_GRACE     = 180      # s on top of duration for bring-up and teardown
+KILL_TIMEOUT  = 30       # s between SIGTERM and SIGKILL
+POLL_INTERVAL = 1.0
+
+
+# =====================================================================
+# Grid expansion (no Mininet needed)
+# =====================================================================
+
+def load_sweep(path):
+    with open(path) as f:
+        sweep = json.load(f)
+    sweep.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    sweep.setdefault("results_dir", os.path.join(BASE_DIR, "sweeps"))
+    sweep.setdefault("duration", 300)
+    sweep.setdefault("concurrency", 1)
+    sweep.setdefault("grid", {})
+    if "scenario" not in sweep:
+        raise ValueError(f"{path}: missing 'scenario'")
+    if not os.path.isabs(sweep["scenario"]):
+        sweep["scenario"] = os.path.join(BASE_DIR, sweep["scenario"])
+    return sweep
+
+
+def grid_points(grid):
+    """Cartesian product of the grid, in key order: [{key: value}, ...]."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def set_path(spec, path, value):
+    """spec["a"]["b"][0]["c"] = value for path "a.b.0.c" (missing dicts are created)."""
+    *parents, last = path.split(".")
+    node = spec
+    for part in parents:
+        node = node[int(part)] if isinstance(node, list) else node.setdefault(part, {})
+    if isinstance(node, list):
+        node[int(last)] = value
+    else:
+        node[last] = value
+
+
+def apply_params(spec, params):
+    """Resolve one grid point onto a copy of the base spec."""
+    spec = copy.deepcopy(spec)
+    for key, value in params.items():
+        if key == "seed":
+            spec["seed"] = value
+            spec["publisher_env"]["EXPERIMENT_SEED"] = value
+        elif key == "interval_scale":
+            spec["publisher_env"]["PUBLISH_INTERVAL_SCALE"] = value
+        elif key == "iperf_rate":
+            for bg in spec["background"]:
+                if bg["type"] == "iperf":
+                    bg["rate"] = value
+        elif key == "link_bw":
+            spec["link_bw"] = value
+            for cfg in [*spec["hosts"].values(), *spec["switch_links"]]:
+                if "bw" in cfg:
+                    cfg["bw"] = value
+        elif key == "duration":
+            spec["duration"] = value
+        else:
+            set_path(spec, key, value)
+    return spec
+
+
+def run_id(index, params):
+    parts = [f"{key.rsplit('.', 1)[-1]}{value}" for key, value in params.items()]
+    return re.sub(r"[^\w.=-]", "", "_".join([f"{index:03d}", *parts]))
+
+
+def resolve_concurrency(value):
+    if value == "auto":
+        return max(1, (os.cpu_count() or 1) // CPUS_PER_RUN)
+    return max(1, int(value))
+
+
+class Run:
+    """One grid point: resolved spec, results directory, process state."""
+
+    def __init__(self, index, params, base_spec, sweep_dir, default_duration):
+        self.index     = index
+        self.params    = params
+        self.id        = run_id(index, params)
+        self.dir       = os.path.join(sweep_dir, self.id)
+        self.spec      = apply_params(base_spec, params)
+        # sweep duration wins over the base scenario's; only a grid key overrides it
+        self.duration  = float(self.spec["duration"] if "duration" in params else default_duration)
+        self.spec["duration"]   = self.duration
+        self.spec["output_dir"] = os.path.join(self.dir, "pcap")
+        self.spec["log_dir"]    = os.path.join(self.dir, "logs")
+        self.slot      = None
+        self.proc      = None
+        self.started   = None
+        self.deadline  = None
+        self.timed_out = False
+        self.skipped   = False    # completed by an earlier invocation
+        self.status    = {}
+
+    @property
+    def status_path(self):
+        return os.path.join(self.dir, "status.json")
+
+    def completed(self):
+        try:
+            with open(self.status_path) as f:
+                return json.load(f).get("returncode") == 0
+        except (OSError, ValueError):
+            return False
+
+    def succeeded(self):
+        """Skipped as already completed, or finished with exit 0 in time; a run
+        that never launched (empty status) counts as failed."""
+        if self.skipped:
+            return True
+        return self.status.get("returncode") == 0 and not self.timed_out
+
+    def prepare(self, slot, concurrent, base_port):
+        self.slot = slot
+        if concurrent:
+            self.spec["node_prefix"]     = f"r{slot}"
+            self.spec["controller_port"] = base_port + slot
+        validate(self.spec)
+        os.makedirs(self.spec["output_dir"], exist_ok=True)
+        os.makedirs(self.spec["log_dir"], exist_ok=True)
+        with open(os.path.join(self.dir, "spec.json"), "w") as f:
+            json.dump(self.spec, f, indent=2)
+
+    def launch(self):
+        cmd = [sys.executable, os.path.join(BASE_DIR, "scenario_runner.py"),
+               os.path.join(self.dir, "spec.json"), "--duration", str(self.duration)]
+        self.started  = time.time()
+        self.deadline = time.monotonic() + self.duration + RUN_GRACE
+        with open(os.path.join(self.dir, "run.log"), "w") as log:
+            self.proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+                                         start_new_session=True)   # Ctrl+C reaches only the sweep
+
+    def stop(self):
+        """SIGTERM → scenario_runner teardown; SIGKILL if it hangs."""
+        if self.proc.poll() is not None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=KILL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def finish(self):
+        ended = time.time()
+        manifests = [f for f in os.listdir(self.spec["output_dir"]) if f.startswith("capture_manifest_")]
+        self.status = {
+            "run_id": self.id,
+            "params": self.params,
+            "slot": self.slot,
+            "node_prefix": self.spec["node_prefix"],
+            "duration": self.duration,
+            "returncode": self.proc.returncode,
+            "timed_out": self.timed_out,
+            "started_at": self.started,
+            "ended_at": ended,
+            "wall_s": round(ended - self.started, 3),
+            "capture_manifests": sorted(manifests),
+        }
+        with open(self.status_path, "w") as f:
+            json.dump(self.status, f, indent=2)
+        return self.status
+
+
+# =====================================================================
+# Scheduler
+# =====================================================================
+
+def _cpu_busy(concurrency):
+    """Hold back new launches while the 1-min load already fills the CPUs."""
+    if concurrency == 1:
+        return False
+    return os.getloadavg()[0] > (os.cpu_count() or 1)
+
+
+def run_sweep(sweep, concurrency, force=False):
+    base = load_scenario(sweep["scenario"])
+    sweep_dir = os.path.join(sweep["results_dir"], sweep["name"])
+    runs = [Run(i, params, base, sweep_dir, sweep["duration"])
+            for i, params in enumerate(grid_points(sweep["grid"]))]
+    os.makedirs(sweep_dir, exist_ok=True)
+
+    for run in runs:
+        run.skipped = not force and run.completed()
+    pending = deque(r for r in runs if not r.skipped)
+    skipped = len(runs) - len(pending)
+    if skipped:
+        print(f"⏭️  {skipped} run(s) already completed (use --force to repeat)")
+    concurrent = concurrency > 1
+    free, active = list(range(concurrency)), []
+    print(f"🚀 Sweep {sweep['name']}: {len(pending)} run(s), concurrency {concurrency} → {sweep_dir}")
+
+    try:
+        while pending or active:
+            while pending and free and not (active and _cpu_busy(concurrency)):
+                run = pending.popleft()
+                run.prepare(free.pop(0), concurrent, base["controller_port"])
+                run.launch()
+                active.append(run)
+                print(f"▶️  [{run.slot}] {run.id} ({run.duration:.0f}s)")
+            for run in list(active):
+                if run.proc.poll() is None and time.monotonic() > run.deadline:
+                    print(f"⏰ [{run.slot}] {run.id} overran — stopping")
+                    run.timed_out = True
+                    run.stop()
+                if run.proc.poll() is not None:
+                    status = run.finish()
+                    active.remove(run)
+                    free.append(run.slot)
+                    mark = "✅" if status["returncode"] == 0 and not run.timed_out else "❌"
+                    print(f"{mark} [{run.slot}] {run.id}: exit {status['returncode']} "
+                          f"in {status['wall_s']:.0f}s")
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print(f"\n*** Caught Ctrl+C, stopping {len(active)} active run(s)...")
+        for run in active:
+            run.stop()
+            run.finish()
+    finally:
+        write_index(sweep_dir, runs)
+    return runs
+
+
+def write_index(sweep_dir, runs):
+    rows = []
+    for run in runs:
+        try:
+            with open(run.status_path) as f:
+                rows.append(json.load(f))
+        except (OSError, ValueError):
+            rows.append({"run_id": run.id, "params": run.params, "returncode": None})
+    with open(os.path.join(sweep_dir, "sweep_index.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+    keys = sorted({k for r in rows for k in r["params"]})
+    with open(os.path.join(sweep_dir, "sweep_index.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["run_id", *keys, "returncode", "timed_out", "wall_s"])
+        for r in rows:
+            writer.writerow([r["run_id"], *(r["params"].get(k, "") for k in keys),
+                             r.get("returncode"), r.get("timed_out", ""), r.get("wall_s", "")])
+    print(f"📒 Sweep index → {sweep_dir}/sweep_index.json")
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a scenario over a parameter grid")
+    parser.add_argument("sweep", help="sweep spec (.json)")
+    parser.add_argument("--concurrency", default=None, help="parallel runs, or 'auto' (overrides the spec)")
+    parser.add_argument("--force", action="store_true", help="repeat runs that already completed")
+    parser.add_argument("--dry-run", action="store_true", help="resolve and validate every run, start nothing")
+    args = parser.parse_args(argv)
+
+    try:
+        sweep = load_sweep(args.sweep)
+        concurrency = resolve_concurrency(args.concurrency or sweep["concurrency"])
+        if args.dry_run:
+            base = load_scenario(sweep["scenario"])
+            sweep_dir = os.path.join(sweep["results_dir"], sweep["name"])
+            for i, params in enumerate(grid_points(sweep["grid"])):
+                run = Run(i, params, base, sweep_dir, sweep["duration"])
+                if concurrency > 1:
+                    run.spec["node_prefix"] = f"r{concurrency - 1}"   # longest prefix in use
+                validate(run.spec)
+                print(f"   {run.id}: {run.duration:.0f}s → {run.dir}")
+            print(f"✅ {i + 1} run(s), concurrency {concurrency}")
+            return 0
+    except ValueError as e:
+        print(f"❌ {args.sweep}: {e}")
+        return 1
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    runs = run_sweep(sweep, concurrency, args.force)
+    return 0 if all(r.succeeded() for r in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
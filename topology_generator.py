@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+topology_generator.py — Scenario specs for hundreds of sensor hosts
+===================================================================
+start_mqtt_network() / start_s5_network() hand-write 14 hosts with manual
+IPs (BaseCode even gives h12–h14 the addresses of h9–h11's neighbours
+twice). This generates a scenario_runner.py spec for N sensor hosts:
+
+  topologies
+    tree       access switches of `hosts_per_switch` hosts, aggregated by
+               `fanout` per level up to one core switch (broker + monitor
+               attach to the core)
+    fat-tree   k-ary fat tree (k even, smallest that fits): (k/2)² core,
+               k pods of k/2 aggregation + k/2 edge switches; broker +
+               monitor on the first edge switch. Looped → "stp": true
+  addressing   allocate_ips(): sequential, collision-free addresses from
+               `network` (broker .2, monitor .3, sensors from .4)
+  placement    which access switch each sensor host lands on
+    spread     classes interleaved — every switch carries a class mix
+    cluster    hosts of one class fill switches together
+    random     seeded shuffle
+  sensors      one sensor per host, cycling through the sensor set
+               (s3 → SENSOR_CONFIG + sensor_publisher.py,
+                s5 → S5_SENSOR_CONFIG + S5_sensor_publisher.py)
+
+--benchmark builds and stops the generated network for each N with
+ScenarioRunner.build() (net.start + ifconfig + waitConnected) and writes
+bring-up / teardown times to topology_bench_<ts>.json, to find how far
+Mininet scales on a given machine.
+
+Usage:
+  python3 topology_generator.py --hosts 200 --topo tree --fanout 4 --out scenarios/tree_200.json
+  python3 topology_generator.py --hosts 128 --topo fat-tree --placement cluster --out scenarios/ft_128.json
+  sudo python3 topology_generator.py --benchmark 16,64,128,256 --topo tree
+"""
+
+import argparse
+import ipaddress
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime
+
+from sensor_config import EXPERIMENT_SEED, S5_SENSOR_CONFIG, SENSOR_CONFIG
+
+TOPOLOGIES       = ("tree", "fat-tree")
+PLACEMENTS       = ("spread", "cluster", "random")
+SENSOR_SETS      = {
+    "s3": (SENSOR_CONFIG,    "sensor_publisher.py"),
+    "s5": (S5_SENSOR_CONFIG, "S5_sensor_publisher.py"),
+}
+DEFAULT_NETWORK  = "10.0.0.0/8"
+HOSTS_PER_SWITCH = 16
+FANOUT           = 4
+CONNECTIVITY_MAX = 16     # hosts in the generated net.ping() check
+STP_READY_TIMEOUT = 90    # s — OVS STP needs ~2 × forward delay before forwarding
+
+
+# =====================================================================
+# Addressing
+# =====================================================================
+
+def allocate_ips(count, network=DEFAULT_NETWORK, reserved=()):
+    """`count` distinct 'a.b.c.d/len' host addresses, skipping the first
+    address of `network` (Mininet's convention) and anything in `reserved`."""
+    net = ipaddress.ip_network(network)
+    taken = {ipaddress.ip_address(ip.split("/")[0]) for ip in reserved}
+    out = []
+    for addr in net.hosts():
+        if addr == net.network_address + 1 or addr in taken:
+            continue
+        out.append(f"{addr}/{net.prefixlen}")
+        if len(out) == count:
+            return out
+    raise ValueError(f"{network} has no room for {count} hosts")
+
+
+# =====================================================================
+# Switch fabrics → (switches, links, access switches, server switch)
+# =====================================================================
+
+def tree_fabric(access_count, fanout=FANOUT):
+    """Bottom-up tree; switches are numbered top-down (s1 is the core)."""
+    levels = [access_count]
+    while levels[-1] > 1:
+        levels.append(math.ceil(levels[-1] / fanout))
+    levels.reverse()                       # [1, ..., access_count]
+    names, n = [], 0
+    for width in levels:
+        names.append([f"s{n + i + 1}" for i in range(width)])
+        n += width
+    links = [{"a": child, "b": names[depth - 1][i // fanout]}
+             for depth in range(1, len(names)) for i, child in enumerate(names[depth])]
+    return [s for level in names for s in level], links, names[-1], names[0][0]
+
+
+def fat_tree_k(access_count):
+    """Smallest even k whose k²/2 edge switches cover `access_count`."""
+    k = 2
+    while k * k // 2 < access_count:
+        k += 2
+    return k
+
+
+def fat_tree_fabric(k):
+    half = k // 2
+    core = [f"s{i + 1}" for i in range(half * half)]
+    n = len(core)
+    switches, links, edges = list(core), [], []
+    for pod in range(k):
+        aggs = [f"s{n + i + 1}" for i in range(half)]
+        pod_edges = [f"s{n + half + i + 1}" for i in range(half)]
+        n += k
+        switches += aggs + pod_edges
+        edges += pod_edges
+        for j, agg in enumerate(aggs):
+            links += [{"a": agg, "b": core[j * half + c]} for c in range(half)]
+            links += [{"a": edge, "b": agg} for edge in pod_edges]
+    return switches, links, edges, edges[0]
+
+
+# =====================================================================
+# Hosts
+# =====================================================================
+
+def assign_sensors(count, config):
+    """Sensor key per host: cycle the set so every sensor gets ≈count/len hosts."""
+    keys = list(config)
+    return [keys[i % len(keys)] for i in range(count)]
+
+
+def place_hosts(sensors, config, access, hosts_per_switch, placement="spread", seed=EXPERIMENT_SEED):
+    """Access switch for each host (same order as `sensors`)."""
+    if len(sensors) > len(access) * hosts_per_switch:
+        raise ValueError(f"{len(sensors)} hosts do not fit {len(access)} × {hosts_per_switch} ports")
+    order = list(range(len(sensors)))
+    if placement == "spread":
+        return [access[i % len(access)] for i in order]
+    if placement == "cluster":
+        order.sort(key=lambda i: (config[sensors[i]]["class"], i))
+    elif placement == "random":
+        random.Random(seed).shuffle(order)
+    else:
+        raise ValueError(f"placement must be one of {', '.join(PLACEMENTS)}")
+    out = [None] * len(sensors)
+    for slot, i in enumerate(order):
+        out[i] = access[slot // hosts_per_switch]
+    return out
+
+
+# =====================================================================
+# Spec
+# =====================================================================
+
+def generate(hosts, topo="tree", fanout=FANOUT, hosts_per_switch=HOSTS_PER_SWITCH, k=None,
+             placement="spread", sensor_set="s5", network=DEFAULT_NETWORK, seed=EXPERIMENT_SEED,
+             link_bw=10, name=None):
+    """scenario_runner.py spec for `hosts` sensor hosts."""
+    if topo not in TOPOLOGIES:
+        raise ValueError(f"topo must be one of {', '.join(TOPOLOGIES)}")
+    config, script = SENSOR_SETS[sensor_set]
+    access_needed = max(1, math.ceil(hosts / hosts_per_switch))
+    if topo == "tree":
+        switches, links, access, server = tree_fabric(access_needed, fanout)
+    else:
+        k = k or fat_tree_k(access_needed)
+        switches, links, access, server = fat_tree_fabric(k)
+
+    sensors = assign_sensors(hosts, config)
+    placed = place_hosts(sensors, config, access, hosts_per_switch, placement, seed)
+    ips = allocate_ips(hosts + 2, network)
+
+    spec_hosts = {
+        "broker":  {"ip": ips[0], "switch": server},
+        "monitor": {"ip": ips[1], "switch": server},
+    }
+    publishers = []
+    for i, (sensor, switch) in enumerate(zip(sensors, placed)):
+        host = f"h{i + 1}"
+        spec_hosts[host] = {"ip": ips[i + 2], "switch": switch, "class": config[sensor]["class"]}
+        publishers.append({"host": host, "sensor": sensor, "script": script})
+
+    # one host per access switch (plus the broker) is enough to show reachability
+    probe, seen = ["broker"], set()
+    for host, h in list(spec_hosts.items())[2:]:
+        if h["switch"] not in seen and len(probe) < CONNECTIVITY_MAX:
+            seen.add(h["switch"])
+            probe.append(host)
+
+    spec = {
+        "name": name or f"{topo.replace('-', '')}{hosts}",
+        "description": f"topology_generator.py: {hosts} {sensor_set} sensor hosts, {topo} "
+                       f"({len(switches)} switches, {len(access)} access), placement {placement}",
+        "seed": seed,
+        "switches": switches,
+        "switch_links": links,
+        "link_bw": link_bw,
+        "stp": topo == "fat-tree",
+        "hosts": spec_hosts,
+        "broker": {"host": "broker", "port": 1883},
+        "subscriber": {"host": "monitor", "store": "text"},
+        "publishers": publishers,
+        "background": [{"type": "ping", "src": "monitor", "dst": "broker"}],
+        "captures": {"settings": {"rotate_mb": 500},
+                     "points": [{"node": "broker", "profile": "mqtt+icmp"}]},
+        "connectivity": probe,
+    }
+    if spec["stp"]:
+        spec["ready_timeout"] = STP_READY_TIMEOUT
+    return spec
+
+
+# =====================================================================
+# Bring-up benchmark (root + Mininet)
+# =====================================================================
+
+def benchmark(sizes, out_dir=".", **kwargs):
+    from mininet.log import setLogLevel
+    from scenario_runner import ScenarioRunner, validate, with_defaults
+
+    setLogLevel("warning")
+    results = []
+    for n in sizes:
+        spec = validate(with_defaults(generate(n, **kwargs)))
+        runner = ScenarioRunner(spec)
+        start = time.perf_counter()
+        try:
+            runner.build()
+            built = time.perf_counter()
+            lost = runner.net.ping([runner.nodes["broker"], runner.nodes["h1"]], timeout=1)
+        finally:
+            stop_start = time.perf_counter()
+            if runner.net is not None:
+                runner.net.stop()
+        row = {
+            "hosts": n,
+            "switches": len(spec["switches"]),
+            "links": len(spec["switch_links"]) + len(spec["hosts"]),
+            "bringup_s": round(built - start, 3),
+            "ping_loss_pct": lost,
+            "teardown_s": round(time.perf_counter() - stop_start, 3),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        results.append(row)
+        print(f"⏱️  N={n:<5} switches={row['switches']:<4} bring-up {row['bringup_s']:8.2f}s  "
+              f"teardown {row['teardown_s']:7.2f}s  loss {lost:.0f}%")
+
+    path = os.path.join(out_dir, f"topology_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({"params": kwargs, "results": results}, f, indent=2)
+    print(f"✅ Benchmark → {path}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate large sensor topologies for scenario_runner.py")
+    parser.add_argument("--hosts", type=int, default=64, help="number of sensor hosts")
+    parser.add_argument("--topo", choices=TOPOLOGIES, default="tree")
+    parser.add_argument("--fanout", type=int, default=FANOUT, help="tree: children per switch")
+    parser.add_argument("--hosts-per-switch", type=int, default=HOSTS_PER_SWITCH)
+    parser.add_argument("--k", type=int, default=None, help="fat-tree arity (default: smallest that fits)")
+    parser.add_argument("--placement", choices=PLACEMENTS, default="spread")
+    parser.add_argument("--sensors", choices=sorted(SENSOR_SETS), default="s5")
+    parser.add_argument("--network", default=DEFAULT_NETWORK)
+    parser.add_argument("--seed", type=int, default=EXPERIMENT_SEED)
+    parser.add_argument("--link-bw", type=float, default=10, help="Mbit/s, 0 = no shaping (faster bring-up)")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--out", default=None, help="write the spec here (default: stdout)")
+    parser.add_argument("--benchmark", default=None, help="comma list of host counts to bring up and time")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(topo=args.topo, fanout=args.fanout, hosts_per_switch=args.hosts_per_switch, k=args.k,
+                  placement=args.placement, sensor_set=args.sensors, network=args.network,
+                  seed=args.seed, link_bw=args.link_bw)
+    try:
+        if args.benchmark:
+            benchmark([int(n) for n in args.benchmark.split(",")], **kwargs)
+            return 0
+        spec = generate(args.hosts, name=args.name, **kwargs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    text = json.dumps(spec, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ {args.hosts} hosts, {len(spec['switches'])} switches ({args.topo}) → {args.out}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())